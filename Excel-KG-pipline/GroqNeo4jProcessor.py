@@ -1,19 +1,87 @@
 import pandas as pd
 from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
 import logging, json
-from groq import Groq
-from typing import Dict, List, Any
+from groq import Groq, RateLimitError, APIConnectionError, InternalServerError
+from typing import Dict, List, Any, Optional
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import re
 import os
+import time
+import threading
+import hashlib
+from rate_limiter import RateLimiter
+from extraction_cache import ExtractionCache
+from rule_extractor import RuleBasedExtractor, normalize_column_name
+from ingestion_state import IngestionState
+from chunk_reader import read_chunks, prefetch
+from bulk_export import BulkImportExporter
+from run_journal import RunJournal
 
 LLM = "llama-3.3-70b-versatile"
+# Bump whenever the extraction prompt changes so cached results are not reused
+PROMPT_VERSION = "2"
+PACKED_PROMPT_VERSION = "packed-1"
+
+EXTRACTION_SYSTEM_PROMPT = "You are an expert in knowledge graph extraction. Always respond with valid JSON only."
+
+# Entity types, relationship types and properties shared by the single-row and packed prompts
+EXTRACTION_GUIDE = """Entity types should include:
+- EQUIPMENT: Main equipment (e.g., GasTurbine1)
+- SYSTEM: Sub-systems (e.g., FuelSystem, LubeOilSystem, HPAirSystem)
+- COMPONENT: Individual components (e.g., FuelPump, OilFilter, AirCompressor)
+- FAILURE_MODE: Types of failures (e.g., Seizing, Clogging, Leak)
+- MAINTENANCE_STRATEGY: Maintenance approaches (e.g., Predictive Maintenance, Time-Based Maintenance)
+- DETECTION_METHOD: Monitoring techniques (e.g., Vibration monitoring, Pressure monitoring)
+- SPARE_PART: Replacement parts (e.g., Fuel Pump, Oil Filter)
+- CONDITION_DATA: Monitoring parameters (e.g., Vibration levels, Pressure drop)
+
+Relationship types should include:
+- HAS_ASSEMBLY: Equipment has systems/assemblies
+- HAS_COMPONENT: Systems have components
+- HAS_FAILURE_MODE: Components have failure modes
+- USES_MAINTENANCE_STRATEGY: Failure modes use specific maintenance strategies
+- DETECTED_BY: Failure modes are detected by methods
+- MONITORED_BY: Components are monitored by detection methods
+- REQUIRES_SPARE_PART: Failure modes require specific spare parts for repair
+- HAS_CONDITION_DATA: Failure modes have associated condition monitoring data
+- CAUSES_CONSEQUENCE: Failure modes cause consequences
+- OCCURS_IN: Failure modes occur in specific components
+
+Extract key properties like:
+- severity: Critical, Major, Minor
+- frequency: maintenance intervals
+- rul: Remaining Useful Life in hours
+- consequence: impact of failure
+- threshold: monitoring thresholds
+"""
+
+# Fallbacks for entity and relationship types that sanitize to nothing
+DEFAULT_LABEL = "ENTITY"
+DEFAULT_RELATIONSHIP_TYPE = "RELATED_TO"
+
+# Label shared by every node, its name uniqueness constraint backs all endpoint lookups
+SHARED_LABEL = "Entity"
+# Node holding the graph version stamp that the chatbot uses to invalidate its caches
+GRAPH_META_LABEL = "GraphMeta"
+
+
+def failed_extraction() -> Dict[str, Any]:
+    """Result of a row whose extraction failed, it is not written or checkpointed so a later run retries it"""
+    return {"entities": [], "relationships": [], "failed": True}
+
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class CSVToKnowledgeGraph:
-    def __init__(self, groq_api_key: str, neo4j_uri: str, neo4j_user: str, neo4j_password: str):
+    def __init__(self, groq_api_key: str, neo4j_uri: str, neo4j_user: str, neo4j_password: str,
+                 requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 max_retries: int = 5, cache_path: Optional[str] = None,
+                 cache_max_bytes: int = 256 * 1024 * 1024, column_schema_path: Optional[str] = None,
+                 state_path: Optional[str] = None, journal_path: Optional[str] = None):
         """
         Initialize the CSV to Knowledge Graph converter
         
@@ -22,13 +90,37 @@ class CSVToKnowledgeGraph:
             neo4j_uri: Neo4j database URI (e.g., "bolt://localhost:7687")
             neo4j_user: Neo4j username
             neo4j_password: Neo4j password
+            requests_per_minute: Groq request budget per minute (None for unlimited)
+            tokens_per_minute: Groq token budget per minute (None for unlimited)
+            max_retries: Number of retries for an extraction request that was rate limited (429),
+                failed to connect, timed out or got a 5xx response
+            cache_path: SQLite file for caching extraction results (None disables the cache)
+            cache_max_bytes: Size limit of the extraction cache
+            column_schema_path: Column schema for rule-based extraction (defaults to rcm_column_schema.json)
+            state_path: SQLite file recording row fingerprints and provenance, required for incremental runs
+            journal_path: SQLite file checkpointing ingestion runs, required to resume them
         """
-        self.groq_client = Groq(api_key=groq_api_key)
+        # Retries are handled by the shared rate limiter so that all worker threads back off together
+        self.groq_client = Groq(api_key=groq_api_key, max_retries=0)
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.cache = ExtractionCache(cache_path, cache_max_bytes) if cache_path else None
+        self.rule_extractor = RuleBasedExtractor.from_file(column_schema_path) if column_schema_path else RuleBasedExtractor()
+        self.state = IngestionState(state_path) if state_path else None
+        self.journal = RunJournal(journal_path) if journal_path else None
+        self._packing_stats = {"completion_tokens_per_row": 400.0}
+        self._packing_lock = threading.Lock()
         self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
         
     def close(self):
-        """Close Neo4j connection"""
+        """Close Neo4j connection, the extraction cache, the ingestion state and the run journal"""
         self.driver.close()
+        if self.cache:
+            self.cache.close()
+        if self.state:
+            self.state.close()
+        if self.journal:
+            self.journal.close()
     
     def read_csv(self, csv_file_path: str) -> pd.DataFrame:
         """Read CSV file into pandas DataFrame"""
@@ -40,6 +132,36 @@ class CSVToKnowledgeGraph:
             logger.error(f"Error reading CSV file: {e}")
             raise
     
+    def _create_completion(self, messages: List[Dict[str, str]], max_tokens: int, **kwargs):
+        """
+        Call the Groq chat completion API through the rate limiter
+        
+        The request is charged against the budgets with a rough estimate of its size
+        (about 4 characters per token plus the completion limit), which is corrected
+        with the real usage once the response arrives. 429 responses, connection errors,
+        timeouts and 5xx responses are retried after a shared backoff.
+        """
+        estimated_tokens = sum(len(m["content"]) for m in messages) // 4 + max_tokens
+        
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = self.groq_client.chat.completions.create(
+                    messages=messages, max_tokens=max_tokens, **kwargs
+                )
+            except (RateLimitError, InternalServerError, APIConnectionError) as e:
+                if attempt == self.max_retries:
+                    raise
+                error_response = getattr(e, "response", None)
+                retry_after = error_response.headers.get("retry-after") if error_response is not None else None
+                self.rate_limiter.backoff(float(retry_after) if retry_after else None)
+                continue
+            
+            self.rate_limiter.reset_backoff()
+            if getattr(response, "usage", None) is not None:
+                self.rate_limiter.record_usage(estimated_tokens, response.usage.total_tokens)
+            return response
+    
     def extract_entities_relationships(self, text: str) -> Dict[str, Any]:
         """
         Use Groq LLaMA to extract entities and relationships from text
@@ -48,7 +170,8 @@ class CSVToKnowledgeGraph:
             text: Input text to analyze
             
         Returns:
-            Dictionary containing entities and relationships
+            Dictionary containing entities and relationships, or failed_extraction() if the
+            request failed or the response held no JSON
         """
         prompt = f"""
         Analyze the following industrial equipment maintenance data and extract entities and relationships. 
@@ -64,34 +187,7 @@ class CSVToKnowledgeGraph:
             ]
         }}
         
-        Entity types should include:
-        - EQUIPMENT: Main equipment (e.g., GasTurbine1)
-        - SYSTEM: Sub-systems (e.g., FuelSystem, LubeOilSystem, HPAirSystem)
-        - COMPONENT: Individual components (e.g., FuelPump, OilFilter, AirCompressor)
-        - FAILURE_MODE: Types of failures (e.g., Seizing, Clogging, Leak)
-        - MAINTENANCE_STRATEGY: Maintenance approaches (e.g., Predictive Maintenance, Time-Based Maintenance)
-        - DETECTION_METHOD: Monitoring techniques (e.g., Vibration monitoring, Pressure monitoring)
-        - SPARE_PART: Replacement parts (e.g., Fuel Pump, Oil Filter)
-        - CONDITION_DATA: Monitoring parameters (e.g., Vibration levels, Pressure drop)
-        
-        Relationship types should include:
-        - HAS_ASSEMBLY: Equipment has systems/assemblies
-        - HAS_COMPONENT: Systems have components
-        - HAS_FAILURE_MODE: Components have failure modes
-        - USES_MAINTENANCE_STRATEGY: Failure modes use specific maintenance strategies
-        - DETECTED_BY: Failure modes are detected by methods
-        - MONITORED_BY: Components are monitored by detection methods
-        - REQUIRES_SPARE_PART: Failure modes require specific spare parts for repair
-        - HAS_CONDITION_DATA: Failure modes have associated condition monitoring data
-        - CAUSES_CONSEQUENCE: Failure modes cause consequences
-        - OCCURS_IN: Failure modes occur in specific components
-        
-        Extract key properties like:
-        - severity: Critical, Major, Minor
-        - frequency: maintenance intervals
-        - rul: Remaining Useful Life in hours
-        - consequence: impact of failure
-        - threshold: monitoring thresholds
+        {EXTRACTION_GUIDE}
         
         Text to analyze:
         {text}
@@ -99,10 +195,17 @@ class CSVToKnowledgeGraph:
         JSON Response:
         """
         
+        cache_key = None
+        if self.cache:
+            cache_key = ExtractionCache.make_key(LLM, PROMPT_VERSION, text)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.groq_client.chat.completions.create(
+            response = self._create_completion(
                 messages=[
-                    {"role": "system", "content": "You are an expert in knowledge graph extraction. Always respond with valid JSON only."},
+                    {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 model=LLM , # You can also use "llama-3.1-8b-instant" for faster processing
@@ -115,25 +218,27 @@ class CSVToKnowledgeGraph:
             json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
             if json_match:
                 json_str = json_match.group()
-                return json.loads(json_str)
+                extracted_data = json.loads(json_str)
+                if cache_key:
+                    self.cache.put(cache_key, extracted_data)
+                return extracted_data
             else:
                 logger.warning(f"No JSON found in response: {response_text}")
-                return {"entities": [], "relationships": []}
+                return failed_extraction()
                 
         except Exception as e:
             logger.error(f"Error extracting entities and relationships: {e}")
-            return {"entities": [], "relationships": []}
+            return failed_extraction()
     
-    def process_csv_row(self, row: pd.Series) -> Dict[str, Any]:
+    def render_csv_row(self, row: pd.Series) -> str:
         """
-        Process a single CSV row to extract entities and relationships
-        Specifically designed for industrial equipment maintenance data
+        Render a CSV row as the structured text sent to the LLM
         
         Args:
             row: Pandas Series representing a CSV row
             
         Returns:
-            Dictionary containing extracted entities and relationships
+            Text representation of the row
         """
         # Create a structured text representation of the row
         level = row.get('Level', '')
@@ -170,12 +275,200 @@ class CSVToKnowledgeGraph:
         for managing this failure mode, not just the component in general. The detection method '{detection_method}' is used 
         to detect this specific failure mode.
         """
+        return text_content
+    
+    def process_csv_row(self, row: pd.Series) -> Dict[str, Any]:
+        """
+        Process a single CSV row to extract entities and relationships
+        Specifically designed for industrial equipment maintenance data
         
+        Args:
+            row: Pandas Series representing a CSV row
+            
+        Returns:
+            Dictionary containing extracted entities and relationships
+        """
+        text_content = self.render_csv_row(row)
         if not text_content.strip():
             return {"entities": [], "relationships": []}
         
         return self.extract_entities_relationships(text_content)
     
+    def extract_packed(self, texts: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Use Groq LLaMA to extract entities and relationships for several rows in one request
+        
+        The extraction instructions are sent once for all rows, which amortises them over
+        the whole pack. Rows missing from the response or with a malformed result are left
+        out of the returned dictionary so the caller can re-run them.
+        
+        Args:
+            texts: Rendered row texts keyed by row id
+            
+        Returns:
+            Dictionary of extraction results keyed by row id
+        """
+        results = {}
+        cache_keys = {}
+        if self.cache:
+            for row_id, text in texts.items():
+                cache_keys[row_id] = ExtractionCache.make_key(LLM, PACKED_PROMPT_VERSION, text)
+                cached = self.cache.get(cache_keys[row_id])
+                if cached is not None:
+                    results[row_id] = cached
+        
+        todo = {row_id: text for row_id, text in texts.items() if row_id not in results}
+        if not todo:
+            return results
+        
+        records = "\n".join(f"### Record {row_id}\n{text.strip()}\n" for row_id, text in todo.items())
+        prompt = f"""
+        Analyze each of the following industrial equipment maintenance records and extract entities and relationships.
+        The records represent equipment hierarchies, failure modes, maintenance strategies, and monitoring systems.
+        Treat every record independently.
+        
+        Return your response as a valid JSON object keyed by record id, with one entry for every record:
+        {{
+            "<record id>": {{
+                "entities": [
+                    {{"name": "entity_name", "type": "entity_type", "properties": {{"key": "value"}}}}
+                ],
+                "relationships": [
+                    {{"source": "source_entity", "target": "target_entity", "type": "relationship_type", "properties": {{"key": "value"}}}}
+                ]
+            }}
+        }}
+        
+        {EXTRACTION_GUIDE}
+        
+        Records to analyze:
+        {records}
+        
+        JSON Response:
+        """
+        
+        completion_tokens_per_row = self._packing_stats["completion_tokens_per_row"]
+        max_tokens = min(int(len(todo) * completion_tokens_per_row * 1.5) + 200, 8000)
+        try:
+            response = self._create_completion(
+                messages=[
+                    {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                model=LLM,
+                temperature=0.1,
+                max_tokens=max_tokens
+            )
+        except Exception as e:
+            logger.error(f"Error extracting packed rows: {e}")
+            return results
+        
+        self._update_packing_stats(response, len(todo))
+        response_text = response.choices[0].message.content.strip()
+        try:
+            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            packed = json.loads(json_match.group()) if json_match else {}
+        except json.JSONDecodeError:
+            logger.warning(f"Malformed JSON in packed response for {len(todo)} rows")
+            packed = {}
+        
+        for row_id in todo:
+            extracted_data = packed.get(row_id) if isinstance(packed, dict) else None
+            if (isinstance(extracted_data, dict)
+                    and isinstance(extracted_data.get("entities", []), list)
+                    and isinstance(extracted_data.get("relationships", []), list)):
+                results[row_id] = extracted_data
+                if self.cache:
+                    self.cache.put(cache_keys[row_id], extracted_data)
+        return results
+    
+    def _update_packing_stats(self, response, rows: int):
+        """Track completion tokens per row so the pack size adapts to the real output size"""
+        with self._packing_lock:
+            stats = self._packing_stats
+            if getattr(response, "usage", None) is not None:
+                observed = response.usage.completion_tokens / rows
+                stats["completion_tokens_per_row"] = 0.7 * stats["completion_tokens_per_row"] + 0.3 * observed
+            if response.choices[0].finish_reason == "length":
+                # Truncated output, make the next packs smaller
+                stats["completion_tokens_per_row"] *= 1.5
+    
+    def _pack_size_fits(self, row_texts: List[str], target_tokens: int) -> bool:
+        """Check whether a pack of rendered rows stays under the target token count"""
+        # About 4 characters per token, the instructions around the guide take roughly 1000 characters
+        prompt_tokens = (len(EXTRACTION_GUIDE) + 1000 + sum(len(text) for text in row_texts)) // 4
+        completion_tokens = len(row_texts) * self._packing_stats["completion_tokens_per_row"]
+        return prompt_tokens + completion_tokens <= target_tokens
+    
+    def _extract_packed_rows(self, pack: List[tuple]) -> List[tuple]:
+        """Extract a pack of (index, row, text) and re-run rows the packed response missed"""
+        results = self.extract_packed({f"row_{index}": text for index, _, text in pack})
+        extracted_rows = []
+        for index, row, text in pack:
+            extracted_data = results.get(f"row_{index}")
+            if extracted_data is None:
+                logger.info(f"Row {index + 1} missing from packed response, extracting it on its own")
+                extracted_data = self.extract_entities_relationships(text)
+            extracted_rows.append((index, extracted_data))
+        return extracted_rows
+    
+    def _extract_rows_packed(self, rows, max_concurrent_requests: int = 1, target_tokens: int = 6000,
+                             max_pack_rows: int = 25):
+        """
+        Extract (index, row) pairs in packed requests, yielding results in row order
+        
+        Rows are added to a pack while the estimated prompt plus completion size stays
+        under target_tokens. Packs are extracted on a thread pool with a bounded look-ahead.
+        """
+        def packs():
+            pack = []
+            for index, row in rows:
+                text = self.render_csv_row(row)
+                if pack and (len(pack) >= max_pack_rows
+                             or not self._pack_size_fits([t for _, _, t in pack] + [text], target_tokens)):
+                    yield pack
+                    pack = []
+                pack.append((index, row, text))
+            if pack:
+                yield pack
+        
+        with ThreadPoolExecutor(max_workers=max(max_concurrent_requests, 1)) as executor:
+            in_flight = deque()
+            for pack in packs():
+                in_flight.append(executor.submit(self._extract_packed_rows, pack))
+                if len(in_flight) >= max(max_concurrent_requests, 1) * 2:
+                    yield from in_flight.popleft().result()
+            
+            while in_flight:
+                yield from in_flight.popleft().result()
+    
+    def enrich_row(self, row: pd.Series, columns: List[str]) -> Dict[str, Any]:
+        """
+        Use the LLM to extract additional entities from free-text columns of a row
+        
+        Args:
+            row: Pandas Series representing a CSV row
+            columns: Names of the free-text columns to analyze
+            
+        Returns:
+            Dictionary containing extracted entities and relationships
+        """
+        values = {normalize_column_name(key): value for key, value in row.items()}
+        free_text = [
+            f"{column}: {values[column]}" for column in columns
+            if column in values and not pd.isna(values[column]) and str(values[column]).strip()
+        ]
+        if not free_text:
+            return {"entities": [], "relationships": []}
+        
+        text_content = "\n".join([
+            f"Main Entity: {values.get('Entity', '')}",
+            f"Related Entity: {values.get('Related Entity', '')}",
+            f"Failure Mode: {values.get('Failure Mode', '')}",
+            *free_text
+        ])
+        return self.extract_entities_relationships(text_content)
+    
     def create_neo4j_constraints(self):
         """Create constraints and indexes in Neo4j for better performance"""
         with self.driver.session() as session:
@@ -188,7 +481,8 @@ class CSVToKnowledgeGraph:
                 "CREATE CONSTRAINT failure_mode_name IF NOT EXISTS FOR (n:FAILURE_MODE) REQUIRE n.name IS UNIQUE",
                 "CREATE CONSTRAINT maintenance_strategy_name IF NOT EXISTS FOR (n:MAINTENANCE_STRATEGY) REQUIRE n.name IS UNIQUE",
                 "CREATE CONSTRAINT detection_method_name IF NOT EXISTS FOR (n:DETECTION_METHOD) REQUIRE n.name IS UNIQUE",
-                "CREATE CONSTRAINT spare_part_name IF NOT EXISTS FOR (n:SPARE_PART) REQUIRE n.name IS UNIQUE"
+                "CREATE CONSTRAINT spare_part_name IF NOT EXISTS FOR (n:SPARE_PART) REQUIRE n.name IS UNIQUE",
+                "CREATE CONSTRAINT condition_data_name IF NOT EXISTS FOR (n:CONDITION_DATA) REQUIRE n.name IS UNIQUE"
             ]
             
             for constraint in constraints:
@@ -201,13 +495,14 @@ class CSVToKnowledgeGraph:
     def create_entity_in_neo4j(self, entity: Dict[str, Any]):
         """Create an entity node in Neo4j"""
         with self.driver.session() as session:
-            entity_type = entity.get('type', 'Entity').upper()
+            entity_type = self._sanitize_type(entity.get('type'))
             entity_name = entity['name']
             properties = entity.get('properties', {})
             
             # Create Cypher query
             cypher = f"""
-            MERGE (e:{entity_type} {{name: $name}})
+            MERGE (e:{SHARED_LABEL} {{name: $name}})
+            SET e:{self._quote(entity_type)}
             SET e += $properties
             RETURN e
             """
@@ -219,72 +514,586 @@ class CSVToKnowledgeGraph:
         with self.driver.session() as session:
             source = relationship['source']
             target = relationship['target']
-            rel_type = relationship['type'].upper().replace(' ', '_')
+            rel_type = self._sanitize_type(relationship['type'], DEFAULT_RELATIONSHIP_TYPE)
             properties = relationship.get('properties', {})
             
-            # Create Cypher query
+            # Endpoints are looked up through the shared label's name constraint
             cypher = f"""
-            MATCH (a {{name: $source}})
-            MATCH (b {{name: $target}})
-            MERGE (a)-[r:{rel_type}]->(b)
+            MATCH (a:{SHARED_LABEL} {{name: $source}})
+            MATCH (b:{SHARED_LABEL} {{name: $target}})
+            MERGE (a)-[r:{self._quote(rel_type)}]->(b)
             SET r += $properties
             RETURN r
             """
             
             session.run(cypher, source=source, target=target, properties=properties)
     
-    def process_csv_to_knowledge_graph(self, csv_file_path: str, batch_size: int = 10):
+    def _sanitize_type(self, value: Optional[str], default: str = DEFAULT_LABEL) -> str:
+        """Turn an LLM supplied entity/relationship type into a label, default when nothing is left of it"""
+        sanitized = re.sub(r'\W+', '_', str(value or '').strip()).upper()
+        return sanitized if sanitized.strip('_') else default
+    
+    @staticmethod
+    def _quote(identifier: str) -> str:
+        """Backtick a sanitized label or type for Cypher, e.g. one starting with a digit like 3PHASE_MOTOR"""
+        return f"`{identifier}`"
+    
+    def write_batch_to_neo4j(self, extracted_batch: List[Dict[str, Any]]) -> Dict[str, int]:
         """
-        Main method to process CSV file and create knowledge graph
+        Write the extracted data of several rows to Neo4j in one transaction
+        
+        Entities are grouped by label and relationships by type, and each group is
+        written with a single parameterised UNWIND ... MERGE statement instead of
+        one auto-commit query per entity and per edge. Every node also gets the
+        shared Entity label, and relationship endpoints are always matched on
+        :Entity {name}, whose uniqueness constraint makes every lookup an index
+        seek whatever label the extractor supplied.
         
         Args:
-            csv_file_path: Path to the CSV file
-            batch_size: Number of rows to process at once
+            extracted_batch: List of extraction results, one per CSV row
+            
+        Returns:
+            Dictionary with the number of entities and relationships written
         """
-        # Read CSV
-        df = self.read_csv(csv_file_path)
-        
-        # Create Neo4j constraints
-        self.create_neo4j_constraints()
+        entities_by_label = defaultdict(list)
+        relationships_by_type = defaultdict(list)
         
-        # Clear existing data (optional - remove this if you want to append)
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
-            logger.info("Cleared existing Neo4j data")
+        for extracted_data in extracted_batch:
+            for entity in extracted_data.get('entities', []):
+                if not entity.get('name'):
+                    logger.warning(f"Skipping entity without name: {entity}")
+                    continue
+                label = self._sanitize_type(entity.get('type'))
+                entities_by_label[label].append({
+                    "name": entity['name'],
+                    "properties": entity.get('properties') or {}
+                })
         
-        # Process CSV rows
-        total_entities = 0
-        total_relationships = 0
+        for extracted_data in extracted_batch:
+            for relationship in extracted_data.get('relationships', []):
+                if not (relationship.get('source') and relationship.get('target') and relationship.get('type')):
+                    logger.warning(f"Skipping incomplete relationship: {relationship}")
+                    continue
+                rel_type = self._sanitize_type(relationship['type'], DEFAULT_RELATIONSHIP_TYPE)
+                relationships_by_type[rel_type].append({
+                    "source": relationship['source'],
+                    "target": relationship['target'],
+                    "properties": relationship.get('properties') or {}
+                })
         
-        for index, row in df.iterrows():
-            logger.info(f"Processing row {index + 1}/{len(df)}")
+        def write_tx(tx):
+            for label, rows in entities_by_label.items():
+                tx.run(f"""
+                UNWIND $rows AS row
+                MERGE (e:{SHARED_LABEL} {{name: row.name}})
+                SET e:{self._quote(label)}
+                SET e += row.properties
+                """, rows=rows)
             
-            # Extract entities and relationships
-            extracted_data = self.process_csv_row(row)
-            
-            # Create entities in Neo4j
+            for rel_type, rows in relationships_by_type.items():
+                tx.run(f"""
+                UNWIND $rows AS row
+                MATCH (a:{SHARED_LABEL} {{name: row.source}})
+                MATCH (b:{SHARED_LABEL} {{name: row.target}})
+                MERGE (a)-[r:{self._quote(rel_type)}]->(b)
+                SET r += row.properties
+                """, rows=rows)
+        
+        with self.driver.session() as session:
+            session.execute_write(write_tx)
+        
+        return {
+            "entities": sum(len(rows) for rows in entities_by_label.values()),
+            "relationships": sum(len(rows) for rows in relationships_by_type.values())
+        }
+    
+    def _write_batch_fallback(self, extracted_batch: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Write a batch item by item so that a single bad entity does not lose the whole batch"""
+        counts = {"entities": 0, "relationships": 0}
+        for extracted_data in extracted_batch:
             for entity in extracted_data.get('entities', []):
                 try:
                     self.create_entity_in_neo4j(entity)
-                    total_entities += 1
+                    counts["entities"] += 1
+                except (ServiceUnavailable, SessionExpired):
+                    raise
                 except Exception as e:
                     logger.error(f"Error creating entity {entity}: {e}")
             
-            # Create relationships in Neo4j
             for relationship in extracted_data.get('relationships', []):
                 try:
                     self.create_relationship_in_neo4j(relationship)
-                    total_relationships += 1
+                    counts["relationships"] += 1
+                except (ServiceUnavailable, SessionExpired):
+                    raise
                 except Exception as e:
                     logger.error(f"Error creating relationship {relationship}: {e}")
+        return counts
+    
+    def retract_from_neo4j(self, nodes: List[tuple], edges: List[tuple]):
+        """
+        Delete relationships and nodes that are no longer produced by any row
+        
+        Properties are not tracked per row, so values that removed rows set on surviving
+        nodes and relationships stay in the graph until the next full rebuild.
+        
+        Args:
+            nodes: (name, label) pairs of orphaned nodes, label may be None
+            edges: (source, type, target) triples of orphaned relationships
+        """
+        edges_by_type = defaultdict(list)
+        for source, rel_type, target in edges:
+            edges_by_type[rel_type].append({"source": source, "target": target})
+        names_by_label = defaultdict(list)
+        for name, label in nodes:
+            names_by_label[label].append(name)
+        
+        def retract_tx(tx):
+            for rel_type, rows in edges_by_type.items():
+                tx.run(f"""
+                UNWIND $rows AS row
+                MATCH (a:{SHARED_LABEL} {{name: row.source}})-[r:{self._quote(rel_type)}]->(b:{SHARED_LABEL} {{name: row.target}})
+                DELETE r
+                """, rows=rows)
+            
+            for label, names in names_by_label.items():
+                node_pattern = f"(n:{self._quote(label or SHARED_LABEL)} {{name: name}})"
+                tx.run(f"""
+                UNWIND $names AS name
+                MATCH {node_pattern}
+                DETACH DELETE n
+                """, names=names)
+        
+        with self.driver.session() as session:
+            session.execute_write(retract_tx)
+        logger.info(f"Retracted {len(edges)} relationships and {len(nodes)} nodes of removed rows")
+    
+    def bump_graph_version(self) -> Optional[str]:
+        """Stamp the graph with a new version so that cached query results are invalidated"""
+        with self.driver.session() as session:
+            record = session.run(f"""
+            MERGE (m:{GRAPH_META_LABEL} {{id: 'graph'}})
+            SET m.version = randomUUID(), m.updated_at = datetime()
+            RETURN m.version AS version
+            """).single()
+        version = record["version"] if record else None
+        logger.info(f"Graph version is now {version}")
+        return version
+    
+    def _row_fingerprints(self, df: pd.DataFrame, extraction_mode: str,
+                          enrich_columns: Optional[List[str]] = None) -> pd.Series:
+        """
+        Fingerprint every row by its cell values and everything that shapes its extraction
+        
+        Besides the extraction mode and the prompt version, the column names, the enrich
+        columns and (in "rules" mode) the column schema are hashed, so changing any of
+        them re-extracts every row on the next incremental run.
+        """
+        settings = [list(map(str, df.columns)), sorted(enrich_columns or [])]
+        if extraction_mode == "rules":
+            settings.append(self.rule_extractor.schema)
+        settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+        return row_hashes.map(lambda h: f"{extraction_mode}-{PROMPT_VERSION}-{settings_hash[:12]}-{h:016x}")
+    
+    def _provenance(self, extracted_data: Dict[str, Any]):
+        """Return the {node name: label} and {(source, type, target)} items produced by a row"""
+        nodes = {}
+        edges = set()
+        for entity in extracted_data.get('entities', []):
+            if entity.get('name'):
+                nodes[entity['name']] = self._sanitize_type(entity.get('type'))
+        for relationship in extracted_data.get('relationships', []):
+            if not (relationship.get('source') and relationship.get('target') and relationship.get('type')):
+                continue
+            nodes.setdefault(relationship['source'], None)
+            nodes.setdefault(relationship['target'], None)
+            rel_type = self._sanitize_type(relationship['type'], DEFAULT_RELATIONSHIP_TYPE)
+            edges.add((relationship['source'], rel_type, relationship['target']))
+        return nodes, edges
+    
+    def _flush_batch(self, extracted_batch: List[Dict[str, Any]], batch_start: float,
+                     fingerprints: Optional[List[str]] = None) -> Dict[str, int]:
+        """Write a batch of extracted rows, record their provenance and log the throughput"""
+        write_start = time.perf_counter()
+        try:
+            counts = self.write_batch_to_neo4j(extracted_batch)
+        except (ServiceUnavailable, SessionExpired):
+            # The database is unreachable, stop here so the journal does not record the batch
+            raise
+        except Exception as e:
+            logger.error(f"Batched write failed, falling back to per-item writes: {e}")
+            counts = self._write_batch_fallback(extracted_batch)
+        
+        if self.state and fingerprints:
+            self.state.add_rows(
+                (fingerprint, *self._provenance(extracted_data))
+                for fingerprint, extracted_data in zip(fingerprints, extracted_batch)
+            )
+        
+        end = time.perf_counter()
+        elapsed = max(end - batch_start, 1e-9)
+        logger.info(
+            f"Wrote batch of {len(extracted_batch)} rows "
+            f"({counts['entities']} entities, {counts['relationships']} relationships) "
+            f"in {end - write_start:.2f}s - {len(extracted_batch) / elapsed:.1f} rows/sec"
+        )
+        return counts
+    
+    def _extract_rows_in_order(self, rows, max_concurrent_requests: int = 1, extract_fn=None):
+        """
+        Extract entities and relationships for (index, row) pairs, yielding results in row order
+        
+        With more than one concurrent request the rows are submitted to a thread pool.
+        Only a bounded window of rows is kept ahead of the consumer, and results are
+        yielded in input order so the resulting graph is deterministic.
+        """
+        extract_fn = extract_fn or self.process_csv_row
+        if max_concurrent_requests <= 1:
+            for index, row in rows:
+                yield index, extract_fn(row)
+            return
+        
+        with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+            in_flight = deque()
+            for index, row in rows:
+                in_flight.append((index, executor.submit(extract_fn, row)))
+                if len(in_flight) >= max_concurrent_requests * 2:
+                    done_index, future = in_flight.popleft()
+                    yield done_index, future.result()
+            
+            while in_flight:
+                done_index, future = in_flight.popleft()
+                yield done_index, future.result()
+    
+    def _extract_rows(self, chunks, extraction_mode: str, max_concurrent_requests: int,
+                      enrich_columns: Optional[List[str]], pack_target_tokens: Optional[int] = None):
+        """Yield (index, extracted_data) for every row of a stream of DataFrame chunks in row order"""
+        if extraction_mode == "llm":
+            rows = (item for chunk in chunks for item in chunk.iterrows())
+            if pack_target_tokens:
+                yield from self._extract_rows_packed(rows, max_concurrent_requests, pack_target_tokens)
+            else:
+                yield from self._extract_rows_in_order(rows, max_concurrent_requests)
+            return
+        
+        if not enrich_columns:
+            for chunk in chunks:
+                yield from zip(chunk.index, self.rule_extractor.extract_rows(chunk))
+            return
+        
+        # Rule extraction runs per chunk, enrichment keeps the request window full across chunks
+        rule_rows = {}
+        
+        def rows():
+            for chunk in chunks:
+                rule_rows.update(zip(chunk.index, self.rule_extractor.extract_rows(chunk)))
+                yield from chunk.iterrows()
+        
+        enriched_rows = self._extract_rows_in_order(
+            rows(), max_concurrent_requests, lambda row: self.enrich_row(row, enrich_columns)
+        )
+        for index, enriched in enriched_rows:
+            extracted_data = rule_rows.pop(index)
+            if enriched.get("failed"):
+                # Retry the whole row later rather than write it without its enrichment
+                yield index, failed_extraction()
+                continue
+            yield index, {
+                "entities": extracted_data["entities"] + enriched.get("entities", []),
+                "relationships": extracted_data["relationships"] + enriched.get("relationships", [])
+            }
+    
+    def read_chunks(self, file_path: str, chunk_size: int = 1000, sheet_name: Optional[str] = None):
+        """Stream a CSV file or Excel sheet in chunks of chunk_size rows"""
+        rows_read = 0
+        for chunk in read_chunks(file_path, chunk_size, sheet_name):
+            rows_read += len(chunk)
+            logger.info(f"Read {rows_read} rows from {file_path}")
+            yield chunk
+    
+    def _delta_chunks(self, chunks, extraction_mode: str, enrich_columns: Optional[List[str]],
+                      known_fingerprints: Optional[set], row_fingerprints: Dict[Any, str], all_fingerprints: set):
+        """
+        Fingerprint every chunk and, in incremental mode, drop rows that were already ingested
+        
+        The fingerprints of the rows passed on are stored in row_fingerprints by row index,
+        the fingerprints of every row of the file are collected in all_fingerprints.
+        """
+        for chunk in chunks:
+            fingerprints = self._row_fingerprints(chunk, extraction_mode, enrich_columns)
+            if known_fingerprints is not None:
+                is_new = [
+                    fingerprint not in known_fingerprints and fingerprint not in all_fingerprints
+                    for fingerprint in fingerprints
+                ]
+                all_fingerprints.update(fingerprints)
+                chunk = chunk[is_new]
+                fingerprints = fingerprints[is_new]
+            row_fingerprints.update(fingerprints.items())
+            if len(chunk):
+                yield chunk
+    
+    def _skip_resumed_rows(self, chunks, last_committed_index: Optional[int], journaled_indexes: set,
+                           failed_indexes: set, row_fingerprints: Dict[Any, str]):
+        """Drop rows that were written or extracted before the run was interrupted, keeping failed rows"""
+        for chunk in chunks:
+            keep = [
+                (last_committed_index is None or index > last_committed_index or index in failed_indexes)
+                and index not in journaled_indexes
+                for index in chunk.index
+            ]
+            for index, kept in zip(chunk.index, keep):
+                # Journaled rows come back from the journal and still need their fingerprint
+                if not kept and index not in journaled_indexes:
+                    row_fingerprints.pop(index, None)
+            chunk = chunk[keep]
+            if len(chunk):
+                yield chunk
+    
+    def _merge_journaled(self, extracted_rows, journaled: Dict[int, Dict[str, Any]]):
+        """Merge journaled extraction results back into the stream of extracted rows in row order"""
+        journaled_rows = sorted(journaled.items())
+        position = 0
+        for index, extracted_data in extracted_rows:
+            while position < len(journaled_rows) and journaled_rows[position][0] < index:
+                yield journaled_rows[position]
+                position += 1
+            yield index, extracted_data
+        yield from journaled_rows[position:]
+    
+    def _run_settings(self, csv_file_path: str, sheet_name: Optional[str], extraction_mode: str,
+                      incremental: bool) -> Dict[str, Any]:
+        """Settings that identify a run in the journal"""
+        file_stat = os.stat(csv_file_path)
+        return {
+            "file": os.path.abspath(csv_file_path),
+            "sheet_name": sheet_name,
+            "size": file_stat.st_size,
+            "mtime": file_stat.st_mtime,
+            "extraction_mode": extraction_mode,
+            "incremental": incremental
+        }
+    
+    def process_csv_to_knowledge_graph(self, csv_file_path: str, batch_size: int = 10,
+                                       max_concurrent_requests: int = 1, extraction_mode: str = "llm",
+                                       enrich_columns: Optional[List[str]] = None, incremental: bool = False,
+                                       chunk_size: int = 1000, sheet_name: Optional[str] = None,
+                                       prefetch_chunks: int = 2, pack_target_tokens: Optional[int] = None,
+                                       resume: bool = False):
+        """
+        Main method to process CSV file and create knowledge graph
+        
+        The file is streamed in chunks: reading, extraction and writing overlap, and only
+        a bounded number of chunks, in-flight requests and pending rows are held in memory.
+        
+        Args:
+            csv_file_path: Path to the CSV file or Excel workbook (.xlsx)
+            batch_size: Number of rows whose extracted data is written to Neo4j in one transaction
+            max_concurrent_requests: Maximum number of extraction requests in flight at once
+            extraction_mode: "llm" to extract every row with the LLM, "rules" to map columns
+                with the column schema
+            enrich_columns: In "rules" mode, free-text columns that are additionally sent to the LLM
+            incremental: Only extract and write new or changed rows and retract the items of
+                deleted rows instead of rebuilding the graph (requires state_path). Only nodes
+                and relationships that no row produces any more are retracted: properties a
+                removed or changed row set on a surviving node or relationship are kept, so run
+                a full rebuild when stale property values matter
+            chunk_size: Number of rows read from the file at a time
+            sheet_name: Worksheet to read from an Excel workbook (defaults to the first sheet)
+            prefetch_chunks: Number of chunks the background reader may read ahead
+            pack_target_tokens: In "llm" mode, send several rows per request and keep each
+                request under roughly this many tokens (None extracts one row per request)
+            resume: Continue an interrupted run of the same file from its last checkpoint
+                (requires journal_path). Rows whose extraction failed are retried, a run with
+                failed rows is left unfinished so that it can be resumed.
+        """
+        if incremental and not self.state:
+            raise ValueError("Incremental ingestion requires a state_path")
+        if resume and not self.journal:
+            raise ValueError("Resuming a run requires a journal_path")
+        if extraction_mode not in ("llm", "rules"):
+            raise ValueError(f"Unknown extraction mode: {extraction_mode}")
+        
+        settings = self._run_settings(csv_file_path, sheet_name, extraction_mode, incremental) if self.journal else None
+        resuming = False
+        if resume:
+            resuming = self.journal.unfinished_run() == settings
+            if not resuming:
+                logger.warning(f"No interrupted run of {csv_file_path} with these settings to resume, starting a new run")
+        
+        journaled = {}
+        last_committed_index = None
+        failed_indexes = set()
+        if resuming:
+            journaled = self.journal.pending_extractions()
+            last_committed_index = self.journal.last_committed_index()
+            failed_indexes = self.journal.failed_rows()
+            logger.info(
+                f"Resuming after row {last_committed_index if last_committed_index is not None else 'none'} "
+                f"with {len(journaled)} journaled extractions and {len(failed_indexes)} failed rows to retry"
+            )
+        elif self.journal:
+            self.journal.start(settings)
+        # Cheap rule-based extraction is simply redone, LLM results are journaled as they arrive
+        journal_extractions = self.journal is not None and (extraction_mode == "llm" or bool(enrich_columns))
+        
+        # Create Neo4j constraints
+        self.create_neo4j_constraints()
+        
+        known_fingerprints = None
+        if incremental and not self.state.is_empty():
+            # Only rows whose fingerprint has not been ingested before need extraction
+            known_fingerprints = self.state.fingerprints()
+            logger.info(f"Delta ingestion against {len(known_fingerprints)} previously ingested rows")
+        elif resuming:
+            logger.info("Keeping the rows written before the interruption")
+        else:
+            # Full rebuild, the first incremental run also starts from an empty graph
+            with self.driver.session() as session:
+                session.run("MATCH (n) DETACH DELETE n")
+                logger.info("Cleared existing Neo4j data")
+            if self.state:
+                self.state.clear()
+        
+        # Stream the file through fingerprinting and extraction
+        chunks = prefetch(self.read_chunks(csv_file_path, chunk_size, sheet_name), prefetch_chunks)
+        row_fingerprints = {}
+        file_fingerprints = set()
+        if self.state:
+            chunks = self._delta_chunks(
+                chunks, extraction_mode, enrich_columns, known_fingerprints, row_fingerprints, file_fingerprints
+            )
+        if resuming:
+            chunks = self._skip_resumed_rows(
+                chunks, last_committed_index, set(journaled), failed_indexes, row_fingerprints
+            )
+        
+        total_entities = 0
+        total_relationships = 0
+        rows_written = 0
+        rows_failed = 0
+        pending = []
+        pending_fingerprints = []
+        batch_start = time.perf_counter()
+        
+        extracted_rows = self._extract_rows(
+            chunks, extraction_mode, max_concurrent_requests, enrich_columns, pack_target_tokens
+        )
+        if journaled:
+            extracted_rows = self._merge_journaled(extracted_rows, journaled)
+        for index, extracted_data in extracted_rows:
+            logger.info(f"Processed row {index + 1}")
+            if extracted_data.get("failed"):
+                # Neither journaled, written nor fingerprinted, a resumed or incremental run extracts the row again
+                logger.warning(f"Extraction of row {index + 1} failed, it is not written")
+                rows_failed += 1
+                if self.journal:
+                    self.journal.record_failure(index)
+                row_fingerprints.pop(index, None)
+                continue
+            if journal_extractions and index not in journaled:
+                self.journal.record_extraction(index, extracted_data)
             
-            # Process in batches to avoid overwhelming the API
-            if (index + 1) % batch_size == 0:
-                logger.info(f"Processed {index + 1} rows so far...")
+            # Extracted entities and relationships arrive in row order
+            pending.append(extracted_data)
+            if self.state:
+                pending_fingerprints.append(row_fingerprints.pop(index))
+            
+            # Write the collected rows to Neo4j in one batch
+            if len(pending) >= batch_size:
+                counts = self._flush_batch(pending, batch_start, pending_fingerprints)
+                if self.journal:
+                    self.journal.commit_batch(index)
+                total_entities += counts["entities"]
+                total_relationships += counts["relationships"]
+                rows_written += len(pending)
+                logger.info(f"Processed {rows_written} rows so far...")
+                pending = []
+                pending_fingerprints = []
+                batch_start = time.perf_counter()
+        
+        if pending:
+            counts = self._flush_batch(pending, batch_start, pending_fingerprints)
+            if self.journal:
+                self.journal.commit_batch(index)
+            total_entities += counts["entities"]
+            total_relationships += counts["relationships"]
+            rows_written += len(pending)
+        
+        # Retract last so that items shared with new or changed rows survive
+        if known_fingerprints is not None:
+            removed_fingerprints = known_fingerprints - file_fingerprints
+            logger.info(
+                f"Delta ingestion: {rows_written} new or changed rows, "
+                f"{len(removed_fingerprints)} removed rows"
+            )
+            if removed_fingerprints:
+                orphan_nodes, orphan_edges = self.state.remove_rows(removed_fingerprints)
+                self.retract_from_neo4j(orphan_nodes, orphan_edges)
         
+        self.bump_graph_version()
+        if rows_failed:
+            logger.warning(
+                f"{rows_failed} rows could not be extracted"
+                + (", run again with resume to retry them" if self.journal else " and are missing from the graph")
+            )
+        elif self.journal:
+            self.journal.finish()
         logger.info(f"Knowledge graph creation completed!")
         logger.info(f"Total entities created: {total_entities}")
         logger.info(f"Total relationships created: {total_relationships}")
+        if self.cache:
+            logger.info(f"Extraction cache: {self.cache.stats()}")
+    
+    def export_for_bulk_import(self, csv_file_path: str, output_dir: str, max_concurrent_requests: int = 1,
+                               extraction_mode: str = "llm", enrich_columns: Optional[List[str]] = None,
+                               chunk_size: int = 1000, sheet_name: Optional[str] = None,
+                               prefetch_chunks: int = 2, pack_target_tokens: Optional[int] = None) -> str:
+        """
+        Extract a file and write neo4j-admin import CSV files instead of writing to Neo4j
+        
+        Use this for first-time loads: the files build a fresh database offline with
+        `neo4j-admin database import full`. Run create_neo4j_constraints once the new
+        database is started. Extraction options are the same as for
+        process_csv_to_knowledge_graph.
+        
+        Args:
+            csv_file_path: Path to the CSV file or Excel workbook (.xlsx)
+            output_dir: Directory for the node and relationship CSV files
+            
+        Returns:
+            The neo4j-admin command that imports the written files
+        """
+        if extraction_mode not in ("llm", "rules"):
+            raise ValueError(f"Unknown extraction mode: {extraction_mode}")
+        
+        exporter = BulkImportExporter(SHARED_LABEL)
+        chunks = prefetch(self.read_chunks(csv_file_path, chunk_size, sheet_name), prefetch_chunks)
+        extracted_rows = self._extract_rows(
+            chunks, extraction_mode, max_concurrent_requests, enrich_columns, pack_target_tokens
+        )
+        rows_failed = 0
+        for index, extracted_data in extracted_rows:
+            if extracted_data.get("failed"):
+                logger.warning(f"Extraction of row {index + 1} failed, it is not exported")
+                rows_failed += 1
+            for entity in extracted_data.get('entities', []):
+                if entity.get('name'):
+                    label = self._sanitize_type(entity.get('type'))
+                    exporter.add_entity(entity['name'], label, entity.get('properties') or {})
+            for relationship in extracted_data.get('relationships', []):
+                if relationship.get('source') and relationship.get('target') and relationship.get('type'):
+                    exporter.add_relationship(
+                        relationship['source'], self._sanitize_type(relationship['type'], DEFAULT_RELATIONSHIP_TYPE),
+                        relationship['target'], relationship.get('properties') or {}
+                    )
+        
+        if rows_failed:
+            logger.warning(f"{rows_failed} rows could not be extracted and are missing from the export")
+        command = BulkImportExporter.import_command(exporter.write(output_dir))
+        logger.info(f"Import with: {command}")
+        return command
     
     def query_knowledge_graph(self, cypher_query: str) -> List[Dict]:
         """Execute a Cypher query on the knowledge graph"""
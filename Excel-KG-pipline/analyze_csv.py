@@ -22,18 +22,29 @@ def main():
     NEO4J_USER = os.environ.get("NEO4J_USER")
     NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
     CSV_FILE_PATH = os.environ.get("CSV_FILE_PATH")
+    EXTRACTION_CACHE_PATH = os.environ.get("EXTRACTION_CACHE_PATH", "extraction_cache.sqlite")
+    EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "llm")
+    INGESTION_STATE_PATH = os.environ.get("INGESTION_STATE_PATH", "ingestion_state.sqlite")
+    INCREMENTAL = os.environ.get("INCREMENTAL", "false").lower() == "true"
+    JOURNAL_PATH = os.environ.get("JOURNAL_PATH", "ingestion_journal.sqlite")
+    RESUME = os.environ.get("RESUME", "false").lower() == "true"
     
         # Initialize the converter
     converter = CSVToKnowledgeGraph(
         groq_api_key=GROQ_API_KEY,
         neo4j_uri=NEO4J_URI,
         neo4j_user=NEO4J_USER,
-        neo4j_password=NEO4J_PASSWORD
+        neo4j_password=NEO4J_PASSWORD,
+        cache_path=EXTRACTION_CACHE_PATH,
+        state_path=INGESTION_STATE_PATH,
+        journal_path=JOURNAL_PATH
     )
     
     try:
         # Process CSV and create knowledge graph
-        converter.process_csv_to_knowledge_graph(CSV_FILE_PATH)
+        converter.process_csv_to_knowledge_graph(
+            CSV_FILE_PATH, extraction_mode=EXTRACTION_MODE, incremental=INCREMENTAL, resume=RESUME
+        )
         
         # Example queries
         print("\n=== Sample Queries ===")
@@ -0,0 +1,103 @@
+import csv
+import json
+import logging
+import os
+from typing import Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+class BulkImportExporter:
+    """
+    Collects extracted entities and relationships and writes them as
+    `neo4j-admin database import` CSV files
+
+    Nodes are de-duplicated by name, which is also their import ID, matching the
+    MERGE on (:Entity {name}) used by the transactional writer. Each node is
+    written to the file of the first label it was extracted with and carries all
+    of its labels. Relationships are de-duplicated by (source, type, target) and
+    relationships whose endpoints were never extracted as entities are dropped,
+    just like the MATCH in the transactional writer drops them.
+    """
+
+    def __init__(self, shared_label: str = "Entity"):
+        self.shared_label = shared_label
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.relationships: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def add_entity(self, name: str, label: str, properties: Dict[str, Any]):
+        node = self.nodes.setdefault(name, {"labels": [label], "properties": {}})
+        if label not in node["labels"]:
+            node["labels"].append(label)
+        node["properties"].update(properties)
+
+    def add_relationship(self, source: str, rel_type: str, target: str, properties: Dict[str, Any]):
+        self.relationships.setdefault((source, rel_type, target), {}).update(properties)
+
+    def write(self, output_dir: str) -> Dict[str, List[str]]:
+        """
+        Write one node file per label and one relationship file per type
+
+        Args:
+            output_dir: Directory for the CSV files, created if missing
+
+        Returns:
+            Dictionary with the written "nodes" and "relationships" file paths
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        nodes_by_label = {}
+        for name, node in self.nodes.items():
+            nodes_by_label.setdefault(node["labels"][0], []).append((name, node))
+
+        relationships_by_type = {}
+        dropped = 0
+        for (source, rel_type, target), properties in self.relationships.items():
+            if source not in self.nodes or target not in self.nodes:
+                dropped += 1
+                continue
+            relationships_by_type.setdefault(rel_type, []).append((source, target, properties))
+        if dropped:
+            logger.warning(f"Dropped {dropped} relationships whose endpoints were not extracted as entities")
+
+        paths = {"nodes": [], "relationships": []}
+        for label, nodes in sorted(nodes_by_label.items()):
+            keys = sorted({key for _, node in nodes for key in node["properties"] if key != "name"})
+            path = os.path.join(output_dir, f"nodes_{label}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["name:ID", ":LABEL", *keys])
+                for name, node in nodes:
+                    labels = ";".join([self.shared_label, *node["labels"]])
+                    properties = node["properties"]
+                    writer.writerow([name, labels, *(_format_value(properties[key]) if key in properties else "" for key in keys)])
+            paths["nodes"].append(path)
+
+        for rel_type, relationships in sorted(relationships_by_type.items()):
+            keys = sorted({key for _, _, properties in relationships for key in properties})
+            path = os.path.join(output_dir, f"relationships_{rel_type}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow([":START_ID", ":END_ID", ":TYPE", *keys])
+                for source, target, properties in relationships:
+                    writer.writerow([source, target, rel_type, *(_format_value(properties[key]) if key in properties else "" for key in keys)])
+            paths["relationships"].append(path)
+
+        logger.info(
+            f"Exported {len(self.nodes)} nodes and {sum(len(r) for r in relationships_by_type.values())} "
+            f"relationships to {output_dir}"
+        )
+        return paths
+
+    @staticmethod
+    def import_command(paths: Dict[str, List[str]], database: str = "neo4j") -> str:
+        """Build the neo4j-admin command that loads the exported files into a new database"""
+        arguments = [f"--nodes={path}" for path in paths["nodes"]]
+        arguments += [f"--relationships={path}" for path in paths["relationships"]]
+        return " ".join(["neo4j-admin database import full", *arguments, database])
@@ -1,13 +1,25 @@
 import pandas as pd
 import json
 import re
-from groq import Groq
-from neo4j import GraphDatabase
+from groq import Groq, AsyncGroq
+from neo4j import GraphDatabase, AsyncGraphDatabase, READ_ACCESS
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
 import os
+import time
+import asyncio
+import threading
 from dotenv import load_dotenv
+from semantic_cache import SemanticQueryCache
+from result_cache import QueryResultCache, is_read_only
+from intent_router import IntentRouter
+from result_compactor import compact_results, COMPACTION_NOTE
+from query_guard import QueryGuard, QueryRejected
+from llm_limiter import AsyncRateLimiter
+from schema_introspector import GraphSchema
+from graph_snapshot import GraphSnapshot
+from entity_links import EntityLinkIndex, HybridRetriever
 
 load_dotenv()
 LLM = "llama-3.3-70b-versatile"
@@ -16,8 +28,29 @@ LLM = "llama-3.3-70b-versatile"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Chat_Logger")
 
+# Version stamp node written by the ingestion pipeline (GroqNeo4jProcessor.GRAPH_META_LABEL)
+GRAPH_META_LABEL = "GraphMeta"
+GRAPH_VERSION_QUERY = f"MATCH (m:{GRAPH_META_LABEL} {{id: 'graph'}}) RETURN m.version AS version"
+
+# Relationships of the entities named in a question, served by the Entity name constraint's index.
+# Each entity gets the same share of rows, as in GraphSnapshot.neighbourhood
+NEIGHBOURHOOD_QUERY = (
+    "UNWIND $names AS name MATCH (n:Entity {name: name}) "
+    "CALL { WITH n MATCH (n)-[r]-(m) WHERE m.name IS NOT NULL "
+    "RETURN startNode(r).name AS source, type(r) AS relationship, endNode(r).name AS target "
+    "ORDER BY source, relationship, target LIMIT $per_entity } "
+    "RETURN source, relationship, target"
+)
+
 class MaintenanceKGChatbot:
-    def __init__(self, groq_api_key: str, neo4j_uri: str, neo4j_user: str, neo4j_password: str):
+    def __init__(self, groq_api_key: str, neo4j_uri: str, neo4j_user: str, neo4j_password: str,
+                 query_cache_path: Optional[str] = None, query_cache_threshold: float = 0.85,
+                 result_cache_max_bytes: int = 64 * 1024 * 1024, version_check_interval: float = 5.0,
+                 result_token_budget: int = 3000, result_top_k: int = 5,
+                 query_timeout: float = 10.0, max_result_rows: int = 1000,
+                 max_estimated_rows: float = 1_000_000, neo4j_pool_size: int = 100,
+                 llm_requests_per_minute: Optional[float] = None, use_graph_snapshot: bool = False,
+                 link_index_path: Optional[str] = None):
         """
         Initialize the Maintenance Knowledge Graph Chatbot
         Args:
@@ -25,61 +58,79 @@ class MaintenanceKGChatbot:
             neo4j_uri: Neo4j database URI
             neo4j_user: Neo4j username
             neo4j_password: Neo4j password
+            query_cache_path: SQLite file persisting the question -> Cypher cache (None keeps it in memory)
+            query_cache_threshold: Minimum question similarity for reusing cached Cypher
+            result_cache_max_bytes: Memory cap of the query result cache
+            version_check_interval: Seconds between checks of the graph version stamp
+            result_token_budget: Estimated token limit of the query results put in the answer prompt
+            result_top_k: Rows kept per group when results are compacted to the budget
+            query_timeout: Transaction timeout in seconds for generated queries
+            max_result_rows: LIMIT injected into generated queries without one
+            max_estimated_rows: Largest planner row estimate accepted for generated queries
+            neo4j_pool_size: Maximum connections in each Neo4j driver's pool
+            llm_requests_per_minute: Request budget of the async LLM client, extra calls wait in line
+            use_graph_snapshot: Answer template questions and quick stats from an in-memory copy of the graph
+            link_index_path: Entity to document chunk link index built by entity_links.py, enables ask_with_documents
         """
         self.groq_client = Groq(api_key=groq_api_key)
-        self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        
-        # Define the schema for the chatbot to understand
-        self.kg_schema = {
-            "entities": {
-                "EQUIPMENT": "Main equipment units (e.g., GasTurbine1)",
-                "SYSTEM": "Sub-systems within equipment (e.g., FuelSystem, LubeOilSystem)",
-                "COMPONENT": "Individual components (e.g., FuelPump, OilFilter)",
-                "FAILURE_MODE": "Types of failures (e.g., Seizing, Clogging, Leak)",
-                "MAINTENANCE_STRATEGY": "Maintenance approaches (PdM, CBM, TBM)",
-                "DETECTION_METHOD": "Monitoring techniques (Vibration monitoring, Pressure monitoring)",
-                "SPARE_PART": "Replacement parts needed for repairs",
-                "CONDITION_DATA": "Monitoring parameters and thresholds"
-            },
-            "relationships": {
-                "HAS_ASSEMBLY": "Equipment contains systems",
-                "HAS_COMPONENT": "Systems contain components", 
-                "HAS_FAILURE_MODE": "Components can have failure modes",
-                "REQUIRES_SPARE_PART": "Failure modes require specific spare parts",
-                "USES_MAINTENANCE_STRATEGY": "Failure modes use maintenance strategies",
-                "DETECTED_BY": "Failure modes are detected by methods",
-                "CAUSES_CONSEQUENCE": "Failure modes cause consequences"
-            }
-        }
+        self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password),
+                                           max_connection_pool_size=neo4j_pool_size)
+        # Async clients for ask_question_stream, created on first use inside the running event loop
+        # and shared by all concurrent questions
+        self._async_config = (groq_api_key, neo4j_uri, (neo4j_user, neo4j_password), neo4j_pool_size)
+        self.llm_limiter = AsyncRateLimiter(llm_requests_per_minute)
+        self.async_groq_client = None
+        self.async_driver = None
+        self.router = IntentRouter(self._load_entity_names)
+        # Cached Cypher is only reused for a question naming the same graph entities
+        self.query_cache = SemanticQueryCache(query_cache_path, threshold=query_cache_threshold,
+                                              match_entities=self.router.match_entities)
+        self.result_cache = QueryResultCache(result_cache_max_bytes)
+        # Labels, relationship types and properties of the live graph, reloaded per graph version
+        self.schema = GraphSchema(self.execute_cypher_query)
+        self.guard = QueryGuard(max_result_rows, query_timeout, max_estimated_rows)
+        self.version_check_interval = version_check_interval
+        self.result_token_budget = result_token_budget
+        self.result_top_k = result_top_k
+        self._graph_version = None
+        self._version_checked_at = float("-inf")
+        self.use_graph_snapshot = use_graph_snapshot
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self.links = EntityLinkIndex(link_index_path) if link_index_path else None
+        self.hybrid = (HybridRetriever(self.links, self.router.match_entities, self._entity_neighbourhood)
+                       if self.links else None)
     
     def close(self):
-        """Close Neo4j connection"""
+        """Close Neo4j connection, the query cache and the link index"""
         self.driver.close()
+        self.query_cache.close()
+        if self.links:
+            self.links.close()
     
-    def generate_cypher_query(self, user_question: str) -> Dict[str, Any]:
-        """
-        Generate Cypher query based on user question using Groq LLaMA
-        
-        Args:
-            user_question: Natural language question from user
-            
-        Returns:
-            Dictionary containing cypher query and explanation
-        """
-        schema_info = f"""
-        Knowledge Graph Schema:
-        
-        Entity Types: {json.dumps(self.kg_schema['entities'], indent=2)}
-        
-        Relationship Types: {json.dumps(self.kg_schema['relationships'], indent=2)}
-        
-        Common Properties:
-        - severity: "Critical", "Major", "Minor"
-        - frequency: maintenance intervals
-        - rul: Remaining Useful Life in hours
-        - consequence: impact of failure
-        - name: entity identifier
-        """
+    def _ensure_async_clients(self):
+        if self.async_driver is None:
+            groq_api_key, neo4j_uri, auth, pool_size = self._async_config
+            self.async_groq_client = AsyncGroq(api_key=groq_api_key)
+            self.async_driver = AsyncGraphDatabase.driver(neo4j_uri, auth=auth, max_connection_pool_size=pool_size)
+    
+    async def aclose(self):
+        """Close the async clients, must run on the event loop that used them"""
+        if self.async_driver is not None:
+            await self.async_driver.close()
+            await self.async_groq_client.close()
+            self.async_driver = None
+            self.async_groq_client = None
+    
+    def _cypher_messages(self, user_question: str) -> List[Dict[str, str]]:
+        """Chat messages asking the LLM to translate a question into Cypher"""
+        # Only the part of the live schema around the entities and labels the question mentions
+        entities = self.router.match_entities(user_question)
+        schema_info = "Knowledge Graph Schema:\n" + self.schema.describe(user_question, [label for _, label in entities])
+        if entities:
+            schema_info += "\nEntities named in the question (use these exact names):\n" + "\n".join(
+                f"- {name} ({label})" for name, label in entities
+            )
         
         prompt = f"""
         You are an expert in Neo4j Cypher queries for industrial equipment maintenance systems.
@@ -103,59 +154,210 @@ class MaintenanceKGChatbot:
         4. Use LIMIT if appropriate to avoid overwhelming results
         5. Consider using COLLECT() for aggregating related items
         6. Handle both specific and general questions
-        
-        Common query patterns:
-        - Equipment breakdown: MATCH (e:EQUIPMENT)-[:HAS_ASSEMBLY]->(s:SYSTEM)-[:HAS_COMPONENT]->(c:COMPONENT)
-        - Failure analysis: MATCH (c:COMPONENT)-[:HAS_FAILURE_MODE]->(fm:FAILURE_MODE)
-        - Spare parts: MATCH (fm:FAILURE_MODE)-[:REQUIRES_SPARE_PART]->(sp:SPARE_PART)
-        - Maintenance: MATCH (fm:FAILURE_MODE)-[:USES_MAINTENANCE_STRATEGY]->(ms:MAINTENANCE_STRATEGY)
+        7. Only use the labels, relationship types and properties listed in the schema
         
         JSON Response:
         """
         
+        return [
+            {"role": "system", "content": "You are an expert in Neo4j Cypher queries for industrial maintenance systems. Always respond with valid JSON only."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _fallback_query(explanation: str, expected_result: str) -> Dict[str, Any]:
+        return {
+            "cypher_query": "MATCH (n) RETURN count(n) as total_nodes LIMIT 1",
+            "explanation": explanation,
+            "expected_result": expected_result,
+            "fallback": True
+        }
+    
+    def _parse_cypher_response(self, response_text: str) -> Dict[str, Any]:
+        # Extract JSON from response
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            json_str = json_match.group()
+            return json.loads(json_str)
+        return self._fallback_query("Fallback query to count total nodes", "Total number of nodes in the graph")
+    
+    def generate_cypher_query(self, user_question: str) -> Dict[str, Any]:
+        """
+        Generate Cypher query based on user question using Groq LLaMA
+        
+        Args:
+            user_question: Natural language question from user
+            
+        Returns:
+            Dictionary containing cypher query and explanation
+        """
         try:
             response = self.groq_client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are an expert in Neo4j Cypher queries for industrial maintenance systems. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._cypher_messages(user_question),
                 model=LLM,
                 temperature=0.1,
                 max_tokens=1000
             )
-            
-            response_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
-            else:
-                return {
-                    "cypher_query": "MATCH (n) RETURN count(n) as total_nodes LIMIT 1",
-                    "explanation": "Fallback query to count total nodes",
-                    "expected_result": "Total number of nodes in the graph"
-                }
+            return self._parse_cypher_response(response.choices[0].message.content.strip())
                 
         except Exception as e:
             logger.error(f"Error generating Cypher query: {e}")
-            return {
-                "cypher_query": "MATCH (n) RETURN count(n) as total_nodes LIMIT 1",
-                "explanation": "Error occurred, showing total nodes as fallback",
-                "expected_result": "Total number of nodes"
-            }
+            return self._fallback_query("Error occurred, showing total nodes as fallback", "Total number of nodes")
     
-    def execute_cypher_query(self, cypher_query: str) -> List[Dict]:
-        """Execute Cypher query on Neo4j"""
+    async def generate_cypher_query_async(self, user_question: str) -> Dict[str, Any]:
+        """Async variant of generate_cypher_query using the async Groq client"""
+        try:
+            # Building the prompt may introspect the graph schema, keep it off the event loop
+            messages = await asyncio.to_thread(self._cypher_messages, user_question)
+            await self.llm_limiter.acquire()
+            response = await self.async_groq_client.chat.completions.create(
+                messages=messages,
+                model=LLM,
+                temperature=0.1,
+                max_tokens=1000
+            )
+            return self._parse_cypher_response(response.choices[0].message.content.strip())
+        
+        except Exception as e:
+            logger.error(f"Error generating Cypher query: {e}")
+            return self._fallback_query("Error occurred, showing total nodes as fallback", "Total number of nodes")
+    
+    def _check_graph_version(self):
+        """Clear the result cache when the ingestion pipeline has written a new graph version"""
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        
         try:
             with self.driver.session() as session:
-                result = session.run(cypher_query)
-                return [record.data() for record in result]
+                record = session.run(GRAPH_VERSION_QUERY).single()
+        except Exception as e:
+            logger.warning(f"Could not read graph version: {e}")
+            return
+        self._apply_graph_version(record["version"] if record else None)
+    
+    async def _check_graph_version_async(self):
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        
+        try:
+            async with self.async_driver.session() as session:
+                result = await session.run(GRAPH_VERSION_QUERY)
+                record = await result.single()
         except Exception as e:
+            logger.warning(f"Could not read graph version: {e}")
+            return
+        self._apply_graph_version(record["version"] if record else None)
+    
+    def _apply_graph_version(self, version: Optional[str]):
+        if version != self._graph_version:
+            logger.info(f"Graph version changed to {version}, clearing result cache")
+            self.result_cache.clear()
+            self.router.invalidate()
+            self.schema.invalidate()
+            self._snapshot = None
+            self._graph_version = version
+    
+    def _get_snapshot(self) -> Optional[GraphSnapshot]:
+        """The in-memory graph snapshot of the current graph version, or None when disabled or unavailable"""
+        if not self.use_graph_snapshot:
+            return None
+        self._check_graph_version()
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                try:
+                    with self.driver.session() as session:
+                        self._snapshot = GraphSnapshot.from_session(session)
+                except Exception as e:
+                    logger.warning(f"Could not load graph snapshot: {e}")
+                    return None
+            return self._snapshot
+    
+    def _template_results(self, query_info: Dict[str, Any]) -> Optional[List[Dict]]:
+        """Answer a router template from the graph snapshot, None if it has to go to Neo4j"""
+        snapshot = self._get_snapshot()
+        if snapshot is None:
+            return None
+        return snapshot.run_template(query_info["intent"], query_info["parameters"])
+    
+    def _load_entity_names(self) -> List[tuple]:
+        """Names and labels of all named nodes, used by the intent router to spot entities in questions"""
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return snapshot.entities()
+        results = self.execute_cypher_query(
+            f"MATCH (n) WHERE n.name IS NOT NULL AND NOT n:{GRAPH_META_LABEL} RETURN n.name AS name, labels(n) AS labels"
+        )
+        return [(row["name"], row["labels"]) for row in results if "name" in row]
+    
+    def _entity_neighbourhood(self, names: List[str], limit: int) -> List[Dict]:
+        """Relationships touching the named entities, from the snapshot when enabled"""
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return snapshot.neighbourhood(names, limit)
+        names = list(dict.fromkeys(names))
+        results = self.execute_cypher_query(NEIGHBOURHOOD_QUERY, {
+            "names": names, "per_entity": max(1, limit // max(1, len(names)))
+        })
+        return [row for row in results if "error" not in row]
+    
+    def execute_cypher_query(self, cypher_query: str, parameters: Optional[Dict[str, Any]] = None,
+                             guarded: bool = False) -> List[Dict]:
+        """
+        Execute Cypher query on Neo4j
+        
+        Results of read-only queries are served from memory until the graph version changes.
+        Guarded (LLM-generated) queries are bounded and plan-checked by the query guard and
+        run in a read-only transaction with a timeout.
+        """
+        if guarded:
+            try:
+                cypher_query = self.guard.prepare(cypher_query)
+            except QueryRejected as e:
+                return [{"error": f"Query rejected: {e}"}]
+        
+        cacheable = is_read_only(cypher_query)
+        if cacheable:
+            self._check_graph_version()
+            cache_key = QueryResultCache.make_key(cypher_query, parameters)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            if guarded:
+                results = self._run_guarded(cypher_query, parameters)
+            else:
+                with self.driver.session() as session:
+                    result = session.run(cypher_query, parameters or {})
+                    results = [record.data() for record in result]
+            if cacheable:
+                self.result_cache.put(cache_key, results)
+            return results
+        except QueryRejected as e:
+            return [{"error": f"Query rejected: {e}"}]
+        except Exception as e:
+            if guarded:
+                self._record_timeout(cypher_query, e)
             logger.error(f"Error executing Cypher query: {e}")
             return [{"error": f"Query execution failed: {str(e)}"}]
     
+    def _run_guarded(self, cypher_query: str, parameters: Optional[Dict[str, Any]]) -> List[Dict]:
+        """Check the plan and run a query in a read-only transaction with the guard's timeout"""
+        with self.driver.session(default_access_mode=READ_ACCESS) as session:
+            with session.begin_transaction(timeout=self.guard.timeout) as tx:
+                plan = tx.run(f"EXPLAIN {cypher_query}", parameters or {}).consume().plan
+                self.guard.check_plan(cypher_query, plan)
+                result = tx.run(cypher_query, parameters or {})
+                return [record.data() for record in result.fetch(self.guard.max_rows)]
+    
+    def _record_timeout(self, cypher_query: str, error: Exception):
+        if "TimedOut" in str(getattr(error, "code", "")):
+            self.guard.reject(cypher_query, "timeout", f"exceeded {self.guard.timeout}s")
+    
     def format_results(self, results: List[Dict], query_info: Dict[str, Any], user_question: str) -> str:
         """
         Format query results into natural language response using Groq LLaMA
@@ -174,14 +376,40 @@ class MaintenanceKGChatbot:
         if "error" in results[0]:
             return f"There was an error processing your question: {results[0]['error']}"
         
+        try:
+            response = self.groq_client.chat.completions.create(
+                messages=self._format_messages(results, query_info, user_question),
+                model=LLM,
+                temperature=0.3,
+                max_tokens=1500
+            )
+            
+            return response.choices[0].message.content.strip()
+            
+        except Exception as e:
+            logger.error(f"Error formatting results: {e}")
+            # Fallback to simple formatting
+            return self._simple_format_results(results, user_question)
+    
+    def _format_messages(self, results: List[Dict], query_info: Dict[str, Any], user_question: str,
+                         more_results: bool = False) -> List[Dict[str, str]]:
+        """Chat messages asking the LLM to turn query results into an answer"""
+        payload = compact_results(results, self.result_token_budget, self.result_top_k)
+        notes = []
+        if payload is not results:
+            logger.info(f"Compacted {len(results)} result rows to fit {self.result_token_budget} tokens")
+            notes.append(COMPACTION_NOTE)
+        if more_results:
+            notes.append("Only the first records are shown, the query matched more. Say the list is not exhaustive.")
+        partial_note = " ".join(notes)
         prompt = f"""
         Convert the following database query results into a natural, conversational response for the user.
         
         Original Question: "{user_question}"
         Query Explanation: {query_info.get('explanation', '')}
         
-        Query Results: {json.dumps(results, indent=2)}
-        
+        Query Results: {json.dumps(payload, default=str)}
+        {partial_note}
         Instructions:
         1. Provide a clear, informative answer in natural language
         2. Organize the information logically
@@ -192,24 +420,10 @@ class MaintenanceKGChatbot:
         
         Response:
         """
-        
-        try:
-            response = self.groq_client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that explains industrial equipment maintenance data in clear, professional language."},
-                    {"role": "user", "content": prompt}
-                ],
-                model=LLM,
-                temperature=0.3,
-                max_tokens=1500
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            logger.error(f"Error formatting results: {e}")
-            # Fallback to simple formatting
-            return self._simple_format_results(results, user_question)
+        return [
+            {"role": "system", "content": "You are a helpful assistant that explains industrial equipment maintenance data in clear, professional language."},
+            {"role": "user", "content": prompt}
+        ]
     
     def _simple_format_results(self, results: List[Dict], user_question: str) -> str:
         """Simple fallback formatting for results"""
@@ -240,20 +454,255 @@ class MaintenanceKGChatbot:
         """
         logger.info(f"Processing question: {user_question}")
         
-        # Generate Cypher query
-        query_info = self.generate_cypher_query(user_question)
-        logger.info(f"Generated query: {query_info['cypher_query']}")
+        # Answer common questions from a template, otherwise reuse the Cypher of a similar,
+        # already answered question or generate it
+        query_info = self.router.route(user_question)
+        from_template = query_info is not None
+        from_cache = False
+        if not from_template:
+            query_info = self.query_cache.lookup(user_question)
+            from_cache = query_info is not None
+        if query_info is None:
+            query_info = self.generate_cypher_query(user_question)
+        source = 'Template' if from_template else 'Cached' if from_cache else 'Generated'
+        logger.info(f"{source} query: {query_info['cypher_query']}")
         
-        # Execute query
-        results = self.execute_cypher_query(query_info['cypher_query'])
+        # Execute query, templates may be answered from the in-memory snapshot
+        results = self._template_results(query_info) if from_template else None
+        if results is None:
+            results = self.execute_cypher_query(
+                query_info['cypher_query'], query_info.get('parameters'), guarded=source != 'Template'
+            )
         logger.info(f"Query returned {len(results)} results")
         
+        # Only cache generated Cypher that ran and found something
+        if source == 'Generated' and not query_info.get("fallback") and results and "error" not in results[0]:
+            self.query_cache.store(user_question, query_info)
+        
         # Format and return response
         response = self.format_results(results, query_info, user_question)
         return response
     
+    def ask_with_documents(self, user_question: str) -> str:
+        """
+        Answer from the graph relationships of the entities named in the question and the
+        manual passages linked to them, with one graph lookup and one LLM call
+        
+        Args:
+            user_question: Natural language question naming at least one graph entity
+            
+        Returns:
+            Natural language answer
+        """
+        if self.hybrid is None:
+            return self.ask_question(user_question)
+        self._check_graph_version()
+        if self._graph_version and self.links.graph_version not in (None, self._graph_version):
+            logger.warning(f"Entity link index was built from graph version {self.links.graph_version}, "
+                           f"the graph is at {self._graph_version}; rebuild it with entity_links.py")
+        
+        context = self.hybrid.retrieve(user_question)
+        if not context["entities"]:
+            # Nothing to link from, answer from the graph alone
+            return self.ask_question(user_question)
+        logger.info(f"Hybrid context: {len(context['facts'])} relationships and "
+                    f"{len(context['chunks'])} passages for {context['entities']}")
+        
+        facts = compact_results(context["facts"], self.result_token_budget, self.result_top_k)
+        passages = "\n\n".join(f"[{chunk['source']}]\n{chunk['text']}" for chunk in context["chunks"])
+        prompt = f"""
+        Answer the question using the knowledge graph facts and the equipment manual passages below.
+        
+        Question: "{user_question}"
+        
+        Knowledge graph relationships of {', '.join(context['entities'])}:
+        {json.dumps(facts, default=str)}
+        
+        Manual passages:
+        {passages or 'No linked passages.'}
+        
+        Instructions:
+        1. Combine both sources; say which facts come from the manual
+        2. Cite passages by their [source] tag
+        3. If the sources do not answer the question, say so
+        
+        Response:
+        """
+        try:
+            response = self.groq_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that explains industrial equipment maintenance data in clear, professional language."},
+                    {"role": "user", "content": prompt}
+                ],
+                model=LLM,
+                temperature=0.3,
+                max_tokens=1500
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Error answering with documents: {e}")
+            return self._simple_format_results(context["facts"], user_question)
+    
+    async def ask_question_stream(self, user_question: str, first_batch_size: int = 50) -> AsyncIterator[str]:
+        """
+        Async variant of ask_question that yields the answer while it is being generated
+        
+        Formatting starts as soon as the first first_batch_size records arrive; the rest of
+        the result is read in the background to fill the result cache and count what was left out.
+        
+        Args:
+            user_question: Natural language question from user
+            first_batch_size: Number of records sent to the LLM before formatting starts
+            
+        Yields:
+            Answer text fragments
+        """
+        started = time.perf_counter()
+        logger.info(f"Processing question: {user_question}")
+        self._ensure_async_clients()
+        
+        # Loading entity names for the router may hit the graph, keep it off the event loop
+        query_info = await asyncio.to_thread(self.router.route, user_question)
+        from_template = query_info is not None
+        from_cache = False
+        if not from_template:
+            # Entity matching and the SQLite cache block as well
+            query_info = await asyncio.to_thread(self.query_cache.lookup, user_question)
+            from_cache = query_info is not None
+        if query_info is None:
+            query_info = await self.generate_cypher_query_async(user_question)
+        source = 'Template' if from_template else 'Cached' if from_cache else 'Generated'
+        logger.info(f"{source} query: {query_info['cypher_query']}")
+        
+        results = await asyncio.to_thread(self._template_results, query_info) if from_template else None
+        remaining = None
+        if results is None:
+            results, remaining = await self._execute_first_batch(
+                query_info['cypher_query'], query_info.get('parameters'), first_batch_size,
+                guarded=source != 'Template'
+            )
+        try:
+            if source == 'Generated' and not query_info.get("fallback") and results and "error" not in results[0]:
+                await asyncio.to_thread(self.query_cache.store, user_question, query_info)
+            
+            if not results or "error" in results[0]:
+                yield self.format_results(results, query_info, user_question)
+                return
+            
+            more_results = remaining is not None and len(results) == first_batch_size
+            streamed = False
+            try:
+                await self.llm_limiter.acquire()
+                stream = await self.async_groq_client.chat.completions.create(
+                    messages=self._format_messages(results, query_info, user_question, more_results),
+                    model=LLM,
+                    temperature=0.3,
+                    max_tokens=1500,
+                    stream=True
+                )
+                async for chunk in stream:
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        if not streamed:
+                            logger.info(f"First answer token after {time.perf_counter() - started:.2f}s")
+                            streamed = True
+                        yield token
+            except Exception as e:
+                logger.error(f"Error formatting results: {e}")
+                if not streamed:
+                    yield self._simple_format_results(results, user_question)
+            
+            if remaining is not None:
+                total = await remaining
+                if total > len(results):
+                    yield f"\n\n... and {total - len(results)} more results."
+        finally:
+            if remaining is not None and not remaining.done():
+                remaining.cancel()
+    
+    async def _execute_first_batch(self, cypher_query: str, parameters: Optional[Dict[str, Any]],
+                                   first_batch_size: int, guarded: bool = False):
+        """
+        Run a query on the async driver and return its first records without waiting for the rest
+        
+        Guarded queries go through the query guard like in execute_cypher_query.
+        
+        Returns:
+            (first records, task reading the remaining records and returning the total count or None
+            when the full result came from the result cache)
+        """
+        if guarded:
+            try:
+                cypher_query = self.guard.prepare(cypher_query)
+            except QueryRejected as e:
+                return [{"error": f"Query rejected: {e}"}], None
+        
+        cacheable = is_read_only(cypher_query)
+        cache_key = None
+        if cacheable:
+            await self._check_graph_version_async()
+            cache_key = QueryResultCache.make_key(cypher_query, parameters)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached, None
+        
+        session = self.async_driver.session(default_access_mode=READ_ACCESS) if guarded else self.async_driver.session()
+        tx = None
+        try:
+            if guarded:
+                tx = await session.begin_transaction(timeout=self.guard.timeout)
+                explain = await tx.run(f"EXPLAIN {cypher_query}", parameters or {})
+                self.guard.check_plan(cypher_query, (await explain.consume()).plan)
+                result = await tx.run(cypher_query, parameters or {})
+            else:
+                result = await session.run(cypher_query, parameters or {})
+            records = await result.fetch(first_batch_size)
+        except Exception as e:
+            if tx is not None:
+                await tx.close()
+            await session.close()
+            if isinstance(e, QueryRejected):
+                return [{"error": f"Query rejected: {e}"}], None
+            if guarded:
+                self._record_timeout(cypher_query, e)
+            logger.error(f"Error executing Cypher query: {e}")
+            return [{"error": f"Query execution failed: {str(e)}"}], None
+        
+        results = [record.data() for record in records]
+        logger.info(f"Query returned {len(results)} results in the first batch")
+        remaining = asyncio.create_task(self._drain_results(session, tx, result, list(results), cache_key))
+        return results, remaining
+    
+    async def _drain_results(self, session, tx, result, results: List[Dict], cache_key: Optional[str]) -> int:
+        try:
+            async for record in result:
+                results.append(record.data())
+                if tx is not None and len(results) >= self.guard.max_rows:
+                    break
+            if cache_key is not None:
+                self.result_cache.put(cache_key, results)
+            return len(results)
+        except Exception as e:
+            logger.warning(f"Could not read the remaining query results: {e}")
+            return 0
+        finally:
+            if tx is not None:
+                await tx.close()
+            await session.close()
+    
     def get_quick_stats(self) -> Dict[str, Any]:
         """Get quick statistics about the knowledge graph"""
+        snapshot = self._get_snapshot()
+        if snapshot is not None:
+            return {
+                "total_equipment": snapshot.count("EQUIPMENT"),
+                "total_systems": snapshot.count("SYSTEM"),
+                "total_components": snapshot.count("COMPONENT"),
+                "total_failure_modes": snapshot.count("FAILURE_MODE"),
+                "critical_failures": snapshot.count("FAILURE_MODE", severity="Critical"),
+                "total_spare_parts": snapshot.count("SPARE_PART")
+            }
+        
         stats_queries = {
             "total_equipment": "MATCH (n:EQUIPMENT) RETURN count(n) as count",
             "total_systems": "MATCH (n:SYSTEM) RETURN count(n) as count",
@@ -273,6 +722,12 @@ class MaintenanceKGChatbot:
                 
         return stats
 
+async def print_answer(chatbot: MaintenanceKGChatbot, question: str):
+    """Print the answer to a question as it streams in"""
+    async for token in chatbot.ask_question_stream(question):
+        print(token, end="", flush=True)
+    print("\n")
+
 def main():
     """Example usage of the chatbot"""
     # Configuration
@@ -280,6 +735,7 @@ def main():
     NEO4J_URI = "bolt://localhost:7687" #os.environ.get("NEO4J_URI", "bolt://localhost:7687")
     NEO4J_USER = os.environ.get("NEO4J_USER")
     NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD")
+    QUERY_CACHE_PATH = os.environ.get("QUERY_CACHE_PATH", "query_cache.sqlite")
     
     print(GROQ_API_KEY, NEO4J_URI)
     # Initialize chatbot
@@ -287,13 +743,21 @@ def main():
         groq_api_key=GROQ_API_KEY,
         neo4j_uri=NEO4J_URI,
         neo4j_user=NEO4J_USER,
-        neo4j_password=NEO4J_PASSWORD
+        neo4j_password=NEO4J_PASSWORD,
+        query_cache_path=QUERY_CACHE_PATH,
+        use_graph_snapshot=os.environ.get("USE_GRAPH_SNAPSHOT", "false").lower() == "true",
+        link_index_path=os.environ.get("ENTITY_LINK_INDEX")
     )
     
+    # One event loop for the whole session, the async Neo4j driver is bound to it
+    loop = asyncio.new_event_loop()
     try:
         print("=== Industrial Equipment Maintenance Chatbot ===")
         print("Ask me questions about your equipment, failures, maintenance, spare parts, etc.")
-        print("Type 'stats' for quick statistics, 'quit' to exit\n")
+        print("Type 'stats' for quick statistics, 'quit' to exit")
+        if chatbot.links:
+            print("Start a question with 'docs:' to include the linked manual passages")
+        print()
         
         # Show initial stats
         stats = chatbot.get_quick_stats()
@@ -324,19 +788,32 @@ def main():
                 print("\nKnowledge Graph Statistics:")
                 for stat_name, count in stats.items():
                     print(f"  {stat_name.replace('_', ' ').title()}: {count}")
+                cache_stats = chatbot.query_cache.stats()
+                print(f"  Query Cache Hit Rate: {cache_stats['hit_rate']:.0%} "
+                      f"({cache_stats['hits']} hits, {cache_stats['entries']} cached questions)")
+                router_stats = chatbot.router.stats()
+                print(f"  Template Hit Rate: {router_stats['hit_rate']:.0%} ({router_stats['hits']} hits)")
+                guard_stats = chatbot.guard.stats()
+                print(f"  Rejected Queries: {guard_stats['rejections']} {guard_stats['by_reason'] or ''}")
                 print()
                 continue
             elif not user_input:
                 continue
+            elif user_input.lower().startswith("docs:"):
+                print(f"\n📋 Answer:")
+                print(chatbot.ask_with_documents(user_input[5:].strip()), "\n")
+                print("-" * 80)
+                continue
             
-            print(f"\n🤖 Processing your question...")
-            response = chatbot.ask_question(user_input)
-            print(f"\n📋 Answer:\n{response}\n")
+            print(f"\n📋 Answer:")
+            loop.run_until_complete(print_answer(chatbot, user_input))
             print("-" * 80)
             
     except KeyboardInterrupt:
         print("\nChatbot stopped.")
     finally:
+        loop.run_until_complete(chatbot.aclose())
+        loop.close()
         chatbot.close()
 
 if __name__ == "__main__":
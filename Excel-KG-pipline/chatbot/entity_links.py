@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+from dotenv import load_dotenv
+from intent_router import entity_aliases, IGNORED_LABELS
+
+logger = logging.getLogger("Chat_Logger")
+
+# Aliases of this length or shorter (e.g. "pdm") must be a whole word of the chunk
+SHORT_ALIAS = 4
+
+
+class EntityLinkIndex:
+    """
+    Inverted index from knowledge graph entities to the document chunks that mention them
+
+    Built offline by build(): every chunk is scanned once for the aliases of every entity
+    (matched like the intent router matches questions, ignoring case, spaces and
+    punctuation) and the chunk texts are stored next to the links, so a question's
+    entities resolve to their passages with a single SQLite query and no embedding call.
+    The graph version the links were built from is kept to detect a stale index.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file of the index
+        """
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, source TEXT, text TEXT);"
+            "CREATE TABLE IF NOT EXISTS links (entity TEXT, chunk_id INTEGER, mentions INTEGER, "
+            "PRIMARY KEY (entity, chunk_id)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _alias_map(entities: Iterable[Tuple[str, List[str]]]) -> Dict[str, List[str]]:
+        aliases = {}
+        for name, labels in entities:
+            if name and any(label not in IGNORED_LABELS for label in labels):
+                for alias in entity_aliases(name):
+                    aliases.setdefault(alias, []).append(name)
+        return aliases
+
+    @staticmethod
+    def find_mentions(text: str, aliases: Dict[str, List[str]], max_alias_length: int) -> Counter:
+        """Count the entity mentions in a text, "Gas Turbine 1" and "gas-turbine1" both match GasTurbine1"""
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        mentions = Counter()
+        for start in range(len(words)):
+            joined = ""
+            for end in range(start, len(words)):
+                joined += words[end]
+                if len(joined) > max_alias_length:
+                    break
+                if joined in aliases and (end == start or len(joined) > SHORT_ALIAS):
+                    mentions.update(aliases[joined])
+        return mentions
+
+    def build(self, entities: Iterable[Tuple[str, List[str]]], chunks: Iterable[Tuple[str, str]],
+              graph_version: Optional[str] = None) -> Dict[str, int]:
+        """
+        Replace the index with the links between the given entities and chunks
+
+        Args:
+            entities: (name, labels) of the graph's named nodes
+            chunks: (source, text) of the document chunks
+            graph_version: Version stamp of the graph the entities were read from
+
+        Returns:
+            Counts of chunks, links and linked entities
+        """
+        aliases = self._alias_map(entities)
+        max_alias_length = max(map(len, aliases), default=0)
+        chunk_rows, link_rows = [], []
+        for chunk_id, (source, text) in enumerate(chunks):
+            chunk_rows.append((chunk_id, source, text))
+            link_rows.extend(
+                (name, chunk_id, count)
+                for name, count in self.find_mentions(text, aliases, max_alias_length).items()
+            )
+
+        with self._lock:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM links")
+            self.conn.executemany("INSERT INTO chunks VALUES (?, ?, ?)", chunk_rows)
+            self.conn.executemany("INSERT INTO links VALUES (?, ?, ?)", link_rows)
+            self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                  [("graph_version", graph_version), ("built_at", str(time.time()))])
+            self.conn.commit()
+        stats = {"chunks": len(chunk_rows), "links": len(link_rows),
+                 "entities": len({name for name, _, _ in link_rows})}
+        logger.info(f"Built entity link index: {stats}")
+        return stats
+
+    @property
+    def graph_version(self) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'graph_version'").fetchone()
+        return row[0] if row else None
+
+    def lookup(self, names: List[str], per_entity: int = 3, max_chunks: int = 6) -> List[Dict[str, Any]]:
+        """
+        Chunks linked to the named entities, those mentioning the most entities first
+
+        Args:
+            names: Entity names
+            per_entity: Chunks kept per entity, those mentioning it most often
+            max_chunks: Chunks returned in total
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT l.entity, l.mentions, c.id, c.source, c.text FROM ("
+                "  SELECT entity, chunk_id, mentions, ROW_NUMBER() OVER ("
+                "    PARTITION BY entity ORDER BY mentions DESC, chunk_id) AS rank"
+                f"  FROM links WHERE entity IN ({','.join('?' * len(names))})"
+                ") l JOIN chunks c ON c.id = l.chunk_id WHERE l.rank <= ?",
+                [*names, per_entity]
+            ).fetchall()
+
+        chunks: Dict[int, Dict[str, Any]] = {}
+        for entity, mentions, chunk_id, source, text in rows:
+            chunk = chunks.setdefault(chunk_id, {"source": source, "text": text, "entities": [], "mentions": 0})
+            chunk["entities"].append(entity)
+            chunk["mentions"] += mentions
+        ranked = sorted(chunks.values(), key=lambda c: (len(c["entities"]), c["mentions"]), reverse=True)
+        return ranked[:max_chunks]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            chunks = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            links, entities = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT entity) FROM links").fetchone()
+        return {"chunks": chunks, "links": links, "entities": entities}
+
+    def close(self):
+        self.conn.close()
+
+
+class HybridRetriever:
+    """
+    Graph facts and document passages for the entities named in a question
+
+    Entities are spotted with the intent router's matcher, their relationships are read
+    from the graph in one query (or the in-memory snapshot) and their passages from the
+    EntityLinkIndex, without generating Cypher or embedding the question.
+    """
+
+    def __init__(self, links: EntityLinkIndex, match_entities: Callable[[str], List[Tuple[str, str]]],
+                 neighbourhood: Callable[[List[str], int], List[Dict[str, Any]]],
+                 max_facts: int = 50, max_chunks: int = 6):
+        """
+        Args:
+            links: Entity to chunk link index
+            match_entities: Returns (name, label) of the entities named in a question
+            neighbourhood: Returns relationship rows touching the named entities, at most limit rows
+            max_facts: Relationship rows returned per question
+            max_chunks: Document chunks returned per question
+        """
+        self.links = links
+        self.match_entities = match_entities
+        self.neighbourhood = neighbourhood
+        self.max_facts = max_facts
+        self.max_chunks = max_chunks
+
+    def retrieve(self, question: str) -> Dict[str, Any]:
+        """Return the matched entities, their graph relationships and their linked chunks"""
+        names = list(dict.fromkeys(name for name, _ in self.match_entities(question)))
+        if not names:
+            return {"entities": [], "facts": [], "chunks": []}
+        return {
+            "entities": names,
+            "facts": self.neighbourhood(names, self.max_facts),
+            "chunks": self.links.lookup(names, max_chunks=self.max_chunks),
+        }
+
+
+def split_text_files(paths: List[str], chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Tuple[str, str]]:
+    """(source, text) chunks of text files, split like the document RAG app splits its PDFs"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            texts = splitter.split_text(f.read())
+        chunks.extend((f"{os.path.basename(path)}#{i}", text) for i, text in enumerate(texts))
+    return chunks
+
+
+def main():
+    """Link the graph's entities to the chunks of extracted manual text (see utils.pdf_to_text_file)"""
+    from neo4j import GraphDatabase
+    from chatbot import GRAPH_META_LABEL, GRAPH_VERSION_QUERY
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the entity to document chunk link index")
+    parser.add_argument("texts", nargs="+", help="Text files of the documents")
+    parser.add_argument("--index", default=os.environ.get("ENTITY_LINK_INDEX", "entity_links.sqlite"))
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    driver = GraphDatabase.driver(os.environ.get("NEO4J_URI", "bolt://localhost:7687"),
+                                  auth=(os.environ.get("NEO4J_USER"), os.environ.get("NEO4J_PASSWORD")))
+    try:
+        with driver.session() as session:
+            entities = [
+                (record["name"], record["labels"]) for record in session.run(
+                    f"MATCH (n) WHERE n.name IS NOT NULL AND NOT n:{GRAPH_META_LABEL} "
+                    "RETURN n.name AS name, labels(n) AS labels")
+            ]
+            version = session.run(GRAPH_VERSION_QUERY).single()
+    finally:
+        driver.close()
+
+    links = EntityLinkIndex(args.index)
+    try:
+        stats = links.build(entities, split_text_files(args.texts, args.chunk_size, args.chunk_overlap),
+                            version["version"] if version else None)
+        print(f"Linked {stats['entities']} of {len(entities)} entities to {stats['chunks']} chunks "
+              f"({stats['links']} links) in {args.index}")
+    finally:
+        links.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import sys
+import json
+import logging
+from array import array
+from typing import Dict, List, Any, Optional, Iterable, Set, Tuple
+
+logger = logging.getLogger("Chat_Logger")
+
+IGNORED_LABELS = ("Entity", "GraphMeta")
+HIERARCHY = ("HAS_ASSEMBLY", "HAS_COMPONENT")
+
+NODES_QUERY = (
+    "MATCH (n) WHERE n.name IS NOT NULL AND NOT n:GraphMeta "
+    "RETURN n.name AS name, labels(n) AS labels, properties(n) AS properties"
+)
+EDGES_QUERY = (
+    "MATCH (a)-[r]->(b) WHERE a.name IS NOT NULL AND b.name IS NOT NULL "
+    "RETURN a.name AS source, type(r) AS type, b.name AS target, properties(r) AS properties"
+)
+
+# Rows of the intent router templates are capped like their Cypher LIMIT
+TEMPLATE_LIMIT = 200
+
+
+def _build_csr(node_count: int, sources: array, targets: array) -> Tuple[array, array]:
+    """Return (offsets, edge indexes) grouping the edges by source node"""
+    offsets = array("I", [0]) * (node_count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    cursor = array("I", offsets)
+    edges = array("I", [0]) * len(sources)
+    for edge, source in enumerate(sources):
+        edges[cursor[source]] = edge
+        cursor[source] += 1
+    return offsets, edges
+
+
+def _distinct(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop repeated rows like RETURN DISTINCT, keeping the first of each"""
+    seen = set()
+    unique = []
+    for row in rows:
+        key = json.dumps(row, sort_keys=True, default=str)
+        if key not in seen:
+            seen.add(key)
+            unique.append(row)
+    return unique
+
+
+class GraphSnapshot:
+    """
+    Read-only in-memory copy of the knowledge graph in compressed sparse row form
+
+    Node names are interned and mapped to integer ids; relationship types are small
+    integer codes and so are label sets, as one name can carry several labels (e.g. both
+    DETECTION_METHOD and CONDITION_DATA), and label filters test membership in the set. Outgoing and incoming edges are kept in two CSR indexes over
+    array-backed edge lists, so hierarchy walks are plain array reads. Properties are
+    kept only for nodes and edges that have more than a name.
+
+    run_template() answers the intent router's templates with the same distinct rows their
+    Cypher returns, and count() serves the quick statistics. The snapshot is immutable: the
+    owner builds a new one when the graph version changes.
+    """
+
+    def __init__(self, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            nodes: Records with name, labels and properties
+            edges: Records with source and target names, type and properties
+        """
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.label_sets: List[Tuple[str, ...]] = []
+        self.type_names: List[str] = []
+        self.node_labels = array("H")
+        self.node_properties: Dict[int, Dict[str, Any]] = {}
+        self.edge_properties: Dict[int, Dict[str, Any]] = {}
+        label_set_codes: Dict[Tuple[str, ...], int] = {}
+        type_codes: Dict[str, int] = {}
+
+        for node in nodes:
+            # Kept in the order Neo4j lists them, the first one is the node's type in the templates
+            labels = tuple(l for l in node["labels"] if l not in IGNORED_LABELS)
+            if not labels or node["name"] in self.ids:
+                continue
+            node_id = len(self.names)
+            name = sys.intern(str(node["name"]))
+            self.names.append(name)
+            self.ids[name] = node_id
+            self.node_labels.append(label_set_codes.setdefault(labels, len(label_set_codes)))
+            properties = {k: v for k, v in (node.get("properties") or {}).items() if k != "name"}
+            if properties:
+                self.node_properties[node_id] = properties
+        self.label_sets = list(label_set_codes)
+        # Label -> codes of the label sets containing it
+        self._label_codes: Dict[str, Set[int]] = {}
+        for code, labels in enumerate(self.label_sets):
+            for label in labels:
+                self._label_codes.setdefault(label, set()).add(code)
+
+        sources, targets, types = array("I"), array("I"), array("H")
+        for edge in edges:
+            source, target = self.ids.get(edge["source"]), self.ids.get(edge["target"])
+            if source is None or target is None:
+                continue
+            if edge.get("properties"):
+                self.edge_properties[len(sources)] = edge["properties"]
+            sources.append(source)
+            targets.append(target)
+            types.append(type_codes.setdefault(edge["type"], len(type_codes)))
+        self.type_names = list(type_codes)
+        self.sources, self.targets, self.types = sources, targets, types
+        self._type_codes = type_codes
+
+        self.out_offsets, self.out_edges = _build_csr(len(self.names), sources, targets)
+        self.in_offsets, self.in_edges = _build_csr(len(self.names), targets, sources)
+        logger.info(f"Built graph snapshot: {len(self.names)} nodes, {len(sources)} edges")
+
+    @classmethod
+    def from_session(cls, session) -> "GraphSnapshot":
+        """Load every named node and the relationships between them from a Neo4j session"""
+        nodes = [record.data() for record in session.run(NODES_QUERY)]
+        edges = [record.data() for record in session.run(EDGES_QUERY)]
+        return cls(nodes, edges)
+
+    # Basic lookups
+
+    def label(self, node_id: int) -> str:
+        """First label of a node, the one the intent router and the templates' type column use"""
+        return self.label_sets[self.node_labels[node_id]][0]
+
+    def labels(self, node_id: int) -> Tuple[str, ...]:
+        return self.label_sets[self.node_labels[node_id]]
+
+    def has_label(self, node_id: int, label: str) -> bool:
+        return self.node_labels[node_id] in self._label_codes.get(label, ())
+
+    def prop(self, node_id: int, key: str) -> Any:
+        return self.node_properties.get(node_id, {}).get(key)
+
+    def entities(self) -> List[Tuple[str, List[str]]]:
+        """(name, labels) of every node, in the format the intent router loads"""
+        return [(name, list(self.labels(i))) for i, name in enumerate(self.names)]
+
+    def _type_codes_for(self, types: Optional[Iterable[str]]) -> Optional[Set[int]]:
+        if types is None:
+            return None
+        return {self._type_codes[t] for t in types if t in self._type_codes}
+
+    def out(self, node_id: int, types: Optional[Iterable[str]] = None,
+            label: Optional[str] = None) -> List[Tuple[int, int]]:
+        """(target, edge) pairs of outgoing edges, optionally filtered by type and target label"""
+        codes = self._type_codes_for(types)
+        label_codes = self._label_codes.get(label, set()) if label else None
+        pairs = []
+        for i in range(self.out_offsets[node_id], self.out_offsets[node_id + 1]):
+            edge = self.out_edges[i]
+            target = self.targets[edge]
+            if (codes is None or self.types[edge] in codes) and (label_codes is None or self.node_labels[target] in label_codes):
+                pairs.append((target, edge))
+        return pairs
+
+    def incoming(self, node_id: int, types: Optional[Iterable[str]] = None,
+                 label: Optional[str] = None) -> List[Tuple[int, int]]:
+        """(source, edge) pairs of incoming edges, optionally filtered by type and source label"""
+        codes = self._type_codes_for(types)
+        label_codes = self._label_codes.get(label, set()) if label else None
+        pairs = []
+        for i in range(self.in_offsets[node_id], self.in_offsets[node_id + 1]):
+            edge = self.in_edges[i]
+            source = self.sources[edge]
+            if (codes is None or self.types[edge] in codes) and (label_codes is None or self.node_labels[source] in label_codes):
+                pairs.append((source, edge))
+        return pairs
+
+    def descend(self, node_id: int, types: Iterable[str], min_depth: int, max_depth: int) -> List[int]:
+        """Nodes reachable over the given edge types within min_depth..max_depth hops"""
+        types = list(types)
+        reached, seen, frontier = [], {node_id}, [node_id]
+        if min_depth == 0:
+            reached.append(node_id)
+        for depth in range(1, max_depth + 1):
+            following = []
+            for current in frontier:
+                for target, _ in self.out(current, types):
+                    if target not in seen:
+                        seen.add(target)
+                        following.append(target)
+            if depth >= min_depth:
+                reached.extend(following)
+            frontier = following
+        return reached
+
+    def neighbourhood(self, names: Iterable[str], limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Relationships touching the named nodes as (source, relationship, target) rows
+
+        Every requested name gets limit // len(names) rows (at least one), the first ones by
+        source, relationship and target, like the chatbot's NEIGHBOURHOOD_QUERY.
+        """
+        names = list(dict.fromkeys(names))
+        per_entity = max(1, limit // max(1, len(names)))
+        rows = []
+        for name in names:
+            node_id = self.ids.get(name)
+            if node_id is None:
+                continue
+            edges = [(node_id, target, edge) for target, edge in self.out(node_id)]
+            edges += [(source, node_id, edge) for source, edge in self.incoming(node_id)]
+            node_rows = sorted(
+                ({"source": self.names[source], "relationship": self.type_names[self.types[edge]],
+                  "target": self.names[target]} for source, target, edge in edges),
+                key=lambda row: (row["source"], row["relationship"], row["target"])
+            )
+            rows.extend(node_rows[:per_entity])
+        return rows
+
+    def count(self, label: str, **properties) -> int:
+        """Number of nodes with a label and the given property values"""
+        codes = self._label_codes.get(label)
+        if not codes:
+            return 0
+        return sum(
+            1 for i, label_set in enumerate(self.node_labels)
+            if label_set in codes and all(self.prop(i, k) == v for k, v in properties.items())
+        )
+
+    # Intent router templates
+
+    def _failure_mode_pairs(self, name: Optional[str], severity: Optional[str]) -> Optional[List[Tuple[int, int]]]:
+        """(component, failure mode) pairs like the router's FROM_* match clauses"""
+        if name is None:
+            pairs = [
+                (source, target) for source, target, code in zip(self.sources, self.targets, self.types)
+                if self.type_names[code] == "HAS_FAILURE_MODE" and self.has_label(target, "FAILURE_MODE")
+            ]
+        else:
+            node_id = self.ids.get(name)
+            if node_id is None:
+                return None
+            if self.label(node_id) == "FAILURE_MODE":
+                pairs = [(c, node_id) for c, _ in self.incoming(node_id, ["HAS_FAILURE_MODE"])]
+            else:
+                pairs = [
+                    (c, fm) for c in self.descend(node_id, HIERARCHY, 0, 2)
+                    for fm, _ in self.out(c, ["HAS_FAILURE_MODE"], "FAILURE_MODE")
+                ]
+        if severity is not None:
+            pairs = [(c, fm) for c, fm in pairs if self.prop(fm, "severity") == severity]
+        return list(dict.fromkeys(pairs))
+
+    def _linked_names(self, node_id: int, rel_type: str, label: str) -> List[str]:
+        return list(dict.fromkeys(self.names[t] for t, _ in self.out(node_id, [rel_type], label)))
+
+    def run_template(self, intent: str, parameters: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer an intent router template from the snapshot
+
+        Returns:
+            The rows the template's Cypher would return, or None when the snapshot cannot
+            answer (unknown intent or entity) and the query should go to Neo4j
+        """
+        name = parameters.get("name")
+        severity = parameters.get("severity")
+        names = self.names
+
+        if intent == "equipment_breakdown":
+            node_id = self.ids.get(name)
+            if node_id is None:
+                return None
+            rows = _distinct(
+                {"parent": names[parent], "part": names[part], "type": self.label(part)}
+                for part in self.descend(node_id, HIERARCHY, 1, 2)
+                for parent, _ in self.incoming(part, HIERARCHY)
+            )
+            return sorted(rows, key=lambda r: (r["parent"], r["part"]))[:TEMPLATE_LIMIT]
+
+        if intent == "reverse_lookup":
+            node_id = self.ids.get(name)
+            if node_id is None:
+                return None
+            rows = _distinct(
+                {"component": names[c], "failure_mode": names[fm], "severity": self.prop(fm, "severity"),
+                 "relationship": self.type_names[self.types[edge]]}
+                for fm, edge in self.incoming(node_id, label="FAILURE_MODE")
+                for c, _ in self.incoming(fm, ["HAS_FAILURE_MODE"])
+            )
+            return sorted(rows, key=lambda r: (r["component"], r["failure_mode"], r["relationship"]))[:TEMPLATE_LIMIT]
+
+        if "name" not in parameters and intent != "failure_modes":
+            return self._global_template(intent)
+
+        pairs = self._failure_mode_pairs(name, severity)
+        if pairs is None:
+            return None
+        rows = []
+        for c, fm in pairs:
+            row = {"component": names[c], "failure_mode": names[fm]}
+            if intent == "failure_modes":
+                row.update(severity=self.prop(fm, "severity"), consequence=self.prop(fm, "consequence"),
+                           rul=self.prop(fm, "rul"))
+                rows.append(row)
+            elif intent == "spare_parts":
+                spare_parts = self._linked_names(fm, "REQUIRES_SPARE_PART", "SPARE_PART")
+                if spare_parts:
+                    rows.append({**row, "severity": self.prop(fm, "severity"), "spare_parts": spare_parts})
+            elif intent == "maintenance_strategy":
+                for ms, edge in self.out(fm, ["USES_MAINTENANCE_STRATEGY"], "MAINTENANCE_STRATEGY"):
+                    frequency = next((v for v in (self.edge_properties.get(edge, {}).get("frequency"),
+                                                  self.prop(ms, "frequency"), self.prop(fm, "frequency"))
+                                      if v is not None), None)
+                    rows.append({**row, "maintenance_strategy": names[ms], "frequency": frequency})
+            elif intent == "detection_method":
+                methods = self._linked_names(fm, "DETECTED_BY", "DETECTION_METHOD")
+                if methods:
+                    rows.append({**row, "detection_methods": methods})
+            else:
+                return None
+        rows = _distinct(rows)
+        return sorted(rows, key=lambda r: (str(r["component"]), str(r["failure_mode"]),
+                                           str(r.get("maintenance_strategy", ""))))[:TEMPLATE_LIMIT]
+
+    def _global_template(self, intent: str) -> Optional[List[Dict[str, Any]]]:
+        targets = {
+            "detection_method": ("DETECTION_METHOD", "DETECTED_BY"),
+            "maintenance_strategy": ("MAINTENANCE_STRATEGY", "USES_MAINTENANCE_STRATEGY"),
+            "spare_parts": ("SPARE_PART", "REQUIRES_SPARE_PART"),
+        }
+        if intent not in targets:
+            return None
+        label, rel_type = targets[intent]
+        codes = self._label_codes.get(label, set())
+        column = "spare_part" if intent == "spare_parts" else intent
+        rows = [
+            {column: self.names[i],
+             "failure_modes": list(dict.fromkeys(self.names[fm] for fm, _ in self.incoming(i, [rel_type], "FAILURE_MODE")))}
+            for i, label_set in enumerate(self.node_labels) if label_set in codes
+        ]
+        return sorted(rows, key=lambda r: r[column])
@@ -0,0 +1,257 @@
+import re
+import threading
+import logging
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger("Chat_Logger")
+
+ASSET_LABELS = ("EQUIPMENT", "SYSTEM", "COMPONENT")
+REVERSE_LABELS = ("MAINTENANCE_STRATEGY", "DETECTION_METHOD", "SPARE_PART", "CONDITION_DATA")
+IGNORED_LABELS = ("Entity", "GraphMeta")
+SEVERITIES = ("Critical", "Major", "Minor")
+
+# Intents in priority order: a question about "spare parts for fuel system failures" is a spare parts question
+INTENT_KEYWORDS = [
+    ("spare_parts", r"\b(spare|parts?|replacements?)\b"),
+    ("maintenance_strategy", r"\b(maintenance|strateg\w*|pdm|cbm|tbm|intervals?|frequency)\b"),
+    ("detection_method", r"\b(detect\w*|monitor\w*|inspections?)\b"),
+    ("failure_modes", r"\b(fail\w*|faults?|rul|remaining useful life)\b"),
+    ("equipment_breakdown", r"\b(components?|systems?|subsystems?|assembl\w*|breakdown|hierarchy|structure|consists?|contains?)\b"),
+]
+
+# Questions that need filtering or aggregation beyond the templates go to the LLM
+UNSUPPORTED = re.compile(r"\b(why|how many|count|compare|cause[sd]?|consequences?|trend|average|most|least|between)\b")
+
+# Failure modes reachable from an equipment, system or component, or a named failure mode itself
+FROM_ASSET = "MATCH (n:{label} {{name: $name}})-[:HAS_ASSEMBLY|HAS_COMPONENT*0..2]->(c)-[:HAS_FAILURE_MODE]->(fm:FAILURE_MODE)"
+FROM_FAILURE_MODE = "MATCH (c)-[:HAS_FAILURE_MODE]->(fm:FAILURE_MODE {{name: $name}})"
+ALL_FAILURE_MODES = "MATCH (c)-[:HAS_FAILURE_MODE]->(fm:FAILURE_MODE)"
+SEVERITY_FILTER = "WHERE $severity IS NULL OR fm.severity = $severity"
+
+TEMPLATES = {
+    "failure_modes": (
+        "{match} {severity_filter} "
+        "RETURN DISTINCT c.name AS component, fm.name AS failure_mode, fm.severity AS severity, "
+        "fm.consequence AS consequence, fm.rul AS rul ORDER BY component, failure_mode LIMIT 200"
+    ),
+    "spare_parts": (
+        "{match} {severity_filter} "
+        "MATCH (fm)-[:REQUIRES_SPARE_PART]->(sp:SPARE_PART) "
+        "RETURN c.name AS component, fm.name AS failure_mode, fm.severity AS severity, "
+        "collect(DISTINCT sp.name) AS spare_parts ORDER BY component, failure_mode LIMIT 200"
+    ),
+    "maintenance_strategy": (
+        "{match} {severity_filter} "
+        "MATCH (fm)-[u:USES_MAINTENANCE_STRATEGY]->(ms:MAINTENANCE_STRATEGY) "
+        "RETURN DISTINCT c.name AS component, fm.name AS failure_mode, ms.name AS maintenance_strategy, "
+        "coalesce(u.frequency, ms.frequency, fm.frequency) AS frequency "
+        "ORDER BY component, failure_mode, maintenance_strategy LIMIT 200"
+    ),
+    "detection_method": (
+        "{match} {severity_filter} "
+        "MATCH (fm)-[:DETECTED_BY]->(dm:DETECTION_METHOD) "
+        "RETURN c.name AS component, fm.name AS failure_mode, collect(DISTINCT dm.name) AS detection_methods "
+        "ORDER BY component, failure_mode LIMIT 200"
+    ),
+    "equipment_breakdown": (
+        "MATCH (n:{label} {{name: $name}})-[:HAS_ASSEMBLY|HAS_COMPONENT*1..2]->(part) "
+        "MATCH (parent)-[:HAS_ASSEMBLY|HAS_COMPONENT]->(part) "
+        "RETURN DISTINCT parent.name AS parent, part.name AS part, "
+        "[l IN labels(part) WHERE NOT l IN ['Entity']][0] AS type ORDER BY parent, part LIMIT 200"
+    ),
+    "reverse_lookup": (
+        "MATCH (c)-[:HAS_FAILURE_MODE]->(fm:FAILURE_MODE)-[r]->(x:{label} {{name: $name}}) "
+        "RETURN DISTINCT c.name AS component, fm.name AS failure_mode, fm.severity AS severity, type(r) AS relationship "
+        "ORDER BY component, failure_mode, relationship LIMIT 200"
+    ),
+}
+
+# Questions without a named entity, e.g. "List all detection methods used for monitoring"
+GLOBAL_TEMPLATES = {
+    "detection_method": (
+        "MATCH (dm:DETECTION_METHOD) OPTIONAL MATCH (fm:FAILURE_MODE)-[:DETECTED_BY]->(dm) "
+        "RETURN dm.name AS detection_method, collect(DISTINCT fm.name) AS failure_modes ORDER BY detection_method"
+    ),
+    "maintenance_strategy": (
+        "MATCH (ms:MAINTENANCE_STRATEGY) OPTIONAL MATCH (fm:FAILURE_MODE)-[:USES_MAINTENANCE_STRATEGY]->(ms) "
+        "RETURN ms.name AS maintenance_strategy, collect(DISTINCT fm.name) AS failure_modes ORDER BY maintenance_strategy"
+    ),
+    "spare_parts": (
+        "MATCH (sp:SPARE_PART) OPTIONAL MATCH (fm:FAILURE_MODE)-[:REQUIRES_SPARE_PART]->(sp) "
+        "RETURN sp.name AS spare_part, collect(DISTINCT fm.name) AS failure_modes ORDER BY spare_part"
+    ),
+}
+
+EXPLANATIONS = {
+    "failure_modes": "Failure modes {scope} with severity, consequence and RUL",
+    "spare_parts": "Spare parts required by the failure modes {scope}",
+    "maintenance_strategy": "Maintenance strategies and frequencies for the failure modes {scope}",
+    "detection_method": "Detection methods for the failure modes {scope}",
+    "equipment_breakdown": "Systems and components {scope}",
+    "reverse_lookup": "Failure modes and components linked to {name}",
+}
+
+
+def compact_name(text: str) -> str:
+    """Lowercase text without spaces or punctuation, the form entity names are matched in"""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def entity_aliases(name: str) -> List[str]:
+    """
+    Compact aliases an entity is recognised by in free text
+
+    "Predictive Maintenance (PdM)" is also found as "Predictive Maintenance" and "PdM".
+    Forms that are themselves intent keywords are skipped: a node named e.g. "Failure"
+    would otherwise match every failure question.
+    """
+    forms = {name, re.sub(r"\s*\([^)]*\)", "", name)}
+    forms.update(re.findall(r"\(([^)]+)\)", name))
+    return sorted({
+        compact_name(form) for form in forms
+        if len(compact_name(form)) >= 2
+        and not any(re.fullmatch(pattern, form.lower()) for _, pattern in INTENT_KEYWORDS)
+    })
+
+
+class IntentRouter:
+    """
+    Local intent classifier and entity matcher that answers common questions with Cypher templates
+
+    Entity names are loaded from the graph (through load_entities) and matched in the
+    question ignoring case, spaces and punctuation, so "gas turbine 1" finds GasTurbine1.
+    Keyword rules pick the intent, and the question is answered with a prewritten,
+    parameterised query. Anything the templates cannot answer returns None so the caller
+    can fall back to LLM generation.
+    """
+
+    def __init__(self, load_entities: Callable[[], List[Tuple[str, List[str]]]]):
+        """
+        Args:
+            load_entities: Returns (name, labels) for every named node in the graph
+        """
+        self.load_entities = load_entities
+        self.hits = 0
+        self.misses = 0
+        self._aliases: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Reload entity names on the next question, called when the graph version changes"""
+        with self._lock:
+            self._aliases = None
+
+    def _build_aliases(self) -> Dict[str, List[Tuple[str, str]]]:
+        aliases = {}
+        for name, labels in self.load_entities():
+            if not name:
+                continue
+            label = next((l for l in labels if l not in IGNORED_LABELS), None)
+            if label is None:
+                continue
+            for alias in entity_aliases(name):
+                aliases.setdefault(alias, []).append((name, label))
+        logger.info(f"Intent router loaded {len(aliases)} entity aliases")
+        return aliases
+
+    def match_entities(self, question: str) -> List[Tuple[str, str]]:
+        """Return (name, label) of the entities named in the question, longest match first"""
+        with self._lock:
+            aliases = self._aliases
+        if aliases is None:
+            # Built outside the lock: loading entities may itself trigger invalidate()
+            aliases = self._build_aliases()
+            with self._lock:
+                self._aliases = aliases
+
+        compact_question = compact_name(question)
+        words = set(re.findall(r"[a-z0-9]+", question.lower()))
+        found = []
+        for alias in aliases:
+            # Short aliases such as "pdm" must be whole words to avoid accidental matches
+            if (alias in words) if len(alias) <= 4 else (alias in compact_question):
+                found.append(alias)
+
+        matches = []
+        chosen = []
+        for alias in sorted(found, key=len, reverse=True):
+            if any(alias in longer for longer in chosen):
+                continue
+            chosen.append(alias)
+            matches.extend(aliases[alias])
+        return matches
+
+    def classify(self, question: str) -> Optional[str]:
+        """Return the highest priority intent whose keywords occur in the question"""
+        lowered = question.lower()
+        for intent, pattern in INTENT_KEYWORDS:
+            if re.search(pattern, lowered):
+                return intent
+        return None
+
+    def route(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Map a question to a parameterised template query
+
+        Returns:
+            Query info with cypher_query, parameters and explanation, or None on a miss
+        """
+        query_info = self._route(question)
+        if query_info is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.info(f"Routed question to template '{query_info['intent']}'")
+        return query_info
+
+    def _route(self, question: str) -> Optional[Dict[str, Any]]:
+        lowered = question.lower()
+        if UNSUPPORTED.search(lowered):
+            return None
+
+        intent = self.classify(question)
+        entities = self.match_entities(question)
+        severity = next((s for s in SEVERITIES if re.search(rf"\b{s.lower()}\b", lowered)), None)
+
+        forward_labels = ASSET_LABELS if intent == "equipment_breakdown" else ASSET_LABELS + ("FAILURE_MODE",)
+        forward = next(((name, label) for name, label in entities if label in forward_labels), None)
+        reverse = next(((name, label) for name, label in entities if label in REVERSE_LABELS), None)
+
+        if intent and forward:
+            name, label = forward
+            if intent == "equipment_breakdown":
+                cypher = TEMPLATES[intent].format(label=label)
+                parameters = {"name": name}
+            else:
+                match = (FROM_FAILURE_MODE if label == "FAILURE_MODE" else FROM_ASSET).format(label=label)
+                cypher = TEMPLATES[intent].format(match=match, severity_filter=SEVERITY_FILTER)
+                parameters = {"name": name, "severity": severity}
+            scope = f"of {name}"
+        elif reverse and not forward:
+            intent = "reverse_lookup"
+            name, label = reverse
+            cypher = TEMPLATES[intent].format(label=label)
+            parameters = {"name": name}
+            scope = f"of {name}"
+        elif intent == "failure_modes" and not entities:
+            cypher = TEMPLATES[intent].format(match=ALL_FAILURE_MODES, severity_filter=SEVERITY_FILTER)
+            parameters = {"severity": severity}
+            scope = "in the graph"
+        elif intent in GLOBAL_TEMPLATES and not entities and severity is None:
+            cypher = GLOBAL_TEMPLATES[intent]
+            parameters = {}
+            scope = "in the graph"
+        else:
+            return None
+
+        return {
+            "cypher_query": cypher,
+            "parameters": parameters,
+            "explanation": EXPLANATIONS[intent].format(scope=scope, name=parameters.get("name", "")),
+            "expected_result": f"Rows from the {intent.replace('_', ' ')} template",
+            "intent": intent
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        routed = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / routed if routed else 0.0}
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """
+    Request-per-minute token bucket for the async LLM client
+
+    Callers wait in FIFO order on an asyncio lock, so when the quota is saturated
+    requests queue up here instead of failing with 429s from the API. A budget of
+    None disables limiting.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        """
+        Args:
+            requests_per_minute: Request budget per minute (None for unlimited)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.waiting = 0
+        self._allowance = float(requests_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self):
+        """Wait until a request is allowed"""
+        if not self.requests_per_minute:
+            return
+        if self._lock is None:
+            # Created lazily so it belongs to the running event loop
+            self._lock = asyncio.Lock()
+
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._allowance = min(
+                        float(self.requests_per_minute),
+                        self._allowance + (now - self._last_refill) * self.requests_per_minute / 60.0
+                    )
+                    self._last_refill = now
+                    if self._allowance >= 1:
+                        self._allowance -= 1
+                        return
+                    await asyncio.sleep((1 - self._allowance) * 60.0 / self.requests_per_minute)
+        finally:
+            self.waiting -= 1
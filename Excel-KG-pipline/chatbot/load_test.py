@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List, Tuple
+from urllib.parse import urlparse
+
+QUESTIONS = [
+    "What are the critical failure modes in GasTurbine1?",
+    "Which spare parts are needed for fuel system failures?",
+    "What maintenance strategies are used for oil pump failures?",
+    "Show me all components that use predictive maintenance",
+    "Which failure modes cause operational downtime?",
+    "What is the RUL for components with seizing failures?",
+    "List all detection methods used for monitoring",
+]
+
+
+async def ask(host: str, port: int, question: str) -> Tuple[int, float]:
+    """POST one question and return the HTTP status and latency in seconds"""
+    started = time.perf_counter()
+    body = json.dumps({"question": question}).encode("utf-8")
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"POST /ask HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b" ", 2)[1]) if response else 0
+    return status, time.perf_counter() - started
+
+
+async def run_level(host: str, port: int, concurrency: int, total: int) -> dict:
+    """Send total questions with concurrency requests in flight"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(QUESTIONS[i % len(QUESTIONS)])
+    results: List[Tuple[int, float]] = []
+
+    async def worker():
+        while not queue.empty():
+            question = queue.get_nowait()
+            try:
+                results.append(await ask(host, port, question))
+            except OSError:
+                results.append((0, 0.0))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": total - len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_s": round(statistics.median(latencies), 3) if latencies else None,
+        "p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chatbot HTTP server")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32",
+                        help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        print(json.dumps(asyncio.run(run_level(url.hostname, url.port or 80, concurrency, args.requests))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import re
+import time
+import threading
+import logging
+from collections import Counter, deque
+from typing import Dict, List, Any, Optional
+
+from result_cache import normalize_cypher, is_read_only
+
+logger = logging.getLogger("Chat_Logger")
+
+# Plan operators that touch every node or multiply unrelated matches
+REJECTED_OPERATORS = {
+    "AllNodesScan": "all_nodes_scan",
+    "CartesianProduct": "cartesian_product",
+}
+# Plan operators that modify the graph, e.g. Create, MergeInto, SetNodeProperties, DetachDelete
+WRITE_OPERATORS = re.compile(r"^(Create|Merge|Delete|DetachDelete|Set|Remove|Foreach|LoadCSV)")
+
+
+class QueryRejected(Exception):
+    """Raised when a generated query is refused before it runs"""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+        self.detail = detail
+
+
+class QueryGuard:
+    """
+    Checks and bounds LLM-generated Cypher before it reaches the database
+
+    Queries with write clauses or administration procedures are refused outright, words
+    in strings and comments do not count. Queries get a LIMIT
+    when they have none (or a larger one), and their EXPLAIN plan is inspected so that
+    all-node scans, cartesian products, write operators (e.g. from a procedure) and huge
+    row estimates are refused before they run. The caller executes accepted queries in a read-only transaction with the
+    guard's timeout. Every rejection is logged and kept with its reason.
+    """
+
+    def __init__(self, max_rows: int = 1000, timeout: float = 10.0,
+                 max_estimated_rows: float = 1_000_000, history_size: int = 100):
+        """
+        Args:
+            max_rows: LIMIT injected into queries without one
+            timeout: Transaction timeout in seconds for guarded queries
+            max_estimated_rows: Largest planner row estimate accepted for any operator
+            history_size: Number of recent rejections kept for inspection
+        """
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self.max_estimated_rows = max_estimated_rows
+        self.rejections: deque = deque(maxlen=history_size)
+        self.rejection_counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def prepare(self, cypher_query: str) -> str:
+        """
+        Statically check a query and return it with a bounded LIMIT
+
+        Raises:
+            QueryRejected: The query contains write clauses or administration procedures
+        """
+        query = normalize_cypher(cypher_query)
+        if not is_read_only(query):
+            raise self.reject(query, "write_clause", "query contains write clauses or administration procedures")
+        return self.apply_limit(query)
+
+    def apply_limit(self, query: str) -> str:
+        """Append LIMIT max_rows to the final RETURN, or lower a larger literal LIMIT"""
+        if re.search(r"\bUNION\b", query, re.IGNORECASE):
+            # A trailing LIMIT would only bound the last branch; fetching is capped instead
+            return query
+        returns = list(re.finditer(r"\bRETURN\b", query, re.IGNORECASE))
+        if not returns:
+            return query
+        tail = query[returns[-1].end():]
+        limit = re.search(r"\bLIMIT\s+(\d+)\s*$", tail, re.IGNORECASE)
+        if limit:
+            if int(limit.group(1)) > self.max_rows:
+                return query[:returns[-1].end()] + tail[:limit.start()] + f"LIMIT {self.max_rows}"
+            return query
+        if re.search(r"\bLIMIT\b", tail, re.IGNORECASE):
+            return query
+        return f"{query} LIMIT {self.max_rows}"
+
+    def check_plan(self, query: str, plan: Optional[Dict[str, Any]]):
+        """
+        Inspect an EXPLAIN plan (ResultSummary.plan)
+
+        Raises:
+            QueryRejected: The plan scans all nodes, builds a cartesian product, writes
+                or estimates more rows than max_estimated_rows
+        """
+        if not plan:
+            return
+        estimated_rows = 0.0
+        pending = [plan]
+        while pending:
+            operator = pending.pop()
+            operator_type = operator.get("operatorType", "").split("@")[0]
+            if operator_type in REJECTED_OPERATORS:
+                raise self.reject(query, REJECTED_OPERATORS[operator_type], f"plan contains {operator_type}")
+            if WRITE_OPERATORS.match(operator_type):
+                raise self.reject(query, "write_clause", f"plan contains {operator_type}")
+            args = operator.get("args") or operator.get("arguments") or {}
+            estimated_rows = max(estimated_rows, float(args.get("EstimatedRows", 0) or 0))
+            pending.extend(operator.get("children", []))
+
+        if estimated_rows > self.max_estimated_rows:
+            raise self.reject(query, "estimated_rows",
+                              f"planner estimates {estimated_rows:.0f} rows (limit {self.max_estimated_rows:.0f})")
+
+    def reject(self, query: str, reason: str, detail: str) -> QueryRejected:
+        """Record a rejection and return the exception to raise"""
+        logger.warning(f"Rejected generated query ({reason}: {detail}): {query}")
+        with self._lock:
+            self.rejections.append({"time": time.time(), "query": query, "reason": reason, "detail": detail})
+            self.rejection_counts[reason] += 1
+        return QueryRejected(reason, detail)
+
+    def recent_rejections(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.rejections)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rejections": sum(self.rejection_counts.values()), "by_reason": dict(self.rejection_counts)}
@@ -0,0 +1,100 @@
+import json
+import re
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger("Chat_Logger")
+
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|LOAD\s+CSV|FOREACH)\b", re.IGNORECASE)
+# Administration procedures are not stopped by a read-only transaction
+ADMIN_PROCEDURES = re.compile(r"\bCALL\s+dbms\.", re.IGNORECASE)
+# String literals, quoted identifiers and comments, whose words are not clauses
+LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def normalize_cypher(cypher_query: str) -> str:
+    """Collapse whitespace so formatting differences map to the same cache key"""
+    return " ".join(cypher_query.split()).rstrip(";")
+
+
+def strip_literals(cypher_query: str) -> str:
+    """Blank out string literals, quoted identifiers and comments"""
+    return LITERALS.sub("''", cypher_query)
+
+
+def is_read_only(cypher_query: str) -> bool:
+    """
+    Conservative check that a query contains no write clauses or administration procedures
+
+    Words inside strings and comments are ignored, and CALL { ... } subqueries are
+    allowed. Other procedure calls are left to the read-only transaction the chatbot
+    runs generated queries in, which refuses procedures that write.
+    """
+    stripped = strip_literals(cypher_query)
+    return WRITE_CLAUSES.search(stripped) is None and ADMIN_PROCEDURES.search(stripped) is None
+
+
+class QueryResultCache:
+    """
+    In-memory LRU cache of Cypher query results, bounded by an estimated memory size
+
+    Results stay valid for one graph version: the owner clears the cache whenever
+    the version stamp written by the ingestion pipeline changes. Cached result
+    lists are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: Memory cap for the cached results, estimated from their JSON size
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[Dict], int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(cypher_query: str, parameters: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        return normalize_cypher(cypher_query), json.dumps(parameters or {}, sort_keys=True, default=str)
+
+    def get(self, key: Tuple[str, str]) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Tuple[str, str], results: List[Dict]):
+        size = len(json.dumps(results, default=str)) + len(key[0]) + len(key[1])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (results, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._size
+        }
@@ -0,0 +1,128 @@
+import json
+from typing import Dict, List, Any, Union
+
+# Note placed in the formatting prompt when results had to be compacted
+COMPACTION_NOTE = (
+    "The results were compacted to fit the prompt: 'common' holds values shared by every row, "
+    "each group lists the values shared by its rows and up to a few example rows, and the "
+    "omitted_* fields are exact counts of what was left out. Mention the omitted counts."
+)
+
+MAX_VALUE_CHARS = 200
+
+
+def estimate_tokens(payload: Any) -> int:
+    """Rough token count of a JSON payload, about four characters per token"""
+    return len(json.dumps(payload, default=str)) // 4
+
+
+def _value_key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _shorten(value: Any, top_k: int) -> Any:
+    """De-duplicate list values, cap them at top_k items and truncate long strings"""
+    if isinstance(value, list):
+        unique = list({_value_key(v): v for v in value}.values())
+        shortened = [_shorten(v, top_k) for v in unique[:top_k]]
+        if len(unique) > top_k:
+            shortened.append(f"... (+{len(unique) - top_k} more)")
+        return shortened
+    if isinstance(value, str) and len(value) > MAX_VALUE_CHARS:
+        return value[:MAX_VALUE_CHARS] + "..."
+    return value
+
+
+def _shared_columns(rows: List[Dict[str, Any]], columns: List[str]) -> List[str]:
+    """Columns whose value is identical in every row"""
+    return [
+        column for column in columns
+        if len({_value_key(row.get(column)) for row in rows}) == 1
+    ]
+
+
+def _compact_group(lead: str, rows: List[Dict[str, Any]], columns: List[str], top_k: int) -> Dict[str, Any]:
+    # A single row is listed flat
+    shared = _shared_columns(rows, columns) if len(rows) > 1 else columns
+    group = {lead: _shorten(rows[0].get(lead), top_k)}
+    for column in shared:
+        group[column] = _shorten(rows[0].get(column), top_k)
+
+    rest = [c for c in columns if c not in shared]
+    if rest:
+        # Identical remaining rows are listed once
+        unique_rows = list({
+            _value_key([row.get(c) for c in rest]): {c: row.get(c) for c in rest} for row in rows
+        }.values())
+        group["rows"] = [{c: _shorten(v, top_k) for c, v in row.items()} for row in unique_rows[:top_k]]
+        if len(unique_rows) > top_k:
+            group["omitted_rows"] = len(unique_rows) - top_k
+        if len(unique_rows) < len(rows):
+            group["duplicate_rows"] = len(rows) - len(unique_rows)
+    return group
+
+
+def compact_results(results: List[Dict[str, Any]], token_budget: int = 3000,
+                    top_k: int = 5) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Shrink query results to fit a token budget before they are put in a prompt
+
+    Results within the budget are returned unchanged. Larger results are reduced in steps:
+    columns with the same value in every row are stated once, rows are grouped by their
+    leading column with values shared inside a group hoisted to the group, each group keeps
+    its first top_k rows (the query's order) and groups past the budget are dropped.
+    Everything removed is reported as an exact count.
+
+    Args:
+        results: Records from Neo4j
+        token_budget: Maximum estimated tokens of the returned payload
+        top_k: Rows kept per group and items kept per list value
+
+    Returns:
+        The original results, or a dict with total_rows, common, groups and omitted counts
+    """
+    if not results or estimate_tokens(results) <= token_budget:
+        return results
+
+    columns = list(results[0].keys())
+    for row in results[1:]:
+        columns.extend(c for c in row if c not in columns)
+
+    common_columns = _shared_columns(results, columns)
+    compact = {
+        "total_rows": len(results),
+        "common": {c: _shorten(results[0].get(c), top_k) for c in common_columns},
+    }
+    columns = [c for c in columns if c not in common_columns]
+    if not columns:
+        compact["groups"] = []
+        return compact
+
+    # Group by the leading column, keeping the order Neo4j returned
+    lead, rest = columns[0], columns[1:]
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for row in results:
+        grouped.setdefault(_value_key(row.get(lead)), []).append(row)
+
+    # Keep whole groups while they fit, fewer example rows first if a single group is too big
+    budget = token_budget - estimate_tokens(compact) - 20
+    group_rows = list(grouped.values())
+    k = top_k
+    while k > 1 and estimate_tokens(_compact_group(lead, group_rows[0], rest, k)) > budget:
+        k -= 1
+
+    kept, used = [], 0
+    for rows in group_rows:
+        group = _compact_group(lead, rows, rest, k)
+        size = estimate_tokens(group) + 1
+        if used + size > budget and kept:
+            break
+        kept.append(group)
+        used += size
+
+    compact["groups"] = kept
+    if len(kept) < len(group_rows):
+        omitted = group_rows[len(kept):]
+        compact["omitted_groups"] = len(omitted)
+        compact["omitted_group_rows"] = sum(len(rows) for rows in omitted)
+    return compact
@@ -0,0 +1,211 @@
+import re
+import threading
+import logging
+from typing import Dict, List, Any, Callable, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger("Chat_Logger")
+
+# Shared labels written by the ingestion pipeline that carry no domain meaning
+IGNORED_LABELS = {"Entity", "GraphMeta"}
+
+# Human descriptions added to the introspected labels and relationship types that exist
+LABEL_DESCRIPTIONS = {
+    "EQUIPMENT": "Main equipment units (e.g., GasTurbine1)",
+    "SYSTEM": "Sub-systems within equipment (e.g., FuelSystem, LubeOilSystem)",
+    "COMPONENT": "Individual components (e.g., FuelPump, OilFilter)",
+    "FAILURE_MODE": "Types of failures (e.g., Seizing, Clogging, Leak)",
+    "MAINTENANCE_STRATEGY": "Maintenance approaches (PdM, CBM, TBM)",
+    "DETECTION_METHOD": "Monitoring techniques (Vibration monitoring, Pressure monitoring)",
+    "SPARE_PART": "Replacement parts needed for repairs",
+    "CONDITION_DATA": "Monitoring parameters and thresholds",
+}
+RELATIONSHIP_DESCRIPTIONS = {
+    "HAS_ASSEMBLY": "Equipment contains systems",
+    "HAS_COMPONENT": "Systems contain components",
+    "HAS_FAILURE_MODE": "Components can have failure modes",
+    "REQUIRES_SPARE_PART": "Failure modes require specific spare parts",
+    "USES_MAINTENANCE_STRATEGY": "Failure modes use maintenance strategies",
+    "DETECTED_BY": "Failure modes are detected by methods",
+    "MONITORED_BY": "Components are monitored by detection methods",
+    "CAUSES_CONSEQUENCE": "Failure modes cause consequences",
+}
+PROPERTY_NOTES = {
+    "severity": '"Critical", "Major", "Minor"',
+    "frequency": "maintenance intervals",
+    "rul": "Remaining Useful Life in hours",
+    "consequence": "impact of failure",
+    "name": "entity identifier",
+}
+
+NODE_PROPERTIES_QUERY = "CALL db.schema.nodeTypeProperties() YIELD nodeLabels, propertyName RETURN nodeLabels, propertyName"
+RELATIONSHIP_PROPERTIES_QUERY = "CALL db.schema.relTypeProperties() YIELD relType, propertyName RETURN relType, propertyName"
+RELATIONSHIP_TYPES_QUERY = "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType"
+# Endpoint labels are sampled per relationship type to avoid scanning every relationship
+PATTERN_QUERY = (
+    "MATCH (a)-[r:`{rel_type}`]->(b) WITH labels(a) AS source, labels(b) AS target LIMIT $sample "
+    "RETURN DISTINCT source, target"
+)
+
+
+def _domain_labels(labels: Iterable[str]) -> List[str]:
+    return [label for label in labels if label not in IGNORED_LABELS]
+
+
+class GraphSchema:
+    """
+    Labels, relationship types, endpoint patterns and property keys of the live graph
+
+    The schema is read with Neo4j's schema procedures through run_query the first time
+    it is needed and kept until invalidate() is called on a graph version change.
+    describe() renders only the part of the schema relevant to a question, so the
+    Cypher generation prompt stays small and names only labels that exist.
+    """
+
+    def __init__(self, run_query: Callable[..., List[Dict[str, Any]]], pattern_sample: int = 1000):
+        """
+        Args:
+            run_query: Executes a Cypher query with parameters and returns records as dicts
+            pattern_sample: Relationships sampled per type to find endpoint labels
+        """
+        self.run_query = run_query
+        self.pattern_sample = pattern_sample
+        self._schema: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._schema = None
+
+    def _query(self, cypher_query: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        records = self.run_query(cypher_query, parameters)
+        if records and "error" in records[0]:
+            raise RuntimeError(records[0]["error"])
+        return records
+
+    def _introspect(self) -> Dict[str, Any]:
+        labels: Dict[str, Set[str]] = {}
+        relationships: Dict[str, Set[str]] = {}
+        patterns: Set[Tuple[str, str, str]] = set()
+
+        for record in self._query(NODE_PROPERTIES_QUERY):
+            for label in _domain_labels(record["nodeLabels"] or []):
+                properties = labels.setdefault(label, set())
+                if record["propertyName"]:
+                    properties.add(record["propertyName"])
+
+        for record in self._query(RELATIONSHIP_PROPERTIES_QUERY):
+            # relType is reported as ":`TYPE`"
+            rel_type = record["relType"].lstrip(":").strip("`")
+            properties = relationships.setdefault(rel_type, set())
+            if record["propertyName"]:
+                properties.add(record["propertyName"])
+
+        for record in self._query(RELATIONSHIP_TYPES_QUERY):
+            rel_type = record["relationshipType"]
+            relationships.setdefault(rel_type, set())
+            query = PATTERN_QUERY.format(rel_type=rel_type.replace("`", "``"))
+            for pattern in self._query(query, {"sample": self.pattern_sample}):
+                for source in _domain_labels(pattern["source"]):
+                    for target in _domain_labels(pattern["target"]):
+                        patterns.add((source, rel_type, target))
+
+        logger.info(f"Introspected graph schema: {len(labels)} labels, {len(relationships)} relationship types, "
+                    f"{len(patterns)} patterns")
+        return {"labels": labels, "relationships": relationships, "patterns": sorted(patterns)}
+
+    def get(self) -> Dict[str, Any]:
+        """Return the cached schema, introspecting the graph if needed"""
+        with self._lock:
+            schema = self._schema
+        if schema is None:
+            try:
+                schema = self._introspect()
+            except Exception as e:
+                # Without the schema procedures, fall back to the documented schema
+                logger.warning(f"Could not introspect graph schema, using the documented one: {e}")
+                schema = {
+                    "labels": {label: set(PROPERTY_NOTES) for label in LABEL_DESCRIPTIONS},
+                    "relationships": {rel_type: set() for rel_type in RELATIONSHIP_DESCRIPTIONS},
+                    "patterns": [],
+                }
+            with self._lock:
+                self._schema = schema
+        return schema
+
+    def relevant_labels(self, question: str, entity_labels: Iterable[str]) -> Set[str]:
+        """
+        Labels of the entities matched in the question and labels named in it (e.g. "spare parts"
+        -> SPARE_PART), joined by the labels on the shortest paths between them. A single label
+        brings its direct neighbours. Empty if nothing matched.
+        """
+        schema = self.get()
+        words = [word for word in re.findall(r"[a-z]+", question.lower()) if len(word) >= 4]
+        selected = {label for label in entity_labels if label in schema["labels"]}
+        for label in schema["labels"]:
+            tokens = [token for token in label.lower().split("_") if len(token) >= 4]
+            # Compare word stems so "detected" finds DETECTION_METHOD and "parts" finds SPARE_PART
+            if any(word[:5] == token[:5] for token in tokens for word in words):
+                selected.add(label)
+
+        neighbours: Dict[str, Set[str]] = {}
+        for source, _, target in schema["patterns"]:
+            neighbours.setdefault(source, set()).add(target)
+            neighbours.setdefault(target, set()).add(source)
+
+        if len(selected) == 1:
+            return selected | neighbours.get(next(iter(selected)), set())
+
+        connected = set(selected)
+        for start in selected:
+            # Breadth-first search from each label, adding the path to every other selected label
+            previous = {start: None}
+            frontier = [start]
+            while frontier:
+                following = []
+                for label in frontier:
+                    for neighbour in neighbours.get(label, ()):
+                        if neighbour not in previous:
+                            previous[neighbour] = label
+                            following.append(neighbour)
+                frontier = following
+            for goal in selected:
+                step = previous.get(goal)
+                while step is not None and step != start:
+                    connected.add(step)
+                    step = previous[step]
+        return connected
+
+    def describe(self, question: str = "", entity_labels: Iterable[str] = ()) -> str:
+        """Render the schema for a prompt, pruned to the labels relevant to the question"""
+        schema = self.get()
+        selected = self.relevant_labels(question, entity_labels) if question else set()
+        if not selected:
+            selected = set(schema["labels"])
+
+        patterns = [p for p in schema["patterns"] if p[0] in selected and p[2] in selected]
+        used_relationships = {rel_type for _, rel_type, _ in patterns} or set(schema["relationships"])
+
+        lines = ["Node labels (properties):"]
+        for label in sorted(selected):
+            description = LABEL_DESCRIPTIONS.get(label)
+            properties = ", ".join(sorted(schema["labels"][label]))
+            lines.append(f"- {label}{': ' + description if description else ''} ({properties})")
+
+        lines.append("Relationships:")
+        if patterns:
+            for source, rel_type, target in patterns:
+                properties = schema["relationships"].get(rel_type)
+                props = f" {{{', '.join(sorted(properties))}}}" if properties else ""
+                lines.append(f"- ({source})-[:{rel_type}{props}]->({target})")
+        else:
+            for rel_type in sorted(used_relationships):
+                description = RELATIONSHIP_DESCRIPTIONS.get(rel_type, "")
+                lines.append(f"- {rel_type}{': ' + description if description else ''}")
+
+        present = set().union(*(schema["labels"][label] for label in selected),
+                              *(schema["relationships"].get(r, set()) for r in used_relationships))
+        notes = [f"- {name}: {note}" for name, note in PROPERTY_NOTES.items() if name in present]
+        if notes:
+            lines.append("Property values:")
+            lines.extend(notes)
+        return "\n".join(lines)
@@ -0,0 +1,214 @@
+import sqlite3
+import json
+import math
+import re
+import threading
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger("Chat_Logger")
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "for", "to", "and", "or",
+    "what", "which", "who", "how", "me", "show", "list", "give", "tell", "about", "do", "does", "i",
+    "there", "any", "with", "by", "that", "this", "these", "those", "can", "please", "all"
+}
+
+
+def _tokens(question: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", question.lower()) if token not in STOPWORDS]
+
+
+def key_terms(question: str,
+              match_entities: Optional[Callable[[str], List[Tuple[str, str]]]] = None) -> frozenset:
+    """
+    Terms that must match exactly: the graph entities named in the question and
+    identifier-like words (GasTurbine1, "Fuel Leak", ...)
+
+    Two questions that differ only in the equipment they ask about embed very
+    closely ("fuel pump seizing" and "oil pump seizing"), so a cache hit additionally
+    requires the same entities and identifiers.
+    """
+    terms = set(re.findall(r"['\"]([^'\"]+)['\"]", question))
+    for word in re.findall(r"\b\w+\b", question):
+        if re.search(r"\d", word) or re.search(r"[a-z][A-Z]", word):
+            terms.add(word)
+    if match_entities:
+        terms.update(name for name, _ in match_entities(question))
+    return frozenset(term.lower() for term in terms)
+
+
+def hashed_embedding(question: str, dimensions: int = 512) -> List[float]:
+    """
+    Local, dependency-free question embedding
+
+    Content words and their character trigrams are hashed into a fixed-size vector,
+    which is L2 normalised so the dot product is the cosine similarity. Word order
+    and stopwords are ignored, so rephrasings of the same question land close together.
+    """
+    vector = [0.0] * dimensions
+    for token in _tokens(question):
+        vector[zlib.crc32(token.encode()) % dimensions] += 1.0
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3].encode()) % dimensions] += 0.25
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class SemanticQueryCache:
+    """
+    Semantic cache of validated question -> Cypher pairs
+
+    A question reuses the query info of the most similar cached question when the
+    cosine similarity of their embeddings reaches the threshold and both name the same
+    graph entities and identifiers. Entries expire after ttl_seconds, the least recently used entry
+    is evicted beyond max_entries, and entries are persisted in SQLite when a
+    db_path is given.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, threshold: float = 0.85, max_entries: int = 500,
+                 ttl_seconds: float = 7 * 24 * 3600,
+                 embed_fn: Callable[[str], List[float]] = hashed_embedding,
+                 match_entities: Optional[Callable[[str], List[Tuple[str, str]]]] = None):
+        """
+        Args:
+            db_path: SQLite file to persist the cache across restarts (None keeps it in memory)
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached questions
+            ttl_seconds: Lifetime of a cached entry
+            embed_fn: Function returning a normalised embedding for a question
+            match_entities: Returns (name, label) of the graph entities named in a question,
+                e.g. IntentRouter.match_entities
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embed_fn = embed_fn
+        self.match_entities = match_entities
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    question TEXT PRIMARY KEY,
+                    embedding TEXT NOT NULL,
+                    query_info TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+            self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT question, embedding, query_info, created FROM query_cache ORDER BY last_used"
+        ).fetchall()
+        for question, embedding, query_info, created in rows:
+            # Key terms are computed on first use, the entity matcher may need the graph
+            self._entries[question] = {
+                "embedding": json.loads(embedding),
+                "key_terms": None,
+                "query_info": json.loads(query_info),
+                "created": created
+            }
+        logger.info(f"Loaded {len(rows)} cached questions")
+
+    def _delete(self, question: str):
+        del self._entries[question]
+        if self._conn:
+            self._conn.execute("DELETE FROM query_cache WHERE question = ?", (question,))
+
+    def _fill_key_terms(self):
+        """Compute the key terms of loaded entries outside the lock, the entity matcher may query the graph"""
+        with self._lock:
+            missing = [question for question, entry in self._entries.items() if entry["key_terms"] is None]
+        if not missing:
+            return
+        computed = {question: key_terms(question, self.match_entities) for question in missing}
+        with self._lock:
+            for question, terms in computed.items():
+                entry = self._entries.get(question)
+                if entry is not None and entry["key_terms"] is None:
+                    entry["key_terms"] = terms
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return the cached query info for a similar question, or None"""
+        embedding = self.embed_fn(question)
+        terms = key_terms(question, self.match_entities)
+        now = time.time()
+        self._fill_key_terms()
+
+        with self._lock:
+            best_question, best_score = None, self.threshold
+            for cached_question, entry in list(self._entries.items()):
+                if now - entry["created"] > self.ttl_seconds:
+                    self._delete(cached_question)
+                    continue
+                if entry["key_terms"] != terms:
+                    continue
+                score = sum(a * b for a, b in zip(embedding, entry["embedding"]))
+                if score >= best_score:
+                    best_question, best_score = cached_question, score
+
+            if best_question is None:
+                self.misses += 1
+                if self._conn:
+                    self._conn.commit()
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_question)
+            if self._conn:
+                self._conn.execute("UPDATE query_cache SET last_used = ? WHERE question = ?", (now, best_question))
+                self._conn.commit()
+            logger.info(f"Semantic cache hit ({best_score:.2f}) for question: {best_question}")
+            return dict(self._entries[best_question]["query_info"])
+
+    def store(self, question: str, query_info: Dict[str, Any]):
+        """Cache the query info of a question whose Cypher was validated against the graph"""
+        embedding = self.embed_fn(question)
+        terms = key_terms(question, self.match_entities)
+        now = time.time()
+        with self._lock:
+            self._entries[question] = {
+                "embedding": embedding,
+                "key_terms": terms,
+                "query_info": query_info,
+                "created": now
+            }
+            self._entries.move_to_end(question)
+            if self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_cache (question, embedding, query_info, created, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (question, json.dumps(embedding), json.dumps(query_info), now, now)
+                )
+            while len(self._entries) > self.max_entries:
+                self._delete(next(iter(self._entries)))
+            if self._conn:
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached questions"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries)
+        }
+
+    def close(self):
+        """Close the SQLite connection"""
+        if self._conn:
+            self._conn.close()
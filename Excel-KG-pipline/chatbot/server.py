@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
+from chatbot import MaintenanceKGChatbot
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("Chat_Logger")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class ServerBusy(Exception):
+    """Raised when the wait queue is full"""
+
+
+class RequestTooLarge(Exception):
+    """Raised when a request announces a body above the size limit"""
+
+
+class ChatServer:
+    """
+    HTTP/JSON front end serving one shared chatbot to many concurrent users on asyncio
+
+    Every request uses the chatbot's async Neo4j driver and LLM client, whose connection
+    pools are shared. At most max_concurrent questions are answered at once and up to
+    max_queue more wait for a slot; beyond that requests get a 503. Bodies larger than
+    max_body_bytes are refused with a 413 before they are read. LLM quota saturation
+    queues inside the chatbot's rate limiter. Each request, waiting time included, must
+    finish within request_timeout seconds.
+
+    Endpoints:
+        POST /ask     {"question": "..."} -> {"answer": "...", "seconds": ...}
+                      with "stream": true the answer is sent as chunked plain text
+        GET  /stats   server counters and chatbot cache, router and guard statistics
+        GET  /health
+    """
+
+    def __init__(self, chatbot: MaintenanceKGChatbot, host: str = "0.0.0.0", port: int = 8080,
+                 max_concurrent: int = 16, max_queue: int = 64, request_timeout: float = 60.0,
+                 max_body_bytes: int = 64 * 1024):
+        """
+        Args:
+            chatbot: Chatbot shared by all requests
+            host: Interface to listen on
+            port: Port to listen on
+            max_concurrent: Questions answered at the same time
+            max_queue: Requests allowed to wait for a free slot
+            request_timeout: Seconds allowed per request, including time in the queue
+            max_body_bytes: Largest request body accepted
+        """
+        self.chatbot = chatbot
+        self.host = host
+        self.port = port
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.counters = {"served": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self.active = 0
+        self.waiting = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def serve(self):
+        """Listen until cancelled, then close the chatbot's async clients"""
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Chatbot server listening on {self.host}:{self.port} "
+                    f"({self.max_concurrent} concurrent, {self.max_queue} queued)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.chatbot.aclose()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = headers.get("content-length", "0")
+        if not length.isdigit():
+            raise ValueError(f"Invalid Content-Length {length!r}")
+        if int(length) > self.max_body_bytes:
+            raise RequestTooLarge()
+        body = await reader.readexactly(int(length))
+        return method, path.split("?", 1)[0], body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(self._read_request(reader), 10.0)
+            except RequestTooLarge:
+                await self._send_json(writer, 413, {"error": f"Request body over {self.max_body_bytes} bytes"})
+                return
+            except (ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                await self._send_json(writer, 400, {"error": "Malformed request"})
+                return
+
+            if path == "/health":
+                await self._send_json(writer, 200, {"status": "ok"})
+            elif path == "/stats":
+                await self._send_json(writer, 200, self.stats())
+            elif path != "/ask":
+                await self._send_json(writer, 404, {"error": f"Unknown path {path}"})
+            elif method != "POST":
+                await self._send_json(writer, 405, {"error": "Use POST"})
+            else:
+                await self._handle_ask(writer, body)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_ask(self, writer: asyncio.StreamWriter, body: bytes):
+        try:
+            request = json.loads(body or b"{}")
+            question = str(request["question"]).strip()
+        except (ValueError, KeyError, TypeError):
+            await self._send_json(writer, 400, {"error": "Expected JSON body with a 'question'"})
+            return
+        if not question:
+            await self._send_json(writer, 400, {"error": "Empty question"})
+            return
+
+        started = time.monotonic()
+        deadline = started + self.request_timeout
+        try:
+            await asyncio.wait_for(self._acquire_slot(), self.request_timeout)
+        except ServerBusy:
+            self.counters["rejected"] += 1
+            await self._send_json(writer, 503, {"error": "Server busy, try again later"}, {"Retry-After": "5"})
+            return
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            await self._send_json(writer, 504, {"error": "Timed out waiting for a free slot"})
+            return
+
+        self.active += 1
+        try:
+            if request.get("stream"):
+                await self._stream_answer(writer, question, deadline)
+            else:
+                answer = await asyncio.wait_for(self._collect_answer(question), deadline - time.monotonic())
+                self.counters["served"] += 1
+                await self._send_json(writer, 200, {"answer": answer, "seconds": round(time.monotonic() - started, 3)})
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            await self._send_json(writer, 504, {"error": f"No answer within {self.request_timeout}s"})
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.error(f"Error answering '{question}': {e}")
+            await self._send_json(writer, 500, {"error": "Internal error"})
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def _acquire_slot(self):
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            raise ServerBusy()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+    async def _collect_answer(self, question: str) -> str:
+        return "".join([token async for token in self.chatbot.ask_question_stream(question)])
+
+    async def _stream_answer(self, writer: asyncio.StreamWriter, question: str, deadline: float):
+        """Send answer fragments as HTTP chunks while they are generated"""
+        tokens = self.chatbot.ask_question_stream(question)
+        try:
+            first = await asyncio.wait_for(tokens.__anext__(), deadline - time.monotonic())
+        except StopAsyncIteration:
+            first = ""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        try:
+            token = first
+            while True:
+                if token:
+                    data = token.encode("utf-8")
+                    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    await writer.drain()
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), deadline - time.monotonic())
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    # Headers are already sent, end the answer with a note instead of a 504
+                    self.counters["timeouts"] += 1
+                    token = f"\n\n[answer cut off after {self.request_timeout}s]"
+                    data = token.encode("utf-8")
+                    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            self.counters["served"] += 1
+        finally:
+            await tokens.aclose()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any],
+                         headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, 'Internal Server Error')}",
+                "Content-Type: application/json", f"Content-Length: {len(body)}", "Connection: close"]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "llm_waiting": self.chatbot.llm_limiter.waiting,
+            **self.counters,
+            "query_cache": self.chatbot.query_cache.stats(),
+            "result_cache": self.chatbot.result_cache.stats(),
+            "router": self.chatbot.router.stats(),
+            "guard": self.chatbot.guard.stats(),
+        }
+
+
+def main():
+    """Serve the chatbot over HTTP"""
+    llm_rpm = os.environ.get("LLM_REQUESTS_PER_MINUTE")
+    chatbot = MaintenanceKGChatbot(
+        groq_api_key=os.environ.get("GROQ_API_KEY"),
+        neo4j_uri=os.environ.get("NEO4J_URI", "bolt://localhost:7687"),
+        neo4j_user=os.environ.get("NEO4J_USER"),
+        neo4j_password=os.environ.get("NEO4J_PASSWORD"),
+        query_cache_path=os.environ.get("QUERY_CACHE_PATH", "query_cache.sqlite"),
+        neo4j_pool_size=int(os.environ.get("NEO4J_POOL_SIZE", "100")),
+        llm_requests_per_minute=float(llm_rpm) if llm_rpm else None,
+        use_graph_snapshot=os.environ.get("USE_GRAPH_SNAPSHOT", "false").lower() == "true"
+    )
+    server = ChatServer(
+        chatbot,
+        host=os.environ.get("CHAT_HOST", "0.0.0.0"),
+        port=int(os.environ.get("CHAT_PORT", "8080")),
+        max_concurrent=int(os.environ.get("CHAT_MAX_CONCURRENT", "16")),
+        max_queue=int(os.environ.get("CHAT_MAX_QUEUE", "64")),
+        request_timeout=float(os.environ.get("CHAT_REQUEST_TIMEOUT", "60")),
+        max_body_bytes=int(os.environ.get("CHAT_MAX_BODY_BYTES", str(64 * 1024)))
+    )
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    finally:
+        chatbot.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import pandas as pd
+import queue
+import threading
+import logging
+import os
+from typing import Iterator, Iterable, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def iter_csv_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield a CSV file as DataFrames of at most chunk_size rows"""
+    # Reading every cell as text keeps row fingerprints independent of per-chunk dtype inference
+    yield from pd.read_csv(file_path, chunksize=chunk_size, dtype=str)
+
+
+def iter_excel_chunks(file_path: str, chunk_size: int, sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Yield an Excel sheet as DataFrames of at most chunk_size rows, streaming it with openpyxl"""
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(column) if column is not None else f"Unnamed: {i}" for i, column in enumerate(header)]
+        
+        start = 0
+        buffer = []
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            buffer.append([str(value) if value is not None else None for value in values[:len(columns)]])
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=range(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def read_chunks(file_path: str, chunk_size: int = 1000, sheet_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file or an Excel workbook sheet in fixed-size row chunks
+    
+    Chunks keep a running row index across the whole file and hold every cell as text.
+    """
+    if os.path.splitext(file_path)[1].lower() in EXCEL_EXTENSIONS:
+        return iter_excel_chunks(file_path, chunk_size, sheet_name)
+    return iter_csv_chunks(file_path, chunk_size)
+
+
+_DONE = object()
+
+
+def prefetch(items: Iterable[Any], max_items: int = 2) -> Iterator[Any]:
+    """
+    Produce items on a background thread through a bounded queue
+    
+    The producer runs at most max_items ahead of the consumer, so reading the next
+    chunks overlaps with processing the current one while memory stays bounded.
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=max_items)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(e)
+            return
+        put(_DONE)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
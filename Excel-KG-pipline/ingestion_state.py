@@ -0,0 +1,128 @@
+import sqlite3
+import json
+import threading
+import logging
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionState:
+    """
+    Sidecar store of row fingerprints and the graph items each row produced
+
+    Every ingested row is stored under its fingerprint together with the nodes
+    and relationships it produced. Nodes (by name) and relationships (by source, type,
+    target) are reference counted across rows, so removing a row reports
+    exactly the items that no remaining row produces any more.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                fingerprint TEXT PRIMARY KEY,
+                provenance TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS node_refs (
+                name TEXT PRIMARY KEY,
+                label TEXT,
+                refs INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS edge_refs (
+                source TEXT NOT NULL,
+                type TEXT NOT NULL,
+                target TEXT NOT NULL,
+                refs INTEGER NOT NULL,
+                PRIMARY KEY (source, type, target)
+            );
+        """)
+        self._conn.commit()
+
+    def fingerprints(self) -> Set[str]:
+        """Return the fingerprints of all ingested rows"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT fingerprint FROM rows")}
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM rows LIMIT 1").fetchone() is None
+
+    def clear(self):
+        """Forget all rows, used when the graph is rebuilt from scratch"""
+        with self._lock:
+            self._conn.executescript("DELETE FROM rows; DELETE FROM node_refs; DELETE FROM edge_refs;")
+            self._conn.commit()
+
+    def add_rows(self, rows: Iterable[Tuple[str, Dict[str, Optional[str]], Set[Tuple[str, str, str]]]]):
+        """
+        Record ingested rows
+
+        Args:
+            rows: Tuples of (fingerprint, {node name: label}, {(source, type, target)})
+        """
+        with self._lock:
+            for fingerprint, nodes, edges in rows:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO rows (fingerprint, provenance) VALUES (?, ?)",
+                    (fingerprint, json.dumps({"nodes": nodes, "edges": sorted(edges)}))
+                ).rowcount
+                if not inserted:
+                    continue
+                self._conn.executemany("""
+                    INSERT INTO node_refs (name, label, refs) VALUES (?, ?, 1)
+                    ON CONFLICT(name) DO UPDATE SET refs = refs + 1, label = COALESCE(excluded.label, label)
+                """, list(nodes.items()))
+                self._conn.executemany("""
+                    INSERT INTO edge_refs (source, type, target, refs) VALUES (?, ?, ?, 1)
+                    ON CONFLICT(source, type, target) DO UPDATE SET refs = refs + 1
+                """, list(edges))
+            self._conn.commit()
+
+    def remove_rows(self, fingerprints: Iterable[str]) -> Tuple[List[Tuple[str, Optional[str]]], List[Tuple[str, str, str]]]:
+        """
+        Forget rows and release their references
+
+        Returns:
+            Tuple of (orphaned nodes as (name, label), orphaned edges as (source, type, target))
+        """
+        orphan_nodes = []
+        orphan_edges = []
+        with self._lock:
+            for fingerprint in fingerprints:
+                row = self._conn.execute("SELECT provenance FROM rows WHERE fingerprint = ?", (fingerprint,)).fetchone()
+                if row is None:
+                    continue
+                provenance = json.loads(row[0])
+                self._conn.execute("DELETE FROM rows WHERE fingerprint = ?", (fingerprint,))
+
+                for source, rel_type, target in provenance["edges"]:
+                    self._conn.execute(
+                        "UPDATE edge_refs SET refs = refs - 1 WHERE source = ? AND type = ? AND target = ?",
+                        (source, rel_type, target)
+                    )
+                for name in provenance["nodes"]:
+                    self._conn.execute("UPDATE node_refs SET refs = refs - 1 WHERE name = ?", (name,))
+
+            orphan_edges = [tuple(edge) for edge in self._conn.execute(
+                "SELECT source, type, target FROM edge_refs WHERE refs <= 0"
+            )]
+            orphan_nodes = [tuple(node) for node in self._conn.execute(
+                "SELECT name, label FROM node_refs WHERE refs <= 0"
+            )]
+            self._conn.execute("DELETE FROM edge_refs WHERE refs <= 0")
+            self._conn.execute("DELETE FROM node_refs WHERE refs <= 0")
+            self._conn.commit()
+
+        return orphan_nodes, orphan_edges
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
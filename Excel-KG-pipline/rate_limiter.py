@@ -0,0 +1,104 @@
+import threading
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter for LLM API calls
+
+    Two buckets are kept: one for requests per minute and one for tokens per minute.
+    Both refill continuously. A budget of None disables that bucket. After a 429
+    every caller is paused until the backoff window has passed.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        """
+        Args:
+            requests_per_minute: Request budget per minute (None for unlimited)
+            tokens_per_minute: Token budget per minute, prompt plus completion (None for unlimited)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._backoff_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request and the estimated number of tokens are available"""
+        if self.tokens_per_minute:
+            # A single request larger than the whole budget would otherwise wait forever
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self._blocked_until - now
+                if self.requests_per_minute and self._request_allowance < 1:
+                    wait = max(wait, (1 - self._request_allowance) * 60.0 / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_allowance < tokens:
+                    wait = max(wait, (tokens - self._token_allowance) * 60.0 / self.tokens_per_minute)
+
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    return
+
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a request is known"""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._token_allowance -= actual_tokens - min(estimated_tokens, self.tokens_per_minute)
+
+    def backoff(self, retry_after: Optional[float] = None) -> float:
+        """
+        Pause all callers after a 429 response or a transient API failure
+
+        Args:
+            retry_after: Delay suggested by the server, if any
+
+        Returns:
+            Number of seconds callers will wait
+        """
+        with self._lock:
+            if retry_after is None:
+                # Exponential backoff, reset once a request succeeds
+                self._backoff_seconds = min(max(self._backoff_seconds * 2, 1.0), 60.0)
+                delay = self._backoff_seconds
+            else:
+                delay = retry_after
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        logger.warning(f"LLM API rate limited or unavailable, backing off for {delay:.1f}s")
+        return delay
+
+    def reset_backoff(self):
+        """Reset the exponential backoff after a successful request"""
+        with self._lock:
+            self._backoff_seconds = 0.0
@@ -0,0 +1,209 @@
+import pandas as pd
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rcm_column_schema.json")
+
+
+def normalize_column_name(column: Any) -> str:
+    """Strip whitespace and the '*' markers used in some RCM sheet headers"""
+    return str(column).strip().lstrip('*').strip()
+
+
+def _to_type(value: Any) -> str:
+    return re.sub(r'\W+', '_', str(value).strip()).upper()
+
+
+def _clean(series: pd.Series) -> pd.Series:
+    """Convert a column to stripped strings with empty cells as NA"""
+    return series.astype('string').str.strip().replace('', pd.NA)
+
+
+def schema_from_mapping(schema_response: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert an LLM schema analysis (see schema_response.json) into a column schema
+    
+    Columns mapped to "<Label>.name" become nodes, columns mapped to other
+    "<Label>.<property>" targets become properties of that node, and every schema
+    relationship whose two labels both have a name column becomes a relationship.
+    """
+    mapping = schema_response["mapping"]["csv_column_to_graph"]
+    
+    nodes = {}
+    for column, target in mapping.items():
+        label, prop = target["maps_to"].split(".", 1)
+        if prop == "name":
+            nodes[label] = {"column": column, "label": label, "properties": {}}
+    for column, target in mapping.items():
+        label, prop = target["maps_to"].split(".", 1)
+        if prop != "name" and label in nodes:
+            nodes[label]["properties"][prop] = column
+    
+    relationships = []
+    for rel in schema_response.get("schema", {}).get("relationships", []):
+        if rel["from"] in nodes and rel["to"] in nodes:
+            relationships.append({
+                "source": nodes[rel["from"]]["column"],
+                "target": nodes[rel["to"]]["column"],
+                "type": rel["type"]
+            })
+    
+    return {"nodes": list(nodes.values()), "relationships": relationships}
+
+
+class RuleBasedExtractor:
+    """
+    Deterministic extractor that maps structured CSV columns to graph nodes and relationships
+    
+    The mapping is declared in a column schema (see rcm_column_schema.json):
+    every node spec turns one column into nodes with a fixed label, or a label
+    looked up from another column, plus optional property columns. Relationship
+    specs connect two node columns with a fixed type or a type looked up from
+    another column. The whole frame is converted column by column, without any
+    LLM calls.
+    """
+    
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            schema: Column schema dictionary (defaults to rcm_column_schema.json)
+        """
+        if schema is None:
+            with open(DEFAULT_SCHEMA_PATH) as f:
+                schema = json.load(f)
+        self.schema = schema
+        self.node_specs = {spec["column"]: spec for spec in schema["nodes"]}
+    
+    @classmethod
+    def from_file(cls, schema_path: str) -> "RuleBasedExtractor":
+        """Load a column schema, or an LLM schema analysis like schema_response.json"""
+        with open(schema_path) as f:
+            schema = json.load(f)
+        if "mapping" in schema:
+            schema = schema_from_mapping(schema)
+        return cls(schema)
+    
+    def _lookup(self, df: pd.DataFrame, spec: Dict[str, Any], fixed_key: str, by_key: str) -> pd.Series:
+        """Resolve a fixed value or a per-row value looked up from another column"""
+        if fixed_key in spec:
+            return pd.Series(spec[fixed_key], index=df.index, dtype='string')
+        
+        by = spec[by_key]
+        keys = _clean(df[by["column"]]) if by["column"] in df.columns else pd.Series(pd.NA, index=df.index, dtype='string')
+        values = keys.map(by["values"]).astype('string')
+        if by.get("default"):
+            return values.fillna(by["default"])
+        # Without a default the looked up cell itself becomes the type
+        return values.fillna(keys.map(_to_type, na_action='ignore').astype('string'))
+    
+    def _properties(self, df: pd.DataFrame, spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+        columns = {prop: column for prop, column in spec.get("properties", {}).items() if column in df.columns}
+        if not columns:
+            return [{} for _ in range(len(df))]
+        
+        frame = pd.DataFrame({prop: _clean(df[column]) for prop, column in columns.items()}, index=df.index)
+        return [
+            {key: value for key, value in record.items() if not pd.isna(value)}
+            for record in frame.to_dict('records')
+        ]
+    
+    def extract_frames(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Convert a DataFrame into long-format entity and relationship frames
+        
+        Args:
+            df: Input rows, any '*' header markers are ignored
+            
+        Returns:
+            Tuple of (entities, relationships) frames. Both carry a "row" column with
+            the index of the input row that produced each item.
+        """
+        df = df.rename(columns=normalize_column_name)
+        
+        names = {}
+        labels = {}
+        entity_frames = []
+        for column, spec in self.node_specs.items():
+            if column not in df.columns:
+                logger.warning(f"Column '{column}' from the schema is missing in the data")
+                continue
+            names[column] = _clean(df[column])
+            labels[column] = self._lookup(df, spec, "label", "label_by")
+            frame = pd.DataFrame({
+                "row": df.index,
+                "name": names[column],
+                "type": labels[column],
+                "properties": self._properties(df, spec)
+            }, index=df.index)
+            entity_frames.append(frame[names[column].notna()])
+        
+        relationship_frames = []
+        for spec in self.schema.get("relationships", []):
+            source, target = spec["source"], spec["target"]
+            if source not in names or target not in names:
+                continue
+            frame = pd.DataFrame({
+                "row": df.index,
+                "source": names[source],
+                "source_type": labels[source],
+                "target": names[target],
+                "target_type": labels[target],
+                "type": self._lookup(df, spec, "type", "type_by"),
+                "properties": self._properties(df, spec)
+            }, index=df.index)
+            relationship_frames.append(frame[names[source].notna() & names[target].notna()])
+        
+        entity_columns = ["row", "name", "type", "properties"]
+        relationship_columns = ["row", "source", "source_type", "target", "target_type", "type", "properties"]
+        entities = pd.concat(entity_frames, ignore_index=True) if entity_frames else pd.DataFrame(columns=entity_columns)
+        relationships = pd.concat(relationship_frames, ignore_index=True) if relationship_frames else pd.DataFrame(columns=relationship_columns)
+        return entities, relationships
+    
+    def extract_rows(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Extract entities and relationships per row, in the same format as the LLM extractor
+        
+        Returns:
+            List aligned with the rows of df, each {"entities": [...], "relationships": [...]}
+        """
+        entities, relationships = self.extract_frames(df)
+        
+        # A single pass over the records is much cheaper than a groupby with one small frame per row
+        extracted = {row: {"entities": [], "relationships": []} for row in df.index}
+        for key, columns in (("entities", entities), ("relationships", relationships)):
+            fields = [column for column in columns.columns if column != "row"]
+            for row, *values in zip(columns["row"].tolist(), *(columns[field].tolist() for field in fields)):
+                extracted[row][key].append(dict(zip(fields, values)))
+        return list(extracted.values())
+    
+    def extract(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Extract the de-duplicated triple set of a whole DataFrame
+        
+        Properties of repeated nodes and relationships are merged in row order.
+        """
+        entities, relationships = self.extract_frames(df)
+        
+        def merge_properties(properties: pd.Series) -> Dict[str, Any]:
+            merged = {}
+            for item in properties:
+                merged.update(item)
+            return merged
+        
+        entities = (
+            entities.groupby(["type", "name"], sort=False)["properties"]
+            .agg(merge_properties).reset_index()
+        )
+        relationships = (
+            relationships.groupby(["source", "source_type", "target", "target_type", "type"], sort=False)["properties"]
+            .agg(merge_properties).reset_index()
+        )
+        return {
+            "entities": entities.to_dict('records'),
+            "relationships": relationships.to_dict('records')
+        }
@@ -0,0 +1,104 @@
+import sqlite3
+import json
+import logging
+from typing import Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """
+    Checkpoint journal of an ingestion run
+
+    Records the settings of the current run, the index of the last row whose batch
+    was committed to Neo4j, the extraction results of rows that have not been
+    written yet and the rows whose extraction failed. A killed run can then resume
+    without repeating LLM calls or writes, and retry only the failed rows.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS run (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS extracted (
+                row_index INTEGER PRIMARY KEY,
+                extraction TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS failed (
+                row_index INTEGER PRIMARY KEY
+            );
+        """)
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[Any]:
+        row = self._conn.execute("SELECT value FROM run WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, key: str, value: Any):
+        self._conn.execute("INSERT OR REPLACE INTO run (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def unfinished_run(self) -> Optional[Dict[str, Any]]:
+        """Return the settings of an interrupted run, or None"""
+        return self._get("settings")
+
+    def last_committed_index(self) -> Optional[int]:
+        """Index of the last row whose batch was written, or None if no batch was written"""
+        return self._get("last_committed_index")
+
+    def start(self, settings: Dict[str, Any]):
+        """Start a new run, discarding the checkpoint of any previous run"""
+        self._conn.executescript("DELETE FROM run; DELETE FROM extracted; DELETE FROM failed;")
+        self._set("settings", settings)
+        self._conn.commit()
+
+    def record_extraction(self, row_index: int, extraction: Dict[str, Any]):
+        """Persist the extraction result of a row that is not written yet"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extracted (row_index, extraction) VALUES (?, ?)",
+            (int(row_index), json.dumps(extraction))
+        )
+        self._conn.execute("DELETE FROM failed WHERE row_index = ?", (int(row_index),))
+        self._conn.commit()
+
+    def record_failure(self, row_index: int):
+        """Remember a row whose extraction failed so that a resumed run retries it"""
+        self._conn.execute("INSERT OR IGNORE INTO failed (row_index) VALUES (?)", (int(row_index),))
+        self._conn.commit()
+
+    def failed_rows(self) -> Set[int]:
+        """Indexes of the rows whose extraction failed"""
+        return {row[0] for row in self._conn.execute("SELECT row_index FROM failed")}
+
+    def pending_extractions(self) -> Dict[int, Dict[str, Any]]:
+        """Extraction results of rows that were extracted but not written"""
+        return {
+            row_index: json.loads(extraction)
+            for row_index, extraction in self._conn.execute(
+                "SELECT row_index, extraction FROM extracted ORDER BY row_index"
+            )
+        }
+
+    def commit_batch(self, last_index: int):
+        """Checkpoint a written batch, ending with the row at last_index"""
+        # A batch of retried rows can end before the checkpoint, which must not move back
+        previous = self.last_committed_index()
+        self._set("last_committed_index", int(last_index) if previous is None else max(previous, int(last_index)))
+        self._conn.execute("DELETE FROM extracted WHERE row_index <= ?", (int(last_index),))
+        self._conn.commit()
+
+    def finish(self):
+        """Mark the run as complete"""
+        self._conn.executescript("DELETE FROM run; DELETE FROM extracted; DELETE FROM failed;")
+        self._conn.commit()
+
+    def close(self):
+        """Close the SQLite connection"""
+        self._conn.close()
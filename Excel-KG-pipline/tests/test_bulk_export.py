@@ -0,0 +1,81 @@
+import os
+import csv
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("groq")
+pytest.importorskip("neo4j")
+from GroqNeo4jProcessor import CSVToKnowledgeGraph
+
+EXTRACTED_ROWS = [
+    {
+        "entities": [
+            {"name": "Pump P-101", "type": "Asset", "properties": {"site": "North"}},
+            {"name": "Mechanical Seal", "type": "Component", "properties": {}},
+        ],
+        "relationships": [
+            {"source": "Pump P-101", "type": "HAS_COMPONENT", "target": "Mechanical Seal"},
+        ],
+    },
+    {
+        "entities": [
+            {"name": "Mechanical Seal", "type": "Component", "properties": {"material": "carbon"}},
+            {"name": "Seal Leak", "type": "Failure Mode", "properties": {"severity": "High"}},
+        ],
+        "relationships": [
+            {"source": "Mechanical Seal", "type": "has failure mode", "target": "Seal Leak",
+             "properties": {"frequency": "yearly"}},
+            # The target was never extracted as an entity, so the relationship is dropped
+            {"source": "Seal Leak", "type": "CAUSES", "target": "Unknown Part"},
+        ],
+    },
+]
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_export_for_bulk_import_writes_import_csv_files(tmp_path):
+    source = tmp_path / "rcm.csv"
+    source.write_text("Asset,Component\nPump P-101,Mechanical Seal\nPump P-101,Mechanical Seal\n")
+    output_dir = tmp_path / "import"
+
+    # Only the export is exercised, extraction is replaced by the rows above
+    converter = CSVToKnowledgeGraph.__new__(CSVToKnowledgeGraph)
+    converter._extract_rows = lambda chunks, *args: (
+        (index, EXTRACTED_ROWS[index]) for chunk in chunks for index in chunk.index
+    )
+
+    command = converter.export_for_bulk_import(str(source), str(output_dir), extraction_mode="rules")
+
+    assert sorted(os.listdir(output_dir)) == [
+        "nodes_ASSET.csv", "nodes_COMPONENT.csv", "nodes_FAILURE_MODE.csv",
+        "relationships_HAS_COMPONENT.csv", "relationships_HAS_FAILURE_MODE.csv",
+    ]
+    assert read_csv(output_dir / "nodes_ASSET.csv") == [
+        ["name:ID", ":LABEL", "site"],
+        ["Pump P-101", "Entity;ASSET", "North"],
+    ]
+    assert read_csv(output_dir / "nodes_COMPONENT.csv") == [
+        ["name:ID", ":LABEL", "material"],
+        ["Mechanical Seal", "Entity;COMPONENT", "carbon"],
+    ]
+    assert read_csv(output_dir / "nodes_FAILURE_MODE.csv") == [
+        ["name:ID", ":LABEL", "severity"],
+        ["Seal Leak", "Entity;FAILURE_MODE", "High"],
+    ]
+    assert read_csv(output_dir / "relationships_HAS_COMPONENT.csv") == [
+        [":START_ID", ":END_ID", ":TYPE"],
+        ["Pump P-101", "Mechanical Seal", "HAS_COMPONENT"],
+    ]
+    assert read_csv(output_dir / "relationships_HAS_FAILURE_MODE.csv") == [
+        [":START_ID", ":END_ID", ":TYPE", "frequency"],
+        ["Mechanical Seal", "Seal Leak", "HAS_FAILURE_MODE", "yearly"],
+    ]
+    assert command.startswith("neo4j-admin database import full --nodes=")
+    assert command.endswith(" neo4j")
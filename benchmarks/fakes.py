@@ -0,0 +1,302 @@
+"""
+Deterministic local stand-ins for the Groq client, the Neo4j driver and the Ollama embeddings
+
+They implement just the parts of the client APIs the pipeline, the chatbot and the RAG
+indexing use, answer from scripts instead of services, and count what they were asked
+so benchmark runs are repeatable without API keys or a database.
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+# Scripted LLM
+
+CYPHER_ANSWER = {
+    "cypher_query": "MATCH (c:COMPONENT)-[:HAS_FAILURE_MODE]->(fm:FAILURE_MODE) "
+                    "RETURN c.name AS component, fm.name AS failure_mode, fm.severity AS severity LIMIT 50",
+    "explanation": "Failure modes of all components",
+    "expected_result": "Components with their failure modes",
+}
+
+ROW_FIELDS = {
+    "Main Entity": "EQUIPMENT",
+    "Related Entity": "COMPONENT",
+    "Failure Mode": "FAILURE_MODE",
+    "Detection Method": "DETECTION_METHOD",
+    "Maintenance Strategy": "MAINTENANCE_STRATEGY",
+    "Required Spare Parts for this Failure": "SPARE_PART",
+}
+
+
+def extraction_answer(prompt: str) -> str:
+    """Entities and relationships of a rendered RCM row, shaped like the extraction prompt asks"""
+    text = prompt.split("Text to analyze:", 1)[-1]
+    values = dict(re.findall(r"^\s*([A-Za-z ]+):[ \t]*(.+?)\s*$", text, re.MULTILINE))
+    entities = [{"name": values[field], "type": label, "properties": {}}
+                for field, label in ROW_FIELDS.items() if values.get(field)]
+    names = {entity["type"]: entity["name"] for entity in entities}
+    pairs = [("EQUIPMENT", "HAS_COMPONENT", "COMPONENT"), ("COMPONENT", "HAS_FAILURE_MODE", "FAILURE_MODE"),
+             ("FAILURE_MODE", "DETECTED_BY", "DETECTION_METHOD"),
+             ("FAILURE_MODE", "USES_MAINTENANCE_STRATEGY", "MAINTENANCE_STRATEGY"),
+             ("FAILURE_MODE", "REQUIRES_SPARE_PART", "SPARE_PART")]
+    relationships = [
+        {"source": names[source], "source_type": source, "target": names[target], "target_type": target,
+         "type": rel_type, "properties": {}}
+        for source, rel_type, target in pairs if source in names and target in names
+    ]
+    return json.dumps({"entities": entities, "relationships": relationships})
+
+
+def default_script(messages: List[Dict[str, str]]) -> str:
+    """Answer the prompts of the pipeline and the chatbot by recognising them"""
+    prompt = messages[-1]["content"]
+    if "Text to analyze:" in prompt:
+        return extraction_answer(prompt)
+    if "generate an appropriate Cypher query" in prompt:
+        return json.dumps(CYPHER_ANSWER)
+    return "Here is what the knowledge graph shows. " * 20
+
+
+class ScriptedLLM:
+    """
+    Stand-in for the synchronous Groq client with configurable latency
+
+    Each completion takes latency + completion tokens * seconds_per_token seconds; with
+    stream=True the text is returned in small chunks. Prompt and completion tokens are counted.
+    """
+
+    def __init__(self, script: Callable[[List[Dict[str, str]]], str] = default_script,
+                 latency: float = 0.0, seconds_per_token: float = 0.0):
+        """
+        Args:
+            script: Returns the completion text for the chat messages
+            latency: Seconds before the first token
+            seconds_per_token: Generation time per completion token
+        """
+        self.script = script
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _complete(self, messages: List[Dict[str, str]], max_tokens: Optional[int]):
+        text = self.script(messages)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = estimate_tokens(text)
+        if max_tokens and completion_tokens > max_tokens:
+            text, completion_tokens = text[:max_tokens * 4], max_tokens
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        return text, usage
+
+    def create(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, stream: bool = False, **_):
+        text, usage = self._complete(messages, max_tokens)
+        time.sleep(self.latency + usage.completion_tokens * self.seconds_per_token)
+        if stream:
+            return iter(self._chunks(text))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+
+    @staticmethod
+    def _chunks(text: str) -> List[Any]:
+        return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 16]))])
+                for i in range(0, len(text), 16)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens}
+
+
+# Recording graph database
+
+class FakeRecord(dict):
+    def data(self) -> Dict[str, Any]:
+        return dict(self)
+
+
+class FakeResult:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self._rows = [FakeRecord(row) for row in rows]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def single(self) -> Optional[FakeRecord]:
+        return self._rows[0] if self._rows else None
+
+    def fetch(self, n: int) -> List[FakeRecord]:
+        return self._rows[:n]
+
+    def data(self) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._rows]
+
+    def consume(self):
+        return SimpleNamespace(plan=None, counters=None)
+
+
+class FakeTransaction:
+    def __init__(self, graph: "RecordingGraph"):
+        self.graph = graph
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> FakeResult:
+        return self.graph.run(query, {**(parameters or {}), **kwargs})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession(FakeTransaction):
+    def begin_transaction(self, **_) -> FakeTransaction:
+        return FakeTransaction(self.graph)
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(FakeTransaction(self.graph), *args, **kwargs)
+
+    execute_read = execute_write
+
+    def close(self):
+        pass
+
+
+class RecordingGraph:
+    """
+    Stand-in for a Neo4j driver that records every Cypher statement
+
+    Entities and relationships merged by the ingestion pipeline's batched writes are kept
+    so the chatbot's entity lookups and graph snapshot see the ingested graph. The graph version query gets
+    a fixed stamp, schema procedures and EXPLAIN get nothing, and other reads are
+    answered by row_factory. Each statement takes latency seconds.
+    """
+
+    def __init__(self, row_factory: Optional[Callable[[str, Dict[str, Any]], List[Dict[str, Any]]]] = None,
+                 latency: float = 0.0, keep_statements: int = 1000):
+        """
+        Args:
+            row_factory: Returns the rows of a read query, defaults to 20 failure mode rows
+            latency: Seconds per statement
+            keep_statements: Most recent statements kept for inspection, all are counted
+        """
+        self.row_factory = row_factory or self.failure_mode_rows
+        self.latency = latency
+        self.keep_statements = keep_statements
+        self.statements: List[Dict[str, Any]] = []
+        self.statement_count = 0
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.edges: Dict[tuple, Dict[str, Any]] = {}
+        self.version = "benchmark"
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def failure_mode_rows(query: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [{"component": f"Component {i}", "failure_mode": f"Failure Mode {i}", "severity": "Major",
+                 "spare_parts": [f"Spare Part {i}"]} for i in range(20)]
+
+    def session(self, **_) -> FakeSession:
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+    def run(self, query: str, parameters: Dict[str, Any]) -> FakeResult:
+        with self._lock:
+            self.statement_count += 1
+            self.statements.append({"query": " ".join(query.split()), "parameters": parameters})
+            del self.statements[:-self.keep_statements]
+        if self.latency:
+            time.sleep(self.latency)
+
+        merged_nodes = re.search(r"MERGE \(e:Entity \{name: row\.name\}\)\s*SET e:`?(\w+)`?", query)
+        merged_edges = re.search(r"MERGE \(a\)-\[r:`?(\w+)`?\]->\(b\)", query)
+        if merged_nodes or merged_edges:
+            for row in parameters.get("rows", []):
+                if merged_nodes:
+                    self.add_node(row["name"], merged_nodes.group(1), row.get("properties"))
+                else:
+                    self.add_edge(row["source"], merged_edges.group(1), row["target"], row.get("properties"))
+            return FakeResult([])
+        if "m.version AS version" in query:
+            return FakeResult([{"version": self.version}])
+        with self._lock:
+            if "labels(n) AS labels" in query:
+                return FakeResult([{"name": name, "labels": [node["label"], "Entity"], "properties": node["properties"]}
+                                   for name, node in self.nodes.items()])
+            if "type(r) AS type" in query:
+                return FakeResult([{"source": source, "type": rel_type, "target": target, "properties": properties}
+                                   for (source, rel_type, target), properties in self.edges.items()])
+        stripped = query.lstrip().upper()
+        if stripped.startswith(("CALL", "EXPLAIN")) or re.search(r"\b(MERGE|CREATE|DELETE|SET|REMOVE)\b", stripped):
+            return FakeResult([])
+        return FakeResult(self.row_factory(query, parameters))
+
+    def add_node(self, name: str, label: str, properties: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            node = self.nodes.setdefault(name, {"label": label, "properties": {}})
+            node["properties"].update(properties or {})
+
+    def add_edge(self, source: str, rel_type: str, target: str, properties: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.edges.setdefault((source, rel_type, target), {}).update(properties or {})
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"statements": self.statement_count, "nodes": len(self.nodes), "relationships": len(self.edges)}
+
+
+# Embeddings
+
+class HashEmbeddings:
+    """
+    Stand-in for OllamaEmbeddings: unit vectors seeded by a hash of the text
+
+    The same text always gets the same vector. Each embed_documents call takes
+    latency + len(texts) * seconds_per_text seconds.
+    """
+
+    def __init__(self, dimension: int = 768, latency: float = 0.0, seconds_per_text: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.seconds_per_text = seconds_per_text
+        self.texts = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimension)]
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+        time.sleep(self.latency + len(texts) * self.seconds_per_text)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "texts": self.texts}
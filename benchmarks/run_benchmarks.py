@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("Excel-KG-pipline", os.path.join("Excel-KG-pipline", "chatbot"), "llama_faiss_rag"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+from fakes import ScriptedLLM, RecordingGraph, HashEmbeddings
+
+RCM_COLUMNS = ["Level", "Entity", "Relationship", "Related Entity", "Failure Mode", "Severity", "Consequence",
+               "Detection Method", "Maintenance Strategy", "Frequency", "Condition Monitoring Data", "RUL",
+               "Spare Parts"]
+SYSTEMS = ["FuelSystem", "LubricationSystem", "CoolingSystem", "ControlSystem", "AirIntakeSystem"]
+PARTS = ["Pump", "Valve", "Bearing", "Filter", "Seal", "Sensor", "Injector", "Compressor Blade"]
+FAILURES = ["Seizing", "Leak", "Wear", "Clogging", "Cracking", "Drift", "Overheating"]
+DETECTION = ["Vibration monitoring", "Pressure monitoring", "Oil analysis", "Thermography", "Visual inspection"]
+STRATEGIES = ["Predictive Maintenance (PdM)", "Condition-Based Maintenance (CBM)", "Time-Based Maintenance (TBM)"]
+
+# Template questions as sent by load_test.py, plus questions the router hands to the LLM
+LLM_QUESTIONS = [
+    "Why does GasTurbine1 have so many fuel system failures?",
+    "How many failure modes does the Fuel Pump have?",
+    "Compare the RUL of bearings and seals",
+]
+
+
+def synthetic_rcm_rows(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """RCM sheet rows shaped like KG_Chatbot_for_RCM.csv, the same for the same count and seed"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        system = rng.choice(SYSTEMS)
+        part = f"{system.replace('System', '')} {rng.choice(PARTS)}"
+        failure = f"{part} {rng.choice(FAILURES)}"
+        rows.append({
+            "Level": "Equipment", "Entity": f"GasTurbine{i % 50 + 1}", "Relationship": "HasAssembly",
+            "Related Entity": system, "Failure Mode": failure,
+            "Severity": rng.choice(["Critical", "Major", "Minor"]), "Consequence": "Operational downtime",
+            "Detection Method": rng.choice(DETECTION), "Maintenance Strategy": rng.choice(STRATEGIES),
+            "Frequency": f"{rng.choice([250, 500, 1000])} hours", "Condition Monitoring Data": "Levels > threshold",
+            "RUL": f"{rng.randint(100, 900)} hrs", "Spare Parts": part,
+        })
+    return rows
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {f"p{q}_ms": round(percentile(latencies, q) * 1000, 3) for q in (50, 95, 99)}
+
+
+def bench_ingestion(rows: int, mode: str, llm: ScriptedLLM, graph_latency: float, batch_size: int,
+                    concurrency: int, workdir: str) -> Dict[str, Any]:
+    """Rows per second of a full CSV ingestion against the fakes"""
+    import pandas as pd
+    from GroqNeo4jProcessor import CSVToKnowledgeGraph
+
+    csv_path = os.path.join(workdir, f"rcm_{rows}.csv")
+    if not os.path.exists(csv_path):
+        pd.DataFrame(synthetic_rcm_rows(rows), columns=RCM_COLUMNS).to_csv(csv_path, index=False)
+
+    graph = RecordingGraph(latency=graph_latency)
+    converter = CSVToKnowledgeGraph(groq_api_key="offline", neo4j_uri="bolt://localhost:7687",
+                                    neo4j_user="neo4j", neo4j_password="offline")
+    converter.driver.close()
+    converter.driver, converter.groq_client = graph, llm
+    llm_before = llm.stats()
+    started = time.perf_counter()
+    try:
+        converter.process_csv_to_knowledge_graph(csv_path, batch_size=batch_size, extraction_mode=mode,
+                                                 max_concurrent_requests=concurrency)
+    finally:
+        converter.close()
+    seconds = time.perf_counter() - started
+    return {
+        "scenario": "ingestion", "rows": rows, "mode": mode, "batch_size": batch_size, "concurrency": concurrency,
+        "seconds": round(seconds, 3), "rows_per_sec": round(rows / seconds, 1),
+        "llm": {k: v - llm_before[k] for k, v in llm.stats().items()}, "graph": graph.stats(),
+    }
+
+
+def bench_chatbot(questions: int, llm: ScriptedLLM, graph_latency: float, use_graph_snapshot: bool) -> Dict[str, Any]:
+    """Latency percentiles of ask_question over a mix of template and LLM-generated questions"""
+    from chatbot import MaintenanceKGChatbot
+    from load_test import QUESTIONS
+
+    graph = RecordingGraph(latency=graph_latency)
+    for row in synthetic_rcm_rows(500):
+        graph.add_node(row["Entity"], "EQUIPMENT")
+        graph.add_node(row["Related Entity"], "SYSTEM")
+        graph.add_node(row["Spare Parts"], "COMPONENT")
+        graph.add_node(row["Failure Mode"], "FAILURE_MODE", {"severity": row["Severity"], "rul": row["RUL"]})
+        graph.add_node(row["Detection Method"], "DETECTION_METHOD")
+        graph.add_node(row["Maintenance Strategy"], "MAINTENANCE_STRATEGY")
+        graph.add_node(f"{row['Spare Parts']} Kit", "SPARE_PART")
+        graph.add_edge(row["Entity"], "HAS_ASSEMBLY", row["Related Entity"])
+        graph.add_edge(row["Related Entity"], "HAS_COMPONENT", row["Spare Parts"])
+        graph.add_edge(row["Spare Parts"], "HAS_FAILURE_MODE", row["Failure Mode"])
+        graph.add_edge(row["Failure Mode"], "DETECTED_BY", row["Detection Method"])
+        graph.add_edge(row["Failure Mode"], "USES_MAINTENANCE_STRATEGY", row["Maintenance Strategy"],
+                       {"frequency": row["Frequency"]})
+        graph.add_edge(row["Failure Mode"], "REQUIRES_SPARE_PART", f"{row['Spare Parts']} Kit")
+    bot = MaintenanceKGChatbot(groq_api_key="offline", neo4j_uri="bolt://localhost:7687", neo4j_user="neo4j",
+                               neo4j_password="offline", use_graph_snapshot=use_graph_snapshot)
+    bot.driver.close()
+    bot.driver, bot.groq_client = graph, llm
+    mix = QUESTIONS + LLM_QUESTIONS
+    llm_before = llm.stats()
+    latencies = []
+    try:
+        for i in range(questions):
+            started = time.perf_counter()
+            bot.ask_question(mix[i % len(mix)])
+            latencies.append(time.perf_counter() - started)
+        router, query_cache = bot.router.stats(), bot.query_cache.stats()
+    finally:
+        bot.close()
+    return {
+        "scenario": "chatbot", "questions": questions, "graph_snapshot": use_graph_snapshot,
+        **latency_summary(latencies), "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "template_hit_rate": router["hit_rate"], "query_cache_hit_rate": query_cache["hit_rate"],
+        "llm": {k: v - llm_before[k] for k, v in llm.stats().items()}, "graph": graph.stats(),
+    }
+
+
+def bench_rag(pages: int, backend: str, embedding_latency: float, workdir: str) -> Dict[str, Any]:
+    """Chunking and indexing time of a synthetic manual, with a cold and a warm embedding cache"""
+    from document_ingestion import CachedEmbeddings, EmbeddingCache, split_stream
+    from vector_backends import build_store
+
+    rng = random.Random(pages)
+    manual = [
+        " ".join(f"The {rng.choice(PARTS).lower()} of the {rng.choice(SYSTEMS)} shows {rng.choice(FAILURES).lower()} "
+                 f"when {rng.choice(DETECTION).lower()} exceeds its limit." for _ in range(40))
+        for _ in range(pages)
+    ]
+    started = time.perf_counter()
+    texts = list(split_stream(manual, 1000, 200))
+    chunk_seconds = time.perf_counter() - started
+    metadatas = [{"source": f"{i}-pl"} for i in range(len(texts))]
+
+    fake = HashEmbeddings(latency=embedding_latency)
+    cache = EmbeddingCache(os.path.join(workdir, f"embeddings_{backend}_{pages}.sqlite"))
+    embeddings = CachedEmbeddings(fake, "benchmark", cache)
+    timings = {}
+    try:
+        for run in ("cold", "warm"):
+            started = time.perf_counter()
+            build_store(backend, os.path.join(workdir, f"index_{backend}_{pages}_{run}"), texts, metadatas, embeddings)
+            timings[f"{run}_index_seconds"] = round(time.perf_counter() - started, 3)
+    finally:
+        cache.close()
+    return {
+        "scenario": "rag_indexing", "pages": pages, "backend": backend, "chunks": len(texts),
+        "chunk_seconds": round(chunk_seconds, 3), **timings,
+        "chunks_per_sec": round(len(texts) / max(timings["cold_index_seconds"], 1e-9), 1),
+        "embeddings": fake.stats(),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+PARAMETERS = ("scenario", "rows", "mode", "batch_size", "concurrency", "questions", "graph_snapshot",
+              "pages", "backend")
+METRICS = ("rows_per_sec", "p50_ms", "p95_ms", "p99_ms", "cold_index_seconds", "warm_index_seconds")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    """Print the change of every metric against a previous run"""
+    with open(baseline_path) as f:
+        baseline = {tuple(r.get(k) for k in PARAMETERS): r for r in json.load(f)["results"]}
+    for result in results:
+        previous = baseline.get(tuple(result.get(k) for k in PARAMETERS))
+        if previous is None:
+            continue
+        changes = [
+            f"{metric} {previous[metric]} -> {result[metric]} ({(result[metric] / previous[metric] - 1) * 100:+.1f}%)"
+            for metric in METRICS if previous.get(metric) and metric in result
+        ]
+        print(f"{result['scenario']}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of ingestion, chatbot and RAG indexing")
+    parser.add_argument("--scenarios", nargs="+", default=["ingestion", "chatbot", "rag"],
+                        choices=["ingestion", "chatbot", "rag"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--modes", nargs="+", default=["llm", "rules"], choices=["llm", "rules"])
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent extraction requests")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--rag-pages", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--rag-backends", nargs="+", default=["chroma", "faiss"])
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per LLM call")
+    parser.add_argument("--llm-seconds-per-token", type=float, default=0.0)
+    parser.add_argument("--graph-latency", type=float, default=0.0, help="Seconds per Cypher statement")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per embedding request")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    parser.add_argument("--verbose", action="store_true", help="Keep the INFO logs of the benchmarked code")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    llm = ScriptedLLM(latency=args.llm_latency, seconds_per_token=args.llm_seconds_per_token)
+    results = []
+
+    def record(result: Dict[str, Any]):
+        results.append(result)
+        print(json.dumps(result))
+        sys.stdout.flush()
+
+    with tempfile.TemporaryDirectory(prefix="kg_bench_") as workdir:
+        if "ingestion" in args.scenarios:
+            for rows in args.rows:
+                for mode in args.modes:
+                    record(bench_ingestion(rows, mode, llm, args.graph_latency, args.batch_size,
+                                           args.concurrency, workdir))
+        if "chatbot" in args.scenarios:
+            for use_graph_snapshot in (False, True):
+                record(bench_chatbot(args.questions, llm, args.graph_latency, use_graph_snapshot))
+        if "rag" in args.scenarios:
+            for pages in args.rag_pages:
+                for backend in args.rag_backends:
+                    record(bench_rag(pages, backend, args.embedding_latency, workdir))
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
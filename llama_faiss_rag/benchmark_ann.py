@@ -0,0 +1,144 @@
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+from vector_backends import FaissVectorStore
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real chunk embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    vectors = np.empty((count, dim), dtype="float32")
+    # Generated in blocks so 1M x 768 floats are the only large allocation
+    for start in range(0, count, 65536):
+        stop = min(start + 65536, count)
+        assigned = rng.integers(0, clusters, stop - start)
+        vectors[start:stop] = centers[assigned] + 0.6 * rng.standard_normal((stop - start, dim)).astype("float32")
+    return FaissVectorStore._normalize(vectors)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force top-k by inner product, the recall ground truth"""
+    truth = np.empty((len(queries), k), dtype="int64")
+    for i in range(0, len(queries), 64):
+        scores = queries[i:i + 64] @ vectors.T
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        truth[i:i + 64] = np.take_along_axis(top, order, axis=1)
+    return truth
+
+
+def recall_at_k(found: List[List[int]], truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f[:k]) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def timed_search(search, queries: np.ndarray, k: int) -> Tuple[List[List[int]], Dict[str, float]]:
+    """Search one query at a time, as the app does, and return (ids, latency percentiles in ms)"""
+    found, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        ids = search(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append([int(i) for i in ids])
+    return found, {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def bench_faiss(vectors, queries, truth, k, index_type, params, sweep_name, sweep) -> Iterator[Dict]:
+    import faiss
+
+    started = time.perf_counter()
+    index = FaissVectorStore.create_index(vectors, index_type, **params)
+    build_seconds = time.perf_counter() - started
+
+    directory = tempfile.mkdtemp(prefix="ann_bench_")
+    try:
+        # Search the saved index the way the app opens it, memory-mapped where possible
+        path = f"{directory}/index.faiss"
+        faiss.write_index(index, path)
+        try:
+            index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            mmap = True
+        except RuntimeError:
+            index, mmap = faiss.read_index(path), False
+        parameters = faiss.ParameterSpace()
+        for value in sweep or [None]:
+            if value is not None:
+                parameters.set_index_parameter(index, sweep_name, value)
+            found, latency = timed_search(lambda q, k: index.search(q[None, :], k)[1][0], queries, k)
+            yield {"backend": f"faiss-{index_type}", **params, **({sweep_name: value} if value else {}),
+                   "recall": round(recall_at_k(found, truth), 4), **latency,
+                   "build_seconds": round(build_seconds, 2), "mmap": mmap}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_chroma(vectors, queries, truth, k) -> Iterator[Dict]:
+    import chromadb
+
+    directory = tempfile.mkdtemp(prefix="ann_bench_")
+    try:
+        client = chromadb.PersistentClient(path=directory)
+        collection = client.create_collection("document", metadata={"hnsw:space": "ip"})
+        started = time.perf_counter()
+        batch = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+        for start in range(0, len(vectors), batch):
+            stop = min(start + batch, len(vectors))
+            collection.add(ids=[str(i) for i in range(start, stop)], embeddings=vectors[start:stop].tolist())
+        build_seconds = time.perf_counter() - started
+        found, latency = timed_search(
+            lambda q, k: collection.query(query_embeddings=[q.tolist()], n_results=k)["ids"][0], queries, k
+        )
+        yield {"backend": "chroma", "recall": round(recall_at_k(found, truth), 4), **latency,
+               "build_seconds": round(build_seconds, 2)}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall@k and query latency of the vector backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768, help="768 matches nomic-embed-text")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=4, help="Chunks retrieved per question by the app")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--chroma-max-size", type=int, default=None,
+                        help="Skip Chroma above this many chunks for quick runs; by default it runs at every "
+                             "size, at 1M chunks its build takes far longer than the FAISS indexes")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        vectors = synthetic_vectors(size, args.dim)
+        # Queries are perturbed corpus vectors, like questions close to a passage
+        rng = np.random.default_rng(1)
+        picked = vectors[rng.integers(0, size, args.queries)]
+        queries = FaissVectorStore._normalize(picked + 0.05 * rng.standard_normal(picked.shape).astype("float32"))
+        truth = exact_neighbours(vectors, queries, args.k)
+
+        runs = [
+            bench_faiss(vectors, queries, truth, args.k, "flat", {}, None, None),
+            bench_faiss(vectors, queries, truth, args.k, "hnsw", {"hnsw_m": 32}, "efSearch", args.ef_search),
+            bench_faiss(vectors, queries, truth, args.k, "ivfpq", {"nlist": int(4 * size ** 0.5), "pq_m": 64},
+                        "nprobe", args.nprobe),
+        ]
+        if args.chroma_max_size is None or size <= args.chroma_max_size:
+            runs.append(bench_chroma(vectors, queries, truth, args.k))
+        else:
+            print(json.dumps({"chunks": size, "backend": "chroma", "skipped": f"--chroma-max-size {args.chroma_max_size}"}))
+        for run in runs:
+            for result in run:
+                print(json.dumps({"chunks": size, "k": args.k, **result}))
+                sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
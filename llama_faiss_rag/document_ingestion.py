@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from PyPDF2 import PdfReader
+from langchain_core.embeddings import Embeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Worker: extract the text of pages start..stop-1"""
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(path: str, workers: Optional[int] = None, pages_per_task: int = 8) -> Iterator[str]:
+    """
+    Yield the text of every page of a PDF in order, extracting pages in a process pool
+
+    Small documents are extracted in-process, where starting workers would cost more than it saves.
+
+    Args:
+        path: PDF file
+        workers: Worker processes (defaults to the number of CPUs)
+        pages_per_task: Pages extracted per task sent to a worker
+    """
+    page_count = len(PdfReader(path).pages)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or page_count <= 2 * pages_per_task:
+        yield from _extract_page_range(path, 0, page_count)
+        return
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    # spawn: the caller may be a threaded server, where forking is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for pages in pool.map(_extract_page_range, [path] * len(ranges),
+                              [start for start, _ in ranges], [stop for _, stop in ranges]):
+            yield from pages
+
+
+def split_stream(pages: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[str]:
+    """
+    Split a stream of page texts into chunks without joining the whole document first
+
+    Text is buffered until it spans several chunks; all chunks but the last are emitted and
+    the last one is carried over, so chunks continue across page boundaries.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    buffer: List[str] = []
+    buffered = 0
+    for page in pages:
+        if not page:
+            continue
+        buffer.append(page)
+        buffered += len(page) + 1
+        if buffered >= 4 * chunk_size:
+            chunks = splitter.split_text("\n".join(buffer))
+            yield from chunks[:-1]
+            buffer, buffered = [chunks[-1]], len(chunks[-1])
+    if buffer:
+        yield from splitter.split_text("\n".join(buffer))
+
+
+def chunk_pdf(path: str, chunk_size: int = 1000, chunk_overlap: int = 200,
+              workers: Optional[int] = None) -> Tuple[List[str], List[dict]]:
+    """Extract and split a PDF, returning chunk texts and their metadata"""
+    texts = list(split_stream(iter_pdf_pages(path, workers), chunk_size, chunk_overlap))
+    metadatas = [{"source": f"{i}-pl"} for i in range(len(texts))]
+    return texts, metadatas
+
+
+class EmbeddingCache:
+    """
+    SQLite store of chunk embeddings keyed by a hash of the embedding model and chunk text
+
+    Vectors are stored as float32 blobs. Unchanged chunks of a revised document, or the
+    same chunk in another document, are never embedded twice.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file of the cache
+        """
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay below SQLite's limit on query parameters
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                [(key, array("f", vector).tobytes()) for key, vector in items.items()]
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves chunks from an EmbeddingCache and embeds the rest
+    in concurrent batches
+
+    Queries are passed straight through to the wrapped embeddings.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache,
+                 batch_size: int = 32, concurrency: int = 4):
+        """
+        Args:
+            embeddings: Embeddings that compute missing vectors
+            model: Embedding model name, part of the cache key
+            cache: Persistent chunk embedding cache
+            batch_size: Chunks per embedding request
+            concurrency: Embedding requests in flight at once
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing = list({key: text for key, text in zip(keys, texts) if key not in vectors}.items())
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for batch, embedded in zip(batches, pool.map(
+                        lambda b: self.embeddings.embed_documents([text for _, text in b]), batches)):
+                    computed = {key: vector for (key, _), vector in zip(batch, embedded)}
+                    self.cache.put_many(computed)
+                    vectors.update(computed)
+        logger.info(f"Embedded {len(missing)} of {len(texts)} chunks, {len(texts) - len(missing)} from cache")
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,190 @@
+import os
+import re
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+from vector_backends import BUILD_PARAMS, DEFAULT_INDEX_TYPE, build_store, open_store
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file's content without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_key(content_hash: str, embedding_model: str, chunk_size: int, chunk_overlap: int,
+              backend: str = "chroma", backend_params: Dict[str, Any] = None) -> str:
+    """
+    Index identifier: the same document embedded, chunked and indexed the same way gives the same key
+
+    FAISS keys also name the index type and its build parameters, so that an index built
+    with other settings is not reused. Search parameters (nprobe, ef_search) are left out.
+    """
+    model = re.sub(r"[^A-Za-z0-9_.-]", "_", embedding_model)
+    key = f"{content_hash}-{model}-{chunk_size}-{chunk_overlap}"
+    if backend == "chroma":
+        return key
+    key = f"{key}-{backend}"
+    if backend == "faiss":
+        params = backend_params or {}
+        key += f"-{params.get('index_type', DEFAULT_INDEX_TYPE)}"
+        key += "".join(f"-{name}{params[name]}" for name in BUILD_PARAMS if name in params)
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+def _directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path) for name in names
+    )
+
+
+class DocumentIndexStore:
+    """
+    On-disk vector indexes of uploaded documents, reused across chat sessions
+
+    Each document is indexed once under a key derived from its content hash (see index_key)
+    in its own persist directory. A SQLite manifest records size and last use, and the least
+    recently used indexes are deleted once the store holds more than max_documents indexes
+    or max_bytes on disk. Indexes attached to a live session in this process are never evicted.
+    The indexes are built with one of the vector_backends (Chroma or FAISS).
+    """
+
+    def __init__(self, root_dir: str, max_documents: int = 20, max_bytes: int = 10 * 1024 ** 3,
+                 backend: str = "chroma", backend_params: Dict[str, Any] = None):
+        """
+        Args:
+            root_dir: Directory holding one sub-directory per document index
+            max_documents: Maximum number of document indexes kept
+            max_bytes: Maximum total size of the indexes on disk
+            backend: Vector backend, chroma or faiss
+            backend_params: Build and search parameters of the backend (e.g. index_type, ef_search)
+        """
+        self.backend = backend
+        self.backend_params = backend_params or {}
+        self.root_dir = root_dir
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        os.makedirs(root_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root_dir, "manifest.sqlite"), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS indexes ("
+            "key TEXT PRIMARY KEY, name TEXT, chunks INTEGER, size_bytes INTEGER, "
+            "created_at REAL, last_used REAL)"
+        )
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._in_use: Dict[str, int] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _open(self, key: str, embeddings):
+        return open_store(self.backend, self._path(key), embeddings, **self.backend_params)
+
+    def get_or_build(self, key: str, embeddings, chunk_document: Callable[[], Tuple[List[str], List[dict]]],
+                     name: str = "") -> Tuple[Any, bool]:
+        """
+        Attach to the index of a document, building it first if it does not exist
+
+        Concurrent sessions uploading the same document wait for a single build.
+        The index stays in use until release(key) is called.
+
+        Args:
+            key: Index key of the document
+            embeddings: Embedding function used to build and query the index
+            chunk_document: Returns the document's chunk texts and metadatas, only called on a miss
+            name: Document name kept in the manifest
+
+        Returns:
+            (vector store, True if an existing index was reused)
+        """
+        with self._key_lock(key):
+            with self._lock:
+                known = self.conn.execute("SELECT 1 FROM indexes WHERE key = ?", (key,)).fetchone()
+            reused = known is not None and os.path.isdir(self._path(key))
+            if reused:
+                store = self._open(key, embeddings)
+                logger.info(f"Reusing index {key}")
+            else:
+                store = self._build(key, embeddings, chunk_document, name)
+            with self._lock:
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+                self.conn.execute("UPDATE indexes SET last_used = ? WHERE key = ?", (time.time(), key))
+                self.conn.commit()
+        self._evict()
+        return store, reused
+
+    def _build(self, key: str, embeddings, chunk_document, name: str):
+        texts, metadatas = chunk_document()
+        path = self._path(key)
+        # Leftovers of an interrupted build; the manifest row is written only once a build completes
+        shutil.rmtree(path, ignore_errors=True)
+
+        store = build_store(self.backend, path, texts, metadatas, embeddings, **self.backend_params)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO indexes VALUES (?, ?, ?, ?, ?, ?)",
+                (key, name, len(texts), _directory_size(path), now, now)
+            )
+            self.conn.commit()
+        logger.info(f"Built index {key} with {len(texts)} chunks")
+        return store
+
+    def release(self, key: str):
+        """Mark a session's index as no longer in use"""
+        with self._lock:
+            if self._in_use.get(key, 0) > 1:
+                self._in_use[key] -= 1
+            else:
+                self._in_use.pop(key, None)
+
+    def _evict(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key, size_bytes FROM indexes ORDER BY last_used DESC"
+            ).fetchall()
+            count, total = len(rows), sum(size for _, size in rows)
+            candidates = []
+            for key, size in reversed(rows):
+                if count <= self.max_documents and total <= self.max_bytes:
+                    break
+                if key in self._in_use:
+                    continue
+                candidates.append(key)
+                count -= 1
+                total -= size
+
+        for key in candidates:
+            # Holding the key lock keeps a concurrent get_or_build of the same document consistent
+            with self._key_lock(key):
+                with self._lock:
+                    if key in self._in_use:
+                        continue
+                    self.conn.execute("DELETE FROM indexes WHERE key = ?", (key,))
+                    self.conn.commit()
+                shutil.rmtree(self._path(key), ignore_errors=True)
+            logger.info(f"Evicted index {key}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM indexes").fetchone()
+        return {"documents": count, "size_bytes": size, "in_use": len(self._in_use)}
+
+    def close(self):
+        self.conn.close()
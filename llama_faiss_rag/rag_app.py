@@ -1,15 +1,14 @@
-import PyPDF2
 from langchain_ollama import OllamaEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
 from langchain.chains import ConversationalRetrievalChain
 # from langchain_community.chat_models import ChatOllama
 from langchain_groq import ChatGroq
-from langchain.memory import ConversationBufferMemory
 from langchain_community.chat_message_histories import ChatMessageHistory
 import chainlit as cl
 import os
 from dotenv import load_dotenv
+from index_store import DocumentIndexStore, file_sha256, index_key
+from document_ingestion import CachedEmbeddings, EmbeddingCache, chunk_pdf
+from session_memory import RollingSummaryMemory
 
 # for chainlit, .env is loaded automatically
 #from dotenv import load_dotenv
@@ -23,6 +22,54 @@ llm_groq = ChatGroq(
             model_name='llama-3.3-70b-versatile'
     )
 
+EMBEDDING_MODEL = "nomic-embed-text"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Chunk embeddings are cached on disk, so revised manuals only embed the chunks that changed
+embeddings = CachedEmbeddings(
+    OllamaEmbeddings(model=EMBEDDING_MODEL),
+    #OllamaEmbeddings(model="llama2:7b"),
+    EMBEDDING_MODEL,
+    EmbeddingCache(os.environ.get("RAG_EMBEDDING_CACHE", "embedding_cache.sqlite")),
+    batch_size=int(os.environ.get("RAG_EMBEDDING_BATCH_SIZE", "32")),
+    concurrency=int(os.environ.get("RAG_EMBEDDING_CONCURRENCY", "4")),
+)
+
+VECTOR_BACKEND = os.environ.get("RAG_VECTOR_BACKEND", "chroma")
+# FAISS index type and recall/latency knobs, see vector_backends.FaissVectorStore
+FAISS_PARAMS = {
+    key: cast(os.environ[env])
+    for key, env, cast in [
+        ("index_type", "RAG_FAISS_INDEX", str),
+        ("hnsw_m", "RAG_FAISS_HNSW_M", int),
+        ("ef_search", "RAG_FAISS_EF_SEARCH", int),
+        ("nlist", "RAG_FAISS_NLIST", int),
+        ("pq_m", "RAG_FAISS_PQ_M", int),
+        ("nprobe", "RAG_FAISS_NPROBE", int),
+    ]
+    if env in os.environ
+}
+
+# Document indexes persist on disk and are shared by every session that uploads the same file
+index_store = DocumentIndexStore(
+    os.environ.get("RAG_INDEX_DIR", "rag_indexes"),
+    max_documents=int(os.environ.get("RAG_MAX_INDEXES", "20")),
+    max_bytes=int(os.environ.get("RAG_MAX_INDEX_BYTES", str(10 * 1024 ** 3))),
+    backend=VECTOR_BACKEND,
+    backend_params=FAISS_PARAMS if VECTOR_BACKEND == "faiss" else {},
+)
+
+
+def load_index(path, name):
+    """Attach to the document's index, building it only if no session has indexed this content yet"""
+    key = index_key(file_sha256(path), EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, VECTOR_BACKEND,
+                    index_store.backend_params)
+    docsearch, reused = index_store.get_or_build(
+        key, embeddings, lambda: chunk_pdf(path, CHUNK_SIZE, CHUNK_OVERLAP), name
+    )
+    return key, docsearch, reused
+
 @cl.on_chat_start
 async def on_chat_start():
     
@@ -43,36 +90,27 @@ async def on_chat_start():
     msg = cl.Message(content=f"Processing `{file.name}`...")
     await msg.send()
 
-    # Read the PDF file
-    pdf = PyPDF2.PdfReader(file.path)
-    pdf_text = ""
-    for page in pdf.pages:
-        pdf_text += page.extract_text()
-        
-
-    # Split the text into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    texts = text_splitter.split_text(pdf_text)
-
-    # Create a metadata for each chunk
-    metadatas = [{"source": f"{i}-pl"} for i in range(len(texts))]
-
-    # Create a Chroma vector store
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-    #embeddings = OllamaEmbeddings(model="llama2:7b")
-    docsearch = await cl.make_async(Chroma.from_texts)(
-        texts, embeddings, metadatas=metadatas
-    )
+    # Reuse the persistent Chroma index of this document or create it
+    try:
+        key, docsearch, reused = await cl.make_async(load_index)(file.path, file.name)
+    except ValueError as e:
+        msg.content = f"Could not index `{file.name}`: {e}"
+        await msg.update()
+        return
+    cl.user_session.set("index_key", key)
     
     # Initialize message history for conversation
     message_history = ChatMessageHistory()
     
-    # Memory for conversational context
-    memory = ConversationBufferMemory(
+    # Memory for conversational context: recent turns verbatim, older ones summarized in the background
+    memory = RollingSummaryMemory(
+        llm=llm_groq,
         memory_key="chat_history",
         output_key="answer",
         chat_memory=message_history,
         return_messages=True,
+        max_turns=int(os.environ.get("RAG_MEMORY_TURNS", "4")),
+        max_token_limit=int(os.environ.get("RAG_MEMORY_TOKENS", "1500")),
     )
 
     # Create a chain that uses the Chroma vector store
@@ -85,12 +123,21 @@ async def on_chat_start():
     )
 
     # Let the user know that the system is ready
-    msg.content = f"Processing `{file.name}` done. You can now ask questions!"
+    msg.content = (f"`{file.name}` was already indexed. You can now ask questions!" if reused
+                   else f"Processing `{file.name}` done. You can now ask questions!")
     await msg.update()
     #store the chain in user session
     cl.user_session.set("chain", chain)
 
 
+@cl.on_chat_end
+def on_chat_end():
+    # Let the index store evict this session's document again
+    key = cl.user_session.get("index_key")
+    if key:
+        index_store.release(key)
+
+
 @cl.on_message
 async def main(message: cl.Message):
         
@@ -0,0 +1,121 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from pydantic import PrivateAttr
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Progressively summarize a conversation between a user and an assistant about a technical document.
+Add the new lines to the current summary. Keep equipment and part names, values, steps already tried and open questions.
+Use at most {max_words} words.
+
+Current summary:
+{summary}
+
+New lines:
+{new_lines}
+
+New summary:"""
+
+# Summaries are written off the request path; shared by every session of the process
+_summarizer = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-summary")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return len(text) // 4 + 1
+
+
+class RollingSummaryMemory(BaseChatMemory):
+    """
+    Conversation memory of bounded size: the last max_turns turns verbatim plus a running summary
+
+    Turns pushed out of the window are folded into the summary by a background worker, one
+    LLM call per batch of turns, so saving a turn never waits for the LLM. Until a turn is
+    summarised it is still shown verbatim. Whatever is loaded fits max_token_limit, keeping
+    the question-condensing prompt the same size however long the session runs.
+    """
+
+    llm: Any
+    memory_key: str = "chat_history"
+    max_turns: int = 4
+    max_token_limit: int = 1500
+    summary_token_limit: int = 400
+    summary: str = ""
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _summarizing: bool = PrivateAttr(default=False)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            summary = self.summary
+            messages = self._pending + list(self.chat_memory.messages)
+
+        budget = self.max_token_limit - (estimate_tokens(summary) if summary else 0)
+        kept = []
+        # Newest messages first, older ones waiting for the summary only if they still fit
+        for message in reversed(messages):
+            budget -= estimate_tokens(message.content)
+            if budget < 0:
+                break
+            kept.append(message)
+        history = ([SystemMessage(content=f"Summary of the earlier conversation: {summary}")] if summary else [])
+        history += kept[::-1]
+        if self.return_messages:
+            return {self.memory_key: history}
+        return {self.memory_key: get_buffer_string(history)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        with self._lock:
+            messages = list(self.chat_memory.messages)
+            cut = max(0, len(messages) - 2 * self.max_turns)
+            # Long answers also push turns out early, the last turn always stays
+            verbatim_budget = self.max_token_limit - self.summary_token_limit
+            while cut < len(messages) - 2 and sum(estimate_tokens(m.content) for m in messages[cut:]) > verbatim_budget:
+                cut += 2
+            if cut:
+                self._pending.extend(messages[:cut])
+                self.chat_memory.clear()
+                self.chat_memory.add_messages(messages[cut:])
+            if not self._pending or self._summarizing:
+                return
+            self._summarizing = True
+        _summarizer.submit(self._summarize)
+
+    def _summarize(self):
+        """Fold the pending turns into the summary until none are left"""
+        while True:
+            with self._lock:
+                batch, summary = list(self._pending), self.summary
+                if not batch:
+                    self._summarizing = False
+                    return
+            prompt = SUMMARY_PROMPT.format(max_words=int(self.summary_token_limit * 0.75),
+                                           summary=summary or "(empty)", new_lines=get_buffer_string(batch))
+            try:
+                updated = self.llm.invoke(prompt).content.strip()
+            except Exception as e:
+                # The turns stay pending and are retried after the next turn
+                logger.warning(f"Could not update the conversation summary: {e}")
+                with self._lock:
+                    self._summarizing = False
+                return
+            with self._lock:
+                self.summary = updated[:self.summary_token_limit * 4]
+                del self._pending[:len(batch)]
+            logger.info(f"Summarized {len(batch) // 2} turns into {estimate_tokens(self.summary)} tokens")
+
+    def clear(self) -> None:
+        super().clear()
+        with self._lock:
+            self.summary = ""
+            self._pending.clear()
@@ -0,0 +1,210 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.vectorstores import Chroma
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "document"
+BACKENDS = ("chroma", "faiss")
+
+# IVF-PQ needs enough vectors to train its coarse quantizer (faiss warns below ~39 per list)
+MIN_TRAINING_POINTS_PER_LIST = 39
+# Inverted lists scanned per query when no nprobe is configured
+DEFAULT_NPROBE = 32
+DEFAULT_INDEX_TYPE = "ivfpq"
+# Parameters fixed when a FAISS index is built; the others (nprobe, ef_search) only apply to searches
+BUILD_PARAMS = ("hnsw_m", "ef_construction", "nlist", "pq_m")
+
+
+class FaissRetriever(BaseRetriever):
+    """LangChain retriever over a FaissVectorStore"""
+
+    store: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.store.similarity_search(query, self.k)
+
+
+class FaissVectorStore:
+    """
+    Approximate nearest neighbour index of chunk embeddings built with FAISS
+
+    Vectors are L2-normalised and searched by inner product (cosine similarity). Chunk
+    texts and metadata live in a SQLite docstore next to the index, so only the index and
+    the returned chunks are read at query time. IVF indexes are memory-mapped when loaded,
+    which lets several processes share one large library index through the page cache.
+    The default, ivfpq, is therefore an IVF index; flat and hnsw indexes cannot be mapped
+    by FAISS and are read into memory.
+
+    Index types:
+        flat     exact search, the recall baseline
+        hnsw     graph index; hnsw_m links per node, ef_search trades latency for recall
+        ivfflat  inverted lists of full vectors; nlist lists, nprobe lists scanned per query
+        ivfpq    inverted lists of product-quantised codes; nlist lists, pq_m sub-quantizers,
+                 nprobe lists scanned per query
+    """
+
+    def __init__(self, path: str, index, embeddings, meta: Dict[str, Any]):
+        self.path = path
+        self.index = index
+        self.embeddings = embeddings
+        self.meta = meta
+        self.docstore = sqlite3.connect(os.path.join(path, "docs.sqlite"), check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def create_index(vectors: np.ndarray, index_type: str = "ivfpq", hnsw_m: int = 32,
+                     ef_construction: int = 200, nlist: int = 4096, pq_m: int = 64):
+        """Build and train a FAISS index over normalised vectors"""
+        import faiss
+
+        count, dim = vectors.shape
+        if index_type in ("ivfpq", "ivfflat"):
+            nlist = max(1, min(nlist, count // MIN_TRAINING_POINTS_PER_LIST))
+            if index_type == "ivfpq" and dim % pq_m:
+                raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}")
+            codes = f"PQ{pq_m}" if index_type == "ivfpq" else "Flat"
+            index = faiss.index_factory(dim, f"IVF{nlist},{codes}", faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+        elif index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = ef_construction
+        elif index_type == "flat":
+            index = faiss.IndexFlatIP(dim)
+        else:
+            raise ValueError(f"Unknown FAISS index type '{index_type}'")
+        index.add(vectors)
+        return index
+
+    @classmethod
+    def build(cls, path: str, texts: List[str], metadatas: List[dict], embeddings,
+              index_type: str = DEFAULT_INDEX_TYPE, **params) -> "FaissVectorStore":
+        """
+        Embed chunks, build the index and save it with its docstore under path
+
+        Args:
+            path: Directory of the saved index
+            texts: Chunk texts
+            metadatas: Chunk metadata, one dict per text
+            embeddings: LangChain embeddings used for chunks and queries
+            index_type: flat, hnsw, ivfflat or ivfpq
+            **params: Build parameters of create_index and search parameters of load
+        """
+        if not texts:
+            raise ValueError(f"No text chunks to index in {path}, the document yields no text")
+        import faiss
+
+        os.makedirs(path, exist_ok=True)
+        exact = False
+        if index_type == "ivfpq" and len(texts) < MIN_TRAINING_POINTS_PER_LIST * 256:
+            # Too few vectors to train 256 PQ centroids; a single document keeps full vectors
+            # in a mappable IVF index that scans every list, which is an exact search
+            index_type, exact = "ivfflat", True
+        vectors = cls._normalize(embeddings.embed_documents(texts))
+        build_params = {k: v for k, v in params.items() if k in BUILD_PARAMS}
+        index = cls.create_index(vectors, index_type, **build_params)
+        faiss.write_index(index, os.path.join(path, "index.faiss"))
+
+        docstore = sqlite3.connect(os.path.join(path, "docs.sqlite"))
+        docstore.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, text TEXT, metadata TEXT)")
+        docstore.executemany(
+            "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)",
+            [(i, text, json.dumps(metadata)) for i, (text, metadata) in enumerate(zip(texts, metadatas))]
+        )
+        docstore.commit()
+        docstore.close()
+
+        meta = {"index_type": index_type, "dimension": int(vectors.shape[1]), "count": len(texts), **build_params}
+        if index_type in ("ivfpq", "ivfflat"):
+            meta["nlist"] = int(faiss.extract_index_ivf(index).nlist)
+            meta["default_nprobe"] = meta["nlist"] if exact else min(DEFAULT_NPROBE, meta["nlist"])
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        logger.info(f"Built FAISS {index_type} index of {len(texts)} chunks in {path}")
+        return cls.load(path, embeddings, **params)
+
+    @classmethod
+    def load(cls, path: str, embeddings, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+             **_) -> "FaissVectorStore":
+        """
+        Open a saved index, memory-mapping it where FAISS supports it (IVF indexes)
+
+        Args:
+            path: Directory of the saved index
+            embeddings: LangChain embeddings used for queries
+            nprobe: Inverted lists scanned per query (ivfflat, ivfpq)
+            ef_search: Candidate list size per query (hnsw)
+        """
+        import faiss
+
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        index_file = os.path.join(path, "index.faiss")
+        try:
+            index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Flat and HNSW indexes cannot be mapped; read them into memory
+            logger.warning(f"FAISS {meta['index_type']} index in {path} cannot be memory-mapped, reading it into memory")
+            index = faiss.read_index(index_file)
+
+        parameters = faiss.ParameterSpace()
+        nprobe = nprobe if nprobe is not None else meta.get("default_nprobe")
+        if nprobe is not None and meta["index_type"] in ("ivfpq", "ivfflat"):
+            parameters.set_index_parameter(index, "nprobe", nprobe)
+        if ef_search is not None and meta["index_type"] == "hnsw":
+            parameters.set_index_parameter(index, "efSearch", ef_search)
+        return cls(path, index, embeddings, meta)
+
+    def search_vectors(self, vectors: np.ndarray, k: int):
+        """Return (scores, ids) for already embedded queries"""
+        return self.index.search(self._normalize(vectors), k)
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        _, ids = self.search_vectors(np.array([self.embeddings.embed_query(query)]), k)
+        hits = [int(i) for i in ids[0] if i >= 0]
+        if not hits:
+            return []
+        with self._lock:
+            rows = self.docstore.execute(
+                f"SELECT id, text, metadata FROM chunks WHERE id IN ({','.join('?' * len(hits))})", hits
+            ).fetchall()
+        by_id = {row[0]: Document(page_content=row[1], metadata=json.loads(row[2])) for row in rows}
+        return [by_id[i] for i in hits if i in by_id]
+
+    def as_retriever(self, search_kwargs: Optional[Dict[str, Any]] = None) -> FaissRetriever:
+        return FaissRetriever(store=self, **(search_kwargs or {}))
+
+
+def build_store(backend: str, path: str, texts: List[str], metadatas: List[dict], embeddings, **params):
+    """Build a vector store of the given backend persisted under path"""
+    if not texts:
+        raise ValueError(f"No text chunks to index in {path}, the document yields no text")
+    if backend == "faiss":
+        return FaissVectorStore.build(path, texts, metadatas, embeddings, **params)
+    if backend == "chroma":
+        return Chroma.from_texts(texts, embeddings, metadatas=metadatas,
+                                 collection_name=COLLECTION_NAME, persist_directory=path)
+    raise ValueError(f"Unknown vector backend '{backend}', expected one of {BACKENDS}")
+
+
+def open_store(backend: str, path: str, embeddings, **params):
+    """Open a vector store previously built with build_store"""
+    if backend == "faiss":
+        return FaissVectorStore.load(path, embeddings, **params)
+    if backend == "chroma":
+        return Chroma(collection_name=COLLECTION_NAME, embedding_function=embeddings, persist_directory=path)
+    raise ValueError(f"Unknown vector backend '{backend}', expected one of {BACKENDS}")
@@ -1,22 +1,16 @@
 import os
-from PyPDF2 import PdfReader
+from llama_faiss_rag.document_ingestion import iter_pdf_pages
 
 def pdf_to_text_file(pdf_path):
     # Extract base name and prepare output path
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
     output_path = os.path.join(os.path.dirname(pdf_path), f"{base_name}.txt")
 
-    # Read PDF and extract text
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-
-    # Save text to file
+    # Extract pages in parallel and write them as they arrive
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write(text)
+        for page_text in iter_pdf_pages(pdf_path):
+            if page_text:
+                f.write(page_text + "\n")
 
     print(f"✅ Text saved to: {output_path}")
 